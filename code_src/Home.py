@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import os
+from modules.cache import read_excel_cached
 
 st.set_page_config(
     page_title="Investir avec Impact",
@@ -19,7 +20,8 @@ st.title("🌱 Investir avec Impact : Notre Engagement pour la Diversité et l'I
 try:
 
     file_path = os.path.join("data", "actifs.xlsx")
-    df = pd.read_excel(file_path, engine="openpyxl")
+    # Lecture partagée entre les sessions, invalidée lorsque le fichier change
+    df = read_excel_cached(file_path, engine="openpyxl")
     st.success("✅ Fichier Excel chargé avec succès !")
 
     
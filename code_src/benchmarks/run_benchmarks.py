@@ -0,0 +1,294 @@
+"""
+Benchmarks des chemins critiques de l'application sur des univers synthétiques.
+
+Mesure le temps d'exécution et le pic mémoire de l'ingestion
+(update_assets_data), de l'assemblage de la matrice des rendements, de la
+création d'un portefeuille et du filtrage des actifs de la barre latérale,
+pour des univers de 40 à 10 000 actifs et de 150 à 5 000 périodes. Les cours
+proviennent de FakePriceProvider, sans accès réseau.
+
+Chaque exécution est ajoutée à un historique JSON et comparée à la
+précédente, afin de repérer les régressions d'un commit à l'autre.
+
+Utilisation (depuis la racine du dépôt) :
+    python code_src/benchmarks/run_benchmarks.py --quick
+    python code_src/benchmarks/run_benchmarks.py --tickers 40 1000 --periods 150 5000
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Les modules de l'application sont importés comme depuis les pages Streamlit
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.cache import LRUCache
+from modules.data_collector import build_returns_matrix, update_assets_data
+from modules.instrumentation import telemetry
+from modules.portfolio_manager import PortfolioManager
+from modules.price_provider import FakePriceProvider
+from modules.price_store import PriceStore
+from modules.rate_limiter import AdaptiveRateLimiter
+
+TICKER_COUNTS = (40, 1000, 10000)
+PERIOD_COUNTS = (150, 1300, 5000)
+QUICK_TICKER_COUNTS = (40, 1000)
+QUICK_PERIOD_COUNTS = (150, 1300)
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.json')
+START_DATE = pd.Timestamp('2000-01-03')
+# Seuil de ralentissement signalé par rapport à l'exécution précédente
+REGRESSION_RATIO = 1.25
+# Écart minimal (s) en deçà duquel une variation est attribuée au bruit de mesure
+REGRESSION_MIN_SECONDS = 0.01
+
+
+class SyntheticUniverse:
+    """Univers synthétique : fichier des actifs et stockage des cours dans un répertoire temporaire"""
+
+    def __init__(self, n_tickers: int, n_periods: int, root: str, seed: int = 0):
+        self.n_tickers = n_tickers
+        self.n_periods = n_periods
+        self.root = root
+        self.start_date = START_DATE
+        self.end_date = START_DATE + pd.Timedelta(weeks=n_periods)
+        rng = np.random.default_rng(seed)
+        self.assets_df = pd.DataFrame({
+            'Actions': [f"Société {i}" for i in range(n_tickers)],
+            'Ticker': [f"SYN{i:05d}" for i in range(n_tickers)],
+            'Note': np.round(rng.uniform(-1.0, 5.0, n_tickers), 2),
+        })
+        self.assets_file = os.path.join(root, f"actifs_{n_tickers}.xlsx")
+        if not os.path.exists(self.assets_file):
+            self.assets_df.to_excel(self.assets_file, index=False)
+        self.provider = FakePriceProvider(max_batch_size=200)
+
+    def new_store(self) -> PriceStore:
+        """Stockage des cours vide"""
+        path = tempfile.mkdtemp(dir=self.root)
+        return PriceStore(root=path, interval='1wk')
+
+    def ingest(self, store: Optional[PriceStore] = None, offline: bool = False):
+        """Exécute update_assets_data sur l'univers synthétique"""
+        # Le fournisseur synthétique n'impose aucun quota : sans intervalle minimal entre les
+        # requêtes, les temps mesurent le code et non les attentes du limiteur
+        result = update_assets_data(provider=self.provider, store=store or self.new_store(), offline=offline,
+                                    assets_file=self.assets_file, start_date=self.start_date,
+                                    end_date=self.end_date, returns_root=os.path.join(self.root, 'returns'),
+                                    esg_cache_path=os.path.join(self.root, 'esg_scores.parquet'),
+                                    limiter=AdaptiveRateLimiter(min_interval=0.0))
+        # Une mise à jour en échec mesurerait un chemin plus court : le benchmark s'arrête
+        if result is None:
+            raise RuntimeError("La mise à jour de l'univers synthétique a échoué")
+        return result
+
+
+def measure(run: Callable[[Any], Any], setup: Callable[[], Any] = lambda: None, repeats: int = 3) -> Dict[str, float]:
+    """
+    Mesure le temps d'exécution et le pic mémoire d'une fonction.
+
+    La préparation (setup) n'est pas chronométrée. Le pic mémoire est mesuré
+    par tracemalloc lors d'une exécution supplémentaire, pour ne pas fausser
+    les temps.
+
+    Returns:
+        Dict[str, float]: Temps médian et minimal (s) et pic mémoire (Mo)
+    """
+    times = []
+    for _ in range(repeats):
+        state = setup()
+        start = time.perf_counter()
+        run(state)
+        times.append(time.perf_counter() - start)
+
+    state = setup()
+    tracemalloc.start()
+    try:
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'median_s': statistics.median(times),
+        'min_s': min(times),
+        'peak_mb': peak / 2 ** 20,
+    }
+
+
+def benchmark_universe(universe: SyntheticUniverse, repeats: int) -> Dict[str, Dict[str, float]]:
+    """Exécute tous les benchmarks sur un univers"""
+    results = {}
+
+    # Ingestion complète sur un stockage vide, puis relance lorsque tout est déjà stocké
+    results['update_assets_data_cold'] = measure(lambda store: universe.ingest(store), universe.new_store, repeats)
+    warm_store = universe.new_store()
+    universe.ingest(warm_store)
+    results['update_assets_data_warm'] = measure(lambda _: universe.ingest(warm_store), repeats=repeats)
+
+    # Assemblage de la matrice des rendements à partir des cours stockés
+    prices = warm_store.load_all(universe.assets_df['Ticker'].tolist(), universe.start_date, universe.end_date)
+    results['returns_assembly'] = measure(lambda _: build_returns_matrix(universe.assets_df, prices),
+                                          repeats=repeats)
+
+    notation_df, returns_df, _ = build_returns_matrix(universe.assets_df, prices)
+    manager = PortfolioManager(notation_df, returns_df, results_cache=LRUCache(1))
+
+    # Filtrage de la barre latérale : bornes du curseur et actifs éligibles, pour 50 positions du curseur
+    thresholds = np.linspace(notation_df['Note'].min(), notation_df['Note'].max(), 50)
+
+    def sidebar_filtering(_):
+        for min_rating in thresholds:
+            # Bornes du curseur de note minimale, recalculées à chaque exécution de la page
+            min_value, max_value = float(notation_df['Note'].min()), float(notation_df['Note'].max())
+            manager.universe.eligible(min_rating)
+
+    results['sidebar_filtering'] = measure(sidebar_filtering, repeats=repeats)
+
+    # Création d'un portefeuille, cache des résultats vide à chaque exécution
+    def new_manager():
+        return PortfolioManager(notation_df, returns_df, results_cache=LRUCache(1))
+
+    def create_portfolio(manager):
+        manager.create_portfolio(total_investment=10000.0, min_notation=1.0,
+                                 corresponding_assets=manager.universe.eligible(1.0), size=10)
+
+    results['create_portfolio'] = measure(create_portfolio, new_manager, repeats)
+    return results
+
+
+def scaling_exponents(runs: List[Dict]) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Exposants de croissance du temps d'exécution.
+
+    Pente de log(temps) en fonction de log(nombre d'actifs) à nombre de
+    périodes fixé, et inversement : environ 1 pour une croissance linéaire,
+    2 pour une croissance quadratique.
+    """
+    scaling = {}
+    benchmarks = sorted({name for run in runs for name in run['results']})
+    for name in benchmarks:
+        scaling[name] = {}
+        for axis, other in (('tickers', 'periods'), ('periods', 'tickers')):
+            curves = {}
+            for fixed in sorted({run[other] for run in runs}):
+                points = sorted((run[axis], run['results'][name]['median_s'])
+                                for run in runs if run[other] == fixed and name in run['results'])
+                if len(points) >= 2:
+                    x, y = np.log([p[0] for p in points]), np.log([max(p[1], 1e-9) for p in points])
+                    curves[f"{other}={fixed}"] = round(float(np.polyfit(x, y, 1)[0]), 2)
+            scaling[name][axis] = curves
+    return scaling
+
+
+def load_history(path: str) -> List[Dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_with_previous(record: Dict, history: List[Dict]) -> List[str]:
+    """Liste les benchmarks ralentis de plus de REGRESSION_RATIO depuis la dernière exécution comparable"""
+    regressions = []
+    for run in record['runs']:
+        for previous in reversed(history):
+            match = next((r for r in previous['runs']
+                          if r['tickers'] == run['tickers'] and r['periods'] == run['periods']), None)
+            if match is None:
+                continue
+            for name, current in run['results'].items():
+                before = match['results'].get(name)
+                if (before and current['median_s'] > REGRESSION_RATIO * before['median_s']
+                        and current['median_s'] - before['median_s'] > REGRESSION_MIN_SECONDS):
+                    regressions.append(
+                        f"{name} ({run['tickers']} actifs x {run['periods']} périodes) : "
+                        f"{before['median_s']:.3f}s -> {current['median_s']:.3f}s "
+                        f"(commit {previous.get('commit')})"
+                    )
+            break
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins critiques sur des univers synthétiques")
+    parser.add_argument('--tickers', type=int, nargs='+', default=list(TICKER_COUNTS))
+    parser.add_argument('--periods', type=int, nargs='+', default=list(PERIOD_COUNTS))
+    parser.add_argument('--quick', action='store_true',
+                        help="Grille réduite (40 et 1 000 actifs, 150 et 1 300 périodes)")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--history', default=HISTORY_FILE, help="Fichier JSON de l'historique des exécutions")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.tickers, args.periods = list(QUICK_TICKER_COUNTS), list(QUICK_PERIOD_COUNTS)
+
+    # Seuls les avertissements et erreurs de l'application sont conservés pendant les mesures
+    logging.getLogger().setLevel(logging.WARNING)
+    # Les univers synthétiques ne doivent pas alimenter la télémétrie de l'application
+    telemetry.path = None
+
+    root = tempfile.mkdtemp(prefix='finance_verte_bench_')
+    runs = []
+    try:
+        for n_tickers in args.tickers:
+            for n_periods in args.periods:
+                universe = SyntheticUniverse(n_tickers, n_periods, root)
+                results = benchmark_universe(universe, args.repeats)
+                runs.append({'tickers': n_tickers, 'periods': n_periods, 'results': results})
+                for name, result in results.items():
+                    print(f"{n_tickers:>6} actifs x {n_periods:>5} périodes  {name:<26}"
+                          f"{result['median_s']:>9.4f} s  {result['peak_mb']:>9.1f} Mo")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    record = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'runs': runs,
+        'scaling': scaling_exponents(runs),
+    }
+
+    print("\nExposants de croissance (1 : linéaire, 2 : quadratique)")
+    for name, axes in record['scaling'].items():
+        for axis, curves in axes.items():
+            if curves:
+                print(f"  {name:<26} selon {axis:<8} {curves}")
+
+    history = load_history(args.history)
+    regressions = compare_with_previous(record, history)
+    if regressions:
+        print("\nRégressions par rapport à l'exécution précédente :")
+        for line in regressions:
+            print(f"  {line}")
+
+    history.append(record)
+    with open(args.history, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    print(f"\nRésultats ajoutés à {args.history}")
+
+
+if __name__ == "__main__":
+    main()
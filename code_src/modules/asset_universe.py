@@ -0,0 +1,91 @@
+import pandas as pd
+import numpy as np
+from typing import Iterable, List, Optional
+
+
+class AssetUniverse:
+    """
+    Index des actifs notés, construit une seule fois par DataFrame de notation.
+
+    Il associe chaque ticker à sa ligne dans le DataFrame et conserve les
+    notes triées : la recherche des actifs de note supérieure à un seuil est
+    une recherche dichotomique et la sélection des k mieux notés une simple
+    tranche. À note égale, l'ordre du fichier des actifs est conservé.
+    """
+
+    def __init__(self, notation_df: pd.DataFrame, assets: Optional[Iterable[str]] = None):
+        """
+        Args:
+            notation_df: DataFrame des actifs avec les colonnes 'Ticker' et 'Note'
+            assets: Restreint l'index à ces tickers (par exemple ceux disposant de rendements)
+        """
+        self.notation_df = notation_df
+        tickers = notation_df['Ticker'].to_numpy()
+        rows = np.arange(len(notation_df))
+        if assets is not None:
+            keep = np.isin(tickers, list(assets))
+            tickers, rows = tickers[keep], rows[keep]
+
+        notes = notation_df['Note'].to_numpy(dtype=np.float64)[rows]
+        self._rows = dict(zip(tickers, rows))
+        self._notes = dict(zip(tickers, notes))
+
+        # Tri décroissant stable : les ex-aequo restent dans l'ordre du fichier
+        order = np.argsort(-notes, kind='stable')
+        self._tickers_desc = tickers[order]
+        self._notes_desc = notes[order]
+        # Copie croissante des notes pour la recherche dichotomique
+        self._notes_asc = self._notes_desc[::-1]
+
+    def __len__(self) -> int:
+        return len(self._tickers_desc)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker in self._notes
+
+    @property
+    def tickers(self) -> List[str]:
+        """Tickers de l'index, du mieux noté au moins bien noté"""
+        return list(self._tickers_desc)
+
+    def note(self, ticker: str) -> float:
+        """Note D&I d'un actif"""
+        return self._notes[ticker]
+
+    def notes(self, tickers: Iterable[str]) -> np.ndarray:
+        """Notes D&I d'une liste d'actifs"""
+        return np.array([self._notes[ticker] for ticker in tickers], dtype=np.float64)
+
+    def row(self, ticker: str) -> pd.Series:
+        """Ligne du DataFrame de notation correspondant à un actif"""
+        return self.notation_df.iloc[self._rows[ticker]]
+
+    def count_eligible(self, min_note: float) -> int:
+        """Nombre d'actifs dont la note est supérieure ou égale à min_note"""
+        return len(self._notes_asc) - int(np.searchsorted(self._notes_asc, min_note, side='left'))
+
+    def eligible(self, min_note: float) -> List[str]:
+        """Actifs dont la note est supérieure ou égale à min_note, du mieux noté au moins bien noté"""
+        return list(self._tickers_desc[:self.count_eligible(min_note)])
+
+    def top_k(self, k: int, min_note: Optional[float] = None,
+              candidates: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Sélectionne les k actifs les mieux notés.
+
+        Args:
+            k: Nombre d'actifs
+            min_note: Note minimale requise
+            candidates: Restreint la sélection à ces actifs (l'ordre fourni départage les ex-aequo)
+
+        Returns:
+            List[str]: Actifs sélectionnés, du mieux noté au moins bien noté
+        """
+        if candidates is None:
+            limit = len(self) if min_note is None else self.count_eligible(min_note)
+            return list(self._tickers_desc[:min(k, limit)])
+
+        candidates = [ticker for ticker in candidates
+                      if ticker in self._notes and (min_note is None or self._notes[ticker] >= min_note)]
+        order = np.argsort(-self.notes(candidates), kind='stable')[:k]
+        return [candidates[i] for i in order]
@@ -0,0 +1,255 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Union
+
+# Nombre de périodes par an pour des rendements hebdomadaires
+PERIODS_PER_YEAR = 52
+
+# Fréquences des rendements proposées et intervalle des cours correspondant
+FREQUENCY_INTERVALS = {'daily': '1d', 'weekly': '1wk', 'monthly': '1mo'}
+# Nombre de périodes par an selon l'intervalle des cours
+INTERVAL_PERIODS_PER_YEAR = {'1d': 252, '1wk': 52, '1mo': 12}
+
+
+def infer_periods_per_year(returns_df: pd.DataFrame) -> int:
+    """Nombre de périodes par an d'un DataFrame de rendements, d'après son intervalle (hebdomadaire par défaut)"""
+    return INTERVAL_PERIODS_PER_YEAR[returns_df.attrs.get('interval', '1wk')]
+
+
+def valid_returns(returns: np.ndarray) -> np.ndarray:
+    """
+    Rendements en float64 utilisables par les backtests.
+
+    Une valeur manquante (NaN) marque une période invalide de la matrice des
+    rendements : l'actif n'a pas coté ou n'était pas encore listé. La position
+    est alors conservée à son dernier cours, soit un rendement nul ; le
+    rendement de la période valide suivante couvre tout l'intervalle.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    invalid = np.isnan(returns)
+    if invalid.any():
+        returns = np.where(invalid, 0.0, returns)
+    return returns
+
+
+def backtest_constant_weights(returns: np.ndarray, weights: np.ndarray,
+                              initial_value: float = 1.0) -> np.ndarray:
+    """
+    Calcule la valeur d'un ou plusieurs portefeuilles à poids constants.
+
+    La première ligne de rendements sert de point de départ : la valeur
+    initiale y est appliquée telle quelle, puis chaque période suivante est
+    capitalisée avec le rendement pondéré du portefeuille.
+
+    Args:
+        returns: Matrice des rendements (T périodes x k actifs), NaN pour les périodes invalides
+        weights: Vecteur de poids (k,) ou matrice de poids (k x n portefeuilles)
+        initial_value: Valeur initiale du portefeuille
+
+    Returns:
+        np.ndarray: Valeurs du portefeuille, de forme (T,) ou (T, n)
+    """
+    returns = valid_returns(returns)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    values = np.empty((returns.shape[0],) + weights.shape[1:])
+    if returns.shape[0] == 0:
+        return values
+    values[0] = initial_value
+    # Rendement du portefeuille pour chaque période : un seul produit matrice-vecteur
+    period_returns = returns[1:] @ weights
+    values[1:] = initial_value * np.cumprod(1 + period_returns, axis=0)
+    return values
+
+
+def performance_metrics(values: Union[np.ndarray, pd.Series],
+                        periods_per_year: int = PERIODS_PER_YEAR) -> Dict[str, Union[float, np.ndarray]]:
+    """
+    Calcule le rendement annualisé, la volatilité annualisée et le ratio de Sharpe.
+
+    Args:
+        values: Valeurs du portefeuille, de forme (T,) ou (T, n)
+        periods_per_year: Nombre de périodes par an
+
+    Returns:
+        Dict: Métriques en pourcentage ('annual_return', 'volatility', 'sharpe_ratio')
+    """
+    values = np.asarray(values, dtype=np.float64)
+    returns = values[1:] / values[:-1] - 1
+
+    annual_return = ((1 + returns.mean(axis=0)) ** periods_per_year - 1) * 100
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(periods_per_year) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe_ratio = np.where(volatility != 0, annual_return / volatility, 0.0)
+
+    if values.ndim == 1:
+        return {
+            'annual_return': float(annual_return),
+            'volatility': float(volatility),
+            'sharpe_ratio': float(sharpe_ratio),
+        }
+    return {
+        'annual_return': annual_return,
+        'volatility': volatility,
+        'sharpe_ratio': sharpe_ratio,
+    }
+
+
+# Calendriers de rééquilibrage disponibles
+REBALANCING_SCHEDULES = ('none', 'weekly', 'monthly', 'quarterly', 'threshold')
+
+_SCHEDULE_PERIODS = {'weekly': 'W', 'monthly': 'M', 'quarterly': 'Q'}
+
+
+def rebalancing_mask(index: pd.DatetimeIndex, schedule: str) -> np.ndarray:
+    """
+    Indique les périodes à la fin desquelles le portefeuille est rééquilibré.
+
+    La période 0 (investissement initial) est toujours marquée. Pour les
+    calendriers périodiques, le rééquilibrage a lieu à la dernière période
+    de chaque semaine, mois ou trimestre.
+
+    Args:
+        index: Dates des rendements
+        schedule: 'none', 'weekly', 'monthly' ou 'quarterly'
+
+    Returns:
+        np.ndarray: Masque booléen de longueur T
+    """
+    mask = np.zeros(len(index), dtype=bool)
+    if len(index) == 0:
+        return mask
+    mask[0] = True
+    if schedule == 'none':
+        return mask
+    if schedule not in _SCHEDULE_PERIODS:
+        raise ValueError(f"Calendrier de rééquilibrage inconnu : {schedule}")
+
+    periods = pd.DatetimeIndex(index).to_period(_SCHEDULE_PERIODS[schedule]).asi8
+    mask[:-1] |= periods[:-1] != periods[1:]
+    return mask
+
+
+def _cumulative_growth(returns: np.ndarray) -> np.ndarray:
+    """Croissance cumulée de chaque actif depuis la période 0 (G[0] = 1)"""
+    growth = np.empty_like(returns)
+    growth[0] = 1.0
+    np.cumprod(1 + returns[1:], axis=0, out=growth[1:])
+    return growth
+
+
+def threshold_mask(returns: np.ndarray, weights: np.ndarray, threshold: float,
+                   lookahead: int = 64) -> np.ndarray:
+    """
+    Détermine les rééquilibrages déclenchés par une dérive des poids.
+
+    Un rééquilibrage a lieu dès qu'un poids s'écarte de sa cible de plus de
+    threshold (en valeur absolue). À partir de chaque rééquilibrage, les
+    poids dérivés des périodes suivantes sont calculés par blocs vectorisés
+    pour trouver directement le prochain déclenchement : la boucle ne porte
+    que sur les rééquilibrages, pas sur les périodes.
+
+    Args:
+        returns: Matrice des rendements (T x k), NaN pour les périodes invalides
+        weights: Poids cibles (k,)
+        threshold: Écart maximal toléré sur un poids
+        lookahead: Taille initiale des blocs de recherche
+
+    Returns:
+        np.ndarray: Masque booléen de longueur T
+    """
+    returns = valid_returns(returns)
+    weights = np.asarray(weights, dtype=np.float64)
+    T = returns.shape[0]
+    mask = np.zeros(T, dtype=bool)
+    if T == 0:
+        return mask
+    mask[0] = True
+
+    start = 0
+    while start < T - 2:
+        growth = np.ones(returns.shape[1])
+        block_start = start + 1
+        block = lookahead
+        trigger = None
+        while block_start < T - 1:
+            block_end = min(block_start + block, T - 1)
+            # Valeur des positions relativement au dernier rééquilibrage
+            holdings = weights * growth * np.cumprod(1 + returns[block_start:block_end], axis=0)
+            drift = holdings / holdings.sum(axis=1, keepdims=True)
+            breached = np.abs(drift - weights).max(axis=1) > threshold
+            if breached.any():
+                trigger = block_start + int(np.argmax(breached))
+                break
+            growth = holdings[-1] / weights.clip(min=1e-300)
+            block_start = block_end
+            block *= 2
+        if trigger is None:
+            break
+        mask[trigger] = True
+        start = trigger
+    return mask
+
+
+def backtest_rebalanced(returns: np.ndarray, weights: np.ndarray, mask: np.ndarray,
+                        initial_value: float = 1.0, transaction_cost: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Calcule la valeur d'un portefeuille rééquilibré aux périodes indiquées.
+
+    Entre deux rééquilibrages, les positions dérivent avec les rendements des
+    actifs. À chaque rééquilibrage, les poids reviennent à leur cible et des
+    frais proportionnels au volume échangé sont prélevés (l'achat initial
+    n'est pas facturé). Le calcul est entièrement vectorisé : la croissance de
+    chaque segment est obtenue à partir des croissances cumulées des actifs.
+
+    Args:
+        returns: Matrice des rendements (T x k), NaN pour les périodes invalides
+        weights: Poids cibles (k,)
+        mask: Masque booléen des rééquilibrages (voir rebalancing_mask, threshold_mask)
+        initial_value: Valeur initiale du portefeuille
+        transaction_cost: Frais proportionnels au montant échangé (ex. 0.001 = 10 pb)
+
+    Returns:
+        Dict: 'values' (T,), 'turnover' (T,, fraction du portefeuille échangée
+        à chaque période) et 'costs' (T,, frais payés)
+    """
+    returns = valid_returns(returns)
+    weights = np.asarray(weights, dtype=np.float64)
+    T = returns.shape[0]
+    values = np.full(T, float(initial_value))
+    turnover = np.zeros(T)
+    costs = np.zeros(T)
+    if T < 2:
+        return {'values': values, 'turnover': turnover, 'costs': costs}
+
+    mask = np.asarray(mask, dtype=bool).copy()
+    mask[0] = True
+    mask[-1] = False  # Un rééquilibrage final n'aurait aucun effet sur la trajectoire
+    growth = _cumulative_growth(returns)
+
+    # Début du segment de chaque période : dernier rééquilibrage strictement antérieur
+    rebalance_points = np.flatnonzero(mask)
+    segment = np.cumsum(mask)[:-1] - 1
+    starts = rebalance_points[segment]
+
+    # Croissance de chaque position depuis le début de son segment
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.nan_to_num(growth[1:] / growth[starts])
+    holdings = relative * weights
+    drift_growth = holdings.sum(axis=1)
+
+    # Volume échangé aux rééquilibrages : écart entre poids dérivés et cibles
+    at_rebalance = mask[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drifted = np.nan_to_num(holdings[at_rebalance] / drift_growth[at_rebalance, None])
+    turnover[1:][at_rebalance] = np.abs(drifted - weights).sum(axis=1)
+    cost_factor = 1 - transaction_cost * turnover
+
+    # Valeur après rééquilibrage en chaque point, par produit cumulé sur les segments
+    segment_factor = drift_growth[rebalance_points[1:] - 1] * cost_factor[rebalance_points[1:]]
+    post_values = initial_value * np.concatenate(([1.0], np.cumprod(segment_factor)))
+
+    values[1:] = post_values[segment] * drift_growth
+    costs[1:] = values[1:] * (transaction_cost * turnover[1:])
+    values[1:] *= cost_factor[1:]
+    return {'values': values, 'turnover': turnover, 'costs': costs}
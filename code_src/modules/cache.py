@@ -0,0 +1,187 @@
+import pandas as pd
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Cache thread-safe partagé, borné en nombre d'entrées et en durée de vie.
+
+    Les entrées les moins récemment utilisées sont évincées lorsque la taille
+    maximale est atteinte ; les entrées plus anciennes que ttl secondes sont
+    considérées comme absentes. Les objets du cache étant partagés entre
+    toutes les sessions, ils ne doivent pas être modifiés en place.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Nombre maximal d'entrées conservées
+            ttl: Durée de vie d'une entrée en secondes (None = illimitée)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retourne la valeur associée à key, ou default si absente ou expirée"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[0] <= self.ttl):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any):
+        """Enregistre une valeur, en évinçant les entrées les plus anciennes si nécessaire"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Retourne la valeur en cache ou la calcule puis la conserve.
+
+        Des sessions concurrentes demandant la même clé attendent un unique
+        calcul ; les calculs portant sur des clés différentes restent parallèles.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is not sentinel:
+            return value
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            # Une autre session a pu calculer la valeur pendant l'attente
+            value = self._peek(key, sentinel)
+            if value is sentinel:
+                value = compute()
+                self.set(key, value)
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return value
+
+    def _peek(self, key: Hashable, default: Any) -> Any:
+        """Lecture sans mise à jour des compteurs"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or time.monotonic() - entry[0] <= self.ttl):
+                return entry[1]
+            return default
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
+
+    def info(self) -> Dict[str, int]:
+        """Compteurs d'utilisation du cache"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+        }
+
+
+def file_signature(path: str, hash_content: bool = False) -> Tuple:
+    """
+    Signature d'un fichier servant de clé d'invalidation.
+
+    Args:
+        path: Chemin du fichier
+        hash_content: Si True, ajoute une empreinte SHA-1 du contenu (utile lorsque
+            la date de modification n'est pas fiable, par exemple après une copie)
+
+    Returns:
+        Tuple: Chemin absolu, date de modification (ns) et taille, puis empreinte éventuelle
+    """
+    stat = os.stat(path)
+    signature = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if hash_content:
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        signature += (digest.hexdigest(),)
+    return signature
+
+
+# Caches partagés par toutes les sessions du processus Streamlit
+files_cache = LRUCache(max_entries=16, ttl=24 * 3600)
+datasets_cache = LRUCache(max_entries=8, ttl=24 * 3600)
+statistics_cache = LRUCache(max_entries=16, ttl=24 * 3600)
+portfolio_results_cache = LRUCache(max_entries=256, ttl=24 * 3600)
+figures_cache = LRUCache(max_entries=64, ttl=3600)
+
+
+def read_excel_cached(path: str, **kwargs) -> pd.DataFrame:
+    """
+    Lit un fichier Excel, en réutilisant le résultat tant que le fichier n'a pas changé.
+
+    Args:
+        path: Chemin du fichier Excel
+        **kwargs: Paramètres transmis à pd.read_excel
+
+    Returns:
+        pd.DataFrame: Contenu de la feuille (partagé, à ne pas modifier en place)
+    """
+    key = ('excel', file_signature(path), tuple(sorted(kwargs.items())))
+    return files_cache.get_or_compute(key, lambda: pd.read_excel(path, **kwargs))
+
+
+def dataset_version(returns_df: pd.DataFrame) -> str:
+    """
+    Identifiant de version d'un DataFrame de rendements.
+
+    Utilise la version enregistrée au chargement lorsqu'elle existe, sinon
+    une empreinte du contenu.
+    """
+    version = returns_df.attrs.get('version')
+    if version is None:
+        version = str(pd.util.hash_pandas_object(returns_df, index=True).sum())
+        returns_df.attrs['version'] = version
+    return version
+
+
+def returns_statistics(returns_df: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """
+    Statistiques descriptives des rendements, calculées une fois par version.
+
+    La covariance n'est pas calculée ici : l'optimiseur la calcule à la
+    demande sur les actifs dont il a besoin (voir MomentCache).
+
+    Args:
+        returns_df: DataFrame des rendements
+
+    Returns:
+        Dict[str, pd.DataFrame]: 'describe'
+    """
+    return statistics_cache.get_or_compute(
+        ('statistics', dataset_version(returns_df)),
+        lambda: {'describe': returns_df.describe()}
+    )
@@ -0,0 +1,228 @@
+import pandas as pd
+import numpy as np
+import logging
+import plotly.graph_objects as go
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+from modules.cache import figures_cache
+
+logger = logging.getLogger(__name__)
+
+# Nombre maximal de points envoyés au navigateur par courbe
+MAX_POINTS = 1000
+
+# Intervalles tracés par défaut dans un graphique en éventail (quantiles de simulate_portfolio)
+FAN_INTERVALS = (('p5', 'p95', '5% - 95%'), ('p25', 'p75', '25% - 75%'))
+
+SeriesLike = Union[pd.Series, pd.DataFrame, Dict[str, pd.Series]]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Points conservés par l'algorithme Largest-Triangle-Three-Buckets.
+
+    Le premier et le dernier point sont conservés ; les autres sont répartis
+    en n_out - 2 groupes de taille égale, dans chacun desquels est retenu le
+    point formant le plus grand triangle avec le point retenu dans le groupe
+    précédent et la moyenne du groupe suivant. Les pics et creux de la courbe
+    sont ainsi préservés, contrairement à un sous-échantillonnage régulier.
+
+    Args:
+        x: Abscisses croissantes (numériques)
+        y: Ordonnées, sans valeur manquante
+        n_out: Nombre de points conservés
+
+    Returns:
+        np.ndarray: Indices croissants des points conservés
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bornes des groupes des points intérieurs [1, n - 1)
+    edges = (np.arange(n_out - 1) * (n - 2) // (n_out - 2) + 1).astype(int)
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts
+    # Le point suivant le dernier groupe est le dernier point de la série
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - next_x[i]) * (y[start:end] - ay) - (ax - x[start:end]) * (next_y[i] - ay))
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+    return indices
+
+
+def _numeric_index(index: pd.Index) -> np.ndarray:
+    """Abscisses numériques d'un index (dates converties en nanosecondes)"""
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    return np.asarray(index, dtype=np.float64)
+
+
+def downsample(series: pd.Series, max_points: int = MAX_POINTS) -> pd.Series:
+    """
+    Réduit une série à max_points points en préservant sa forme (voir lttb_indices).
+
+    Les valeurs manquantes sont ignorées.
+
+    Args:
+        series: Série indexée par date ou par période
+        max_points: Nombre maximal de points conservés
+
+    Returns:
+        pd.Series: La série si elle est assez courte, sinon les points retenus
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    return series.iloc[lttb_indices(_numeric_index(series.index), series.to_numpy(), max_points)]
+
+
+def downsample_frame(frame: pd.DataFrame, max_points: int = MAX_POINTS) -> pd.DataFrame:
+    """
+    Réduit un DataFrame dont les colonnes doivent garder les mêmes abscisses (bandes d'un éventail).
+
+    Chaque colonne choisit ses points parmi une part égale du budget ; la
+    réunion de ces points est conservée pour toutes les colonnes.
+
+    Args:
+        frame: Une colonne par courbe, indexée par date ou par période
+        max_points: Nombre maximal de points conservés
+
+    Returns:
+        pd.DataFrame: Les lignes retenues
+    """
+    frame = frame.dropna(how='all')
+    if len(frame) <= max_points or frame.shape[1] == 0:
+        return frame
+    x = _numeric_index(frame.index)
+    budget = max(max_points // frame.shape[1], 3)
+    rows = set()
+    for column in frame.columns:
+        values = frame[column].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        rows.update(valid[lttb_indices(x[valid], values[valid], budget)])
+    return frame.iloc[sorted(rows)]
+
+
+def _as_series_dict(data: SeriesLike) -> Dict[str, pd.Series]:
+    """Courbes à tracer : une par colonne d'un DataFrame ou par entrée d'un dictionnaire"""
+    if isinstance(data, pd.Series):
+        return {str(data.name if data.name is not None else 'value'): data}
+    if isinstance(data, pd.DataFrame):
+        return {str(column): data[column] for column in data.columns}
+    return {str(name): series for name, series in data.items()}
+
+
+def _fingerprint(series: Iterable[Tuple[str, pd.Series]]) -> Tuple:
+    """Empreinte du contenu des courbes, utilisée comme clé du cache des figures"""
+    return tuple((name, len(values), int(pd.util.hash_pandas_object(values, index=True).sum()))
+                 for name, values in series)
+
+
+def _cached_figure(key: Tuple, build) -> go.Figure:
+    """Figure en cache, copiée pour que l'appelant puisse la compléter sans modifier l'original"""
+    return go.Figure(figures_cache.get_or_compute(key, build))
+
+
+def line_chart(data: SeriesLike, title: Optional[str] = None, xaxis_title: Optional[str] = None,
+               yaxis_title: Optional[str] = None, legend_title: Optional[str] = None,
+               max_points: int = MAX_POINTS, markers: bool = False) -> go.Figure:
+    """
+    Graphique en lignes d'une ou plusieurs courbes, réduites côté serveur.
+
+    Chaque courbe est réduite indépendamment à max_points points : la taille
+    de la figure envoyée au navigateur ne dépend que du nombre de courbes,
+    pas de leur longueur. Les courbes peuvent avoir des index différents
+    (portefeuilles sur des périodes distinctes, par exemple). La figure est
+    conservée en cache tant que les données ne changent pas.
+
+    Args:
+        data: Série, DataFrame (une courbe par colonne) ou dictionnaire nom -> série
+        title: Titre du graphique
+        xaxis_title: Titre de l'axe des abscisses
+        yaxis_title: Titre de l'axe des ordonnées
+        legend_title: Titre de la légende
+        max_points: Nombre maximal de points par courbe
+        markers: Si True, affiche aussi les points
+
+    Returns:
+        go.Figure: Figure Plotly (copie modifiable)
+    """
+    series = _as_series_dict(data)
+    key = ('line', _fingerprint(series.items()), title, xaxis_title, yaxis_title, legend_title,
+           max_points, markers)
+
+    def build() -> go.Figure:
+        fig = go.Figure()
+        for name, values in series.items():
+            reduced = downsample(values, max_points)
+            fig.add_trace(go.Scatter(x=reduced.index, y=reduced.to_numpy(), name=name,
+                                     mode='lines+markers' if markers else 'lines'))
+        fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title,
+                          legend_title=legend_title, showlegend=len(series) > 1)
+        logger.debug(f"Figure '{title}' : {sum(len(v) for v in series.values())} points réduits "
+                     f"à {sum(len(trace.x) for trace in fig.data)}")
+        return fig
+
+    return _cached_figure(key, build)
+
+
+def fan_chart(bands: pd.DataFrame, title: Optional[str] = None, xaxis_title: Optional[str] = None,
+              yaxis_title: Optional[str] = None, median: Optional[str] = 'p50',
+              intervals: Iterable[Tuple[str, str, str]] = FAN_INTERVALS,
+              overlays: Optional[Dict[str, pd.Series]] = None, max_points: int = MAX_POINTS) -> go.Figure:
+    """
+    Graphique en éventail : intervalles de quantiles remplis, médiane et courbes superposées.
+
+    Les bandes partagent les mêmes abscisses réduites (voir downsample_frame)
+    afin que les zones remplies restent jointives.
+
+    Args:
+        bands: Quantiles par période (colonnes 'p5', 'p25', 'p50'... de project_portfolio)
+        title: Titre du graphique
+        xaxis_title: Titre de l'axe des abscisses
+        yaxis_title: Titre de l'axe des ordonnées
+        median: Colonne tracée en trait plein (None = aucune)
+        intervals: Triplets (borne basse, borne haute, libellé), du plus large au plus étroit
+        overlays: Courbes supplémentaires (trajectoires, portefeuilles), réduites séparément
+        max_points: Nombre maximal de points par courbe
+
+    Returns:
+        go.Figure: Figure Plotly (copie modifiable)
+    """
+    intervals = tuple(intervals)
+    overlays = overlays or {}
+    columns = [column for low, high, _ in intervals for column in (low, high)]
+    if median is not None:
+        columns.append(median)
+    key = ('fan', _fingerprint([(column, bands[column]) for column in columns]),
+           _fingerprint(overlays.items()), title, xaxis_title, yaxis_title, median, intervals, max_points)
+
+    def build() -> go.Figure:
+        reduced = downsample_frame(bands[columns], max_points)
+        fig = go.Figure()
+        for low, high, label in intervals:
+            fig.add_trace(go.Scatter(x=reduced.index, y=reduced[high].to_numpy(), line=dict(width=0),
+                                     showlegend=False))
+            fig.add_trace(go.Scatter(x=reduced.index, y=reduced[low].to_numpy(), fill='tonexty',
+                                     line=dict(width=0), name=label))
+        if median is not None:
+            fig.add_trace(go.Scatter(x=reduced.index, y=reduced[median].to_numpy(), name='Médiane'))
+        for name, values in overlays.items():
+            overlay = downsample(values, max_points)
+            fig.add_trace(go.Scatter(x=overlay.index, y=overlay.to_numpy(), name=name, line=dict(width=1)))
+        fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title)
+        return fig
+
+    return _cached_figure(key, build)
@@ -1,113 +1,390 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
-from datetime import datetime, timedelta
+import os
+from datetime import datetime
 import time
 import logging
-from typing import Optional, Dict, List
-import random
-
-# Configuration du logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_collector.log'),
-        logging.StreamHandler()
-    ]
-)
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Optional, Dict, List, Tuple
+
+from modules.price_provider import PriceProvider, YahooFinanceProvider, RateLimitError
+from modules.rate_limiter import AdaptiveRateLimiter
+from modules.esg_collector import fetch_esg_scores, compute_di_scores, ESG_CACHE_PATH
+from modules.price_store import PriceStore
+from modules.cache import datasets_cache, file_signature, read_excel_cached
+from modules.instrumentation import configure_logging, telemetry
+from modules.returns_matrix import ReturnsMatrix, RETURNS_ROOT
+
 logger = logging.getLogger(__name__)
 
-def download_asset(ticker: str, start_date: str = '2023-01-01', end_date: str = '2024-12-31') -> Optional[pd.DataFrame]:
+# Fichier des actifs et de leurs notes D&I
+ASSETS_FILE = 'data/actifs.xlsx'
+
+# Période et intervalle des rendements téléchargés
+START_DATE = datetime(2022, 1, 1)
+END_DATE = datetime(2024, 12, 31)
+INTERVAL = '1wk'
+
+
+def fetch_batch(provider: PriceProvider, tickers: List[str], limiter: AdaptiveRateLimiter,
+                start_date=START_DATE, end_date=END_DATE, interval: str = INTERVAL,
+                max_retries: int = 3, retry_delay: float = 1.0) -> Dict[str, pd.Series]:
     """
-    Télécharge les données d'un actif depuis Yahoo Finance.
-    
+    Télécharge un lot de tickers en une requête groupée, puis retente les
+    tickers manquants.
+
+    Chaque nouvelle tentative ne porte que sur les tickers encore absents,
+    après une attente qui double d'une tentative à l'autre. Le limiteur n'est
+    relâché que lorsque tous les tickers demandés ont été reçus ; une
+    limitation par la source allonge son intervalle.
+
     Args:
-        ticker: Symbole de l'actif
-        start_date: Date de début au format 'YYYY-MM-DD'
-        end_date: Date de fin au format 'YYYY-MM-DD'
-        
+        provider: Source des prix
+        tickers: Tickers du lot
+        limiter: Limiteur de débit partagé
+        start_date: Date de début
+        end_date: Date de fin
+        interval: Intervalle des cours
+        max_retries: Nombre maximal de tentatives
+        retry_delay: Attente avant la deuxième tentative (en secondes), doublée ensuite
+
     Returns:
-        Optional[pd.DataFrame]: Les données de l'actif ou None en cas d'erreur
+        Dict[str, pd.Series]: Cours de clôture des tickers téléchargés
     """
-    try:
-        # Ajout d'un délai aléatoire entre 1 et 3 secondes pour éviter les limites de requêtes
-        time.sleep(3)
-        
-        # Téléchargement des données avec yfinance
-        stock = yf.Ticker(ticker)
-        info = stock.info
+    # Tentatives infructueuses par ticker, pour la télémétrie
+    retries = dict.fromkeys(tickers, 0)
+    prices: Dict[str, pd.Series] = {}
+    pending = list(tickers)
 
-        # Calcul des rendements hebdomadaires (vendredi soir)
-        start_date = datetime(2022, 1, 1)
-        end_date = datetime(2024, 12, 31)
-        
-        # Télécharger les données avec un intervalle hebdomadaire
-        data = stock.history(start=start_date, end=end_date, interval='1wk')
-        
-        if data.empty:
-            print(f"⚠️ Aucune donnée historique disponible pour {ticker}")
-            return None
+    for attempt in range(1, max_retries + 1):
+        if attempt > 1 and retry_delay > 0:
+            time.sleep(retry_delay * 2 ** (attempt - 2))
+        limiter.wait()
+        start = time.perf_counter()
+        try:
+            received = provider.fetch_prices(pending, start_date, end_date, interval)
+        except RateLimitError as e:
+            # Les tickers obtenus avant la limitation sont conservés, seuls les autres sont retentés
+            logger.warning(f"Limite de requêtes atteinte ({attempt}/{max_retries}) pour "
+                           f"{[ticker for ticker in pending if ticker not in e.prices]}")
+            limiter.on_throttle()
+            received = e.prices
+        except Exception as e:
+            logger.warning(f"Échec de la requête ({attempt}/{max_retries}) pour {pending}: {str(e)}")
+            received = {}
+        latency_ms = (time.perf_counter() - start) * 1000
+        for ticker, series in received.items():
+            telemetry.record_fetch(ticker, latency_ms=latency_ms, retries=retries.get(ticker, 0),
+                                   memory_bytes=int(series.memory_usage(index=True)), batch_size=len(pending))
+        prices.update(received)
 
-        # Calculer les rendements hebdomadaires
-        data['returns'] = data['Close'].pct_change()
-        
-        # Ne garder que la colonne des rendements avec la date en indice
-        data = data[['returns']]
-        
-        data.fillna(0, inplace=True)
-        
-        return data
-        
-    except Exception as e:
-        logger.error(f"Erreur lors du téléchargement des données pour {ticker}: {str(e)}")
-        return None
+        pending = [ticker for ticker in pending if ticker not in received]
+        if not pending:
+            limiter.on_success()
+            break
+        for ticker in pending:
+            retries[ticker] += 1
+
+    for ticker in pending:
+        telemetry.record_fetch(ticker, retries=retries[ticker], ok=False)
+    return prices
+
+
+def fetch_all_prices(tickers: List[str], provider: Optional[PriceProvider] = None,
+                     batch_size: Optional[int] = None, max_workers: int = 4,
+                     limiter: Optional[AdaptiveRateLimiter] = None,
+                     start_date=START_DATE, end_date=END_DATE,
+                     interval: str = INTERVAL,
+                     on_batch: Optional[Callable[[List[str], Dict[str, pd.Series]], None]] = None,
+                     cancel_event: Optional[threading.Event] = None,
+                     retry_delay: float = 1.0) -> Dict[str, pd.Series]:
+    """
+    Télécharge les cours de tous les tickers par lots, en parallèle sur un
+    pool de workers borné.
+
+    Les lots sont traités dans l'ordre où ils se terminent. Après une
+    annulation, les lots non commencés sont abandonnés et seuls ceux déjà en
+    cours sont attendus.
+
+    Args:
+        tickers: Liste des tickers à télécharger
+        provider: Source des prix (Yahoo Finance par défaut)
+        batch_size: Taille des lots (par défaut celle du fournisseur)
+        max_workers: Nombre maximal de requêtes simultanées
+        limiter: Limiteur de débit partagé (un nouveau limiteur par défaut)
+        start_date: Date de début
+        end_date: Date de fin
+        interval: Intervalle des cours
+        on_batch: Fonction appelée pour chaque lot terminé, avec ses tickers et leurs cours
+        cancel_event: Événement d'annulation du téléchargement
+        retry_delay: Attente avant la deuxième tentative d'un lot (voir fetch_batch)
+
+    Returns:
+        Dict[str, pd.Series]: Cours de clôture des tickers téléchargés
+    """
+    provider = provider or YahooFinanceProvider()
+    limiter = limiter or AdaptiveRateLimiter()
+    batch_size = batch_size or provider.max_batch_size
+    batches = [tickers[i:i + batch_size] for i in range(0, len(tickers), batch_size)]
+
+    prices = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        futures = {executor.submit(fetch_batch, provider, batch, limiter,
+                                   start_date, end_date, interval,
+                                   retry_delay=retry_delay): batch for batch in batches}
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            batch_prices = future.result()
+            prices.update(batch_prices)
+            if on_batch is not None:
+                on_batch(futures[future], batch_prices)
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+    return prices
+
+
+def refresh_prices(tickers: List[str], store: PriceStore, provider: Optional[PriceProvider] = None,
+                   batch_size: Optional[int] = None, max_workers: int = 4,
+                   start_date=START_DATE, end_date=END_DATE,
+                   progress: Optional[Callable[[List[str], List[str], bool], None]] = None,
+                   cancel_event: Optional[threading.Event] = None,
+                   limiter: Optional[AdaptiveRateLimiter] = None) -> int:
+    """
+    Complète le stockage local en ne téléchargeant que les périodes manquantes.
+
+    Les tickers sont regroupés par date de début de téléchargement afin de
+    conserver des requêtes multi-tickers. Chaque lot est écrit dans le
+    stockage dès qu'il est reçu : une mise à jour interrompue (annulation,
+    erreur) reprend là où elle s'est arrêtée.
+
+    Args:
+        tickers: Liste des tickers à rafraîchir
+        store: Stockage local des cours
+        provider: Source des prix (Yahoo Finance par défaut)
+        batch_size: Taille des lots de tickers téléchargés ensemble
+        max_workers: Nombre maximal de requêtes simultanées
+        start_date: Date de début de la période couverte
+        end_date: Date de fin de la période couverte
+        progress: Fonction appelée après chaque lot avec les tickers obtenus, ceux en échec et
+            False ; les tickers déjà à jour sont signalés au départ avec True
+        cancel_event: Événement d'annulation ; les lots déjà reçus restent stockés
+        limiter: Limiteur de débit partagé (un nouveau limiteur par défaut)
+
+    Returns:
+        int: Nombre de tickers ayant nécessité un téléchargement
+    """
+    pending: Dict[pd.Timestamp, List[str]] = {}
+    up_to_date = []
+    for ticker in tickers:
+        fetch_start = store.fetch_start(ticker, start_date, end_date)
+        if fetch_start is not None:
+            pending.setdefault(fetch_start, []).append(ticker)
+        else:
+            up_to_date.append(ticker)
+            telemetry.record_fetch(ticker, cache_hit=True)
+    if progress is not None and up_to_date:
+        progress(up_to_date, [], True)
+
+    n_pending = sum(len(group) for group in pending.values())
+    with telemetry.span('download', n_tickers=len(tickers), n_downloaded=n_pending):
+        for fetch_start, group in pending.items():
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            logging.info(f"Téléchargement de {len(group)} actifs à partir du {fetch_start:%Y-%m-%d}")
+
+            def store_batch(batch: List[str], prices: Dict[str, pd.Series], fetch_start=fetch_start):
+                store.append_many(prices, fetch_start, end_date)
+                missing = [t for t in batch if t not in prices]
+                # Tickers déjà stockés pour lesquels la source n'a renvoyé aucun cours
+                store.mark_covered([t for t in missing if store.coverage(t)], end_date)
+                if progress is not None:
+                    progress(list(prices), missing, False)
+
+            fetch_all_prices(group, provider=provider, batch_size=batch_size,
+                             max_workers=max_workers, limiter=limiter, start_date=fetch_start,
+                             end_date=end_date, interval=store.interval,
+                             on_batch=store_batch, cancel_event=cancel_event)
+
+    return n_pending
+
+
+# Traitements possibles des périodes sans cours (voir returns_from_prices)
+MISSING_DATA_POLICIES = ('mask', 'ffill', 'drop')
+
+
+def trading_calendar(prices: Dict[str, pd.Series]) -> pd.DatetimeIndex:
+    """Calendrier de cotation : union triée des dates de cours de tous les actifs"""
+    if not prices:
+        return pd.DatetimeIndex([], name='Date')
+    dates = np.concatenate([series.index.to_numpy(dtype='datetime64[ns]') for series in prices.values()])
+    return pd.DatetimeIndex(np.unique(dates), name='Date')
 
-def update_assets_data():
+
+def align_prices(prices: Dict[str, pd.Series], tickers: List[str], calendar: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Place les cours de chaque actif sur le calendrier, en une passe.
+
+    Returns:
+        np.ndarray: Matrice des cours (dates x tickers), NaN aux dates sans cours
+    """
+    matrix = np.full((len(calendar), len(tickers)), np.nan)
+    for j, ticker in enumerate(tickers):
+        series = prices[ticker]
+        matrix[calendar.get_indexer(series.index), j] = series.to_numpy(dtype=np.float64)
+    return matrix
+
+
+def returns_from_prices(matrix: np.ndarray, calendar: pd.DatetimeIndex,
+                        missing: str = 'mask') -> Tuple[np.ndarray, pd.DatetimeIndex]:
+    """
+    Calcule les rendements d'une matrice de cours alignée sur le calendrier.
+
+    Le rendement de chaque date est mesuré depuis le dernier cours connu, de
+    sorte qu'une période sans cotation ne fait perdre aucune variation. Les
+    dates sans cours sont traitées selon missing :
+    - 'mask' : rendement invalide (NaN), exclu des statistiques et compté
+      comme nul par les backtests (voir backtest.valid_returns) ;
+    - 'ffill' : dernier cours reporté, soit un rendement nul valide ;
+    - 'drop' : dates supprimées du calendrier, dès qu'un actif n'a pas de cours.
+    Avant la première cotation d'un actif, ses rendements sont toujours
+    invalides ; la première ligne (point de départ) l'est pour tous.
+
+    Returns:
+        Tuple[np.ndarray, pd.DatetimeIndex]: Rendements (dates x tickers) et calendrier retenu
+    """
+    if missing not in MISSING_DATA_POLICIES:
+        raise ValueError(f"Traitement des données manquantes inconnu : {missing}")
+
+    observed = ~np.isnan(matrix)
+    if missing == 'drop':
+        complete = observed.all(axis=1)
+        matrix, calendar, observed = matrix[complete], calendar[complete], observed[complete]
+
+    # Dernier cours connu à chaque date (report vers l'avant vectorisé)
+    rows = np.where(observed, np.arange(len(matrix))[:, None], 0)
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    last_prices = np.take_along_axis(matrix, rows, axis=0)
+
+    returns = np.full(matrix.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[1:] = last_prices[1:] / last_prices[:-1] - 1
+    if missing == 'mask':
+        returns[~observed] = np.nan
+    return returns, calendar
+
+
+def build_returns_matrix(assets_df: pd.DataFrame, prices: Dict[str, pd.Series], missing: str = 'mask'):
+    """
+    Assemble la matrice des rendements des actifs disposant de cours.
+
+    Les cours sont alignés en une passe sur le calendrier de cotation commun,
+    puis les rendements sont calculés sur la matrice entière.
+
+    Args:
+        assets_df: DataFrame des actifs
+        prices: Cours de clôture par ticker
+        missing: Traitement des dates sans cours ('mask', 'ffill' ou 'drop', voir returns_from_prices)
+
+    Returns:
+        Tuple: DataFrame des actifs disposant de cours, DataFrame des rendements
+        (une colonne par actif, NaN pour les périodes invalides) et liste des actifs disponibles
+    """
+    with telemetry.span('returns_assembly', n_tickers=len(prices), missing=missing):
+        assets_df = assets_df[assets_df['Ticker'].isin(list(prices))]
+        available_assets = assets_df['Ticker'].tolist()
+
+        calendar = trading_calendar({ticker: prices[ticker] for ticker in available_assets})
+        matrix = align_prices(prices, available_assets, calendar)
+        returns, calendar = returns_from_prices(matrix, calendar, missing)
+        returns_df = pd.DataFrame(returns, index=calendar, columns=available_assets)
+    return assets_df, returns_df, available_assets
+
+
+def update_assets_data(provider: Optional[PriceProvider] = None, batch_size: Optional[int] = None,
+                       max_workers: int = 4, store: Optional[PriceStore] = None, offline: bool = False,
+                       refresh_esg: bool = False, assets_file: str = ASSETS_FILE,
+                       esg_cache_path: str = ESG_CACHE_PATH,
+                       start_date=START_DATE, end_date=END_DATE, interval: str = INTERVAL,
+                       missing: str = 'mask', returns_root: Optional[str] = RETURNS_ROOT,
+                       progress: Optional[Callable[[List[str], List[str], bool], None]] = None,
+                       cancel_event: Optional[threading.Event] = None,
+                       limiter: Optional[AdaptiveRateLimiter] = None):
     """
     Met à jour les données de tous les actifs et sauvegarde les résultats.
+
+    Seules les périodes absentes du stockage local sont téléchargées.
+
+    Args:
+        provider: Source des prix (Yahoo Finance par défaut)
+        batch_size: Taille des lots de tickers téléchargés ensemble
+        max_workers: Nombre maximal de requêtes simultanées
+        store: Stockage local des cours (data/prices par défaut, à l'intervalle interval)
+        offline: Si True, n'utilise que le stockage local, sans accès réseau
+        refresh_esg: Si True, met à jour les notations ESG ; sinon les notations déjà en
+            cache sont appliquées. Les notes D&I sont recalculées dans les deux cas
+        esg_cache_path: Fichier Parquet du cache des notations ESG
+        assets_file: Fichier Excel des actifs
+        start_date: Date de début
+        end_date: Date de fin
+        interval: Intervalle des cours et des rendements ('1d', '1wk', '1mo')
+        missing: Traitement des dates sans cours ('mask', 'ffill' ou 'drop')
+        returns_root: Répertoire des matrices de rendements projetées en mémoire
+            (None = DataFrame float64 en mémoire)
+        progress: Suivi du téléchargement par lot (voir refresh_prices)
+        cancel_event: Événement d'annulation ; None est renvoyé si la mise à jour est annulée
+        limiter: Limiteur de débit partagé par les cours et les notations ESG
+            (un nouveau limiteur par défaut)
+
+    Returns:
+        Tuple: DataFrame des actifs, DataFrame des rendements (float32 projeté en
+        mémoire si returns_root est défini) et liste des actifs disponibles, ou None
     """
     try:
         # Lecture du fichier Excel
-        assets_df = pd.read_excel('data/actifs.xlsx')
-        available_assets=[]
-        # Initialisation du DataFrame pour stocker les rendements
-        returns_data = {}
+        assets_df = read_excel_cached(assets_file)
         
+        tickers = assets_df['Ticker'].tolist()
+        store = store or PriceStore(interval=interval)
+        if not offline:
+            # Téléchargement groupé et concurrent des périodes manquantes
+            refreshed = refresh_prices(tickers, store, provider=provider, batch_size=batch_size,
+                                       max_workers=max_workers, start_date=start_date, end_date=end_date,
+                                       progress=progress, cancel_event=cancel_event, limiter=limiter)
+            logging.info(f"{refreshed} actifs rafraîchis, {len(tickers) - refreshed} déjà à jour")
+        if cancel_event is not None and cancel_event.is_set():
+            logging.info("Mise à jour annulée, les cours reçus sont conservés dans le stockage local")
+            return None
+        # Notations ESG rafraîchies si demandé, sinon celles du cache, sans accès réseau
+        esg_scores = fetch_esg_scores(tickers, cache_path=esg_cache_path, max_workers=max_workers,
+                                      limiter=limiter, offline=offline or not refresh_esg)
+        if not esg_scores.empty:
+            logging.info(f"Notations ESG disponibles pour {len(esg_scores)} actifs")
+            assets_df = compute_di_scores(assets_df, esg_scores)
+        prices = store.load_all(tickers, start_date, end_date)
         
-        # Téléchargement des données pour chaque actif
-        for index, row in assets_df.iterrows():
-            ticker = row['Ticker']
-            logging.info(f"Téléchargement des données pour {ticker}")
-            
-            data = download_asset(ticker)
-
-            if data is not None:
-                returns_data[ticker] = data['returns']
-                available_assets.append(ticker)
-            else:
-                assets_df=assets_df.drop(index=index)
-                logging.error(f"Erreur lors du téléchargement des données pour {ticker}")
+        if not offline:
+            for ticker in tickers:
+                if ticker not in prices:
+                    logging.error(f"Erreur lors du téléchargement des données pour {ticker}")
         # Création du DataFrame final
-        if returns_data:
-            # Créer un DataFrame avec toutes les dates uniques
-            
-            returns_df = pd.DataFrame()
-            
-            # Ajouter les rendements de chaque actif
-            for ticker, returns in returns_data.items():
-                returns_df[ticker] = returns
-            
-            returns_df.fillna(0, inplace=True)  
-            # Sauvegarde des données
-            returns_df.to_csv('data/returns.csv')
-            logging.info("Données sauvegardées avec succès")
-            
-            print(assets_df)
-            print(returns_df)
-            print(available_assets)
+        if prices:
+            assets_df, returns_df, available_assets = build_returns_matrix(assets_df, prices, missing)
+            # Version du jeu de données, utilisée comme clé par les caches
+            returns_df.attrs['version'] = f"{store.root}:{store.version}:{start_date}:{end_date}:{missing}"
+            returns_df.attrs['interval'] = store.interval
+            if returns_root is not None:
+                # Une seule copie float32 sur disque, partagée par les sessions et les processus
+                returns_df = ReturnsMatrix.write(returns_df, root=returns_root).to_frame()
+            logging.info(f"Données chargées avec succès : {len(available_assets)} actifs, "
+                         f"{len(returns_df)} périodes")
 
             return assets_df, returns_df, available_assets
+        elif offline:
+            logging.info("Aucune donnée stockée localement")
+            return None
         else:
             logging.error("Aucune donnée n'a pu être téléchargée")
             return None
@@ -116,6 +393,28 @@ def update_assets_data():
         logging.error(f"Erreur lors de la mise à jour des données: {str(e)}")
         return None
 
-if __name__ == "__main__":
-    update_assets_data() 
 
+def load_assets_data(store: Optional[PriceStore] = None, interval: str = INTERVAL, missing: str = 'mask'):
+    """
+    Charge les données des actifs depuis le stockage local, sans accès réseau.
+
+    Le résultat est partagé entre les sessions et recalculé uniquement si le
+    fichier des actifs ou le stockage des cours ont changé.
+
+    Args:
+        store: Stockage local des cours (data/prices par défaut)
+        interval: Intervalle des cours et des rendements ('1d', '1wk', '1mo')
+        missing: Traitement des dates sans cours ('mask', 'ffill' ou 'drop')
+
+    Returns:
+        Les mêmes éléments que update_assets_data, ou None si le stockage est vide
+    """
+    store = store or PriceStore(interval=interval)
+    esg_signature = file_signature(ESG_CACHE_PATH) if os.path.exists(ESG_CACHE_PATH) else None
+    key = ('assets_data', file_signature(ASSETS_FILE), esg_signature, store.root, store.version,
+           START_DATE, END_DATE, missing)
+    return datasets_cache.get_or_compute(key, lambda: update_assets_data(store=store, offline=True, missing=missing))
+
+if __name__ == "__main__":
+    configure_logging()
+    update_assets_data()
\ No newline at end of file
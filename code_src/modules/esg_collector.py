@@ -0,0 +1,194 @@
+import pandas as pd
+import numpy as np
+import yfinance as yf
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from modules.rate_limiter import AdaptiveRateLimiter
+from modules.price_provider import RateLimitError, is_rate_limit_message
+
+logger = logging.getLogger(__name__)
+
+# Pondération des labels et engagements dans la note D&I (voir README).
+# L'intitulé de la colonne 'Charte de la Diversité ' comporte une espace finale dans le fichier des actifs.
+LABEL_WEIGHTS = {
+    'Label Diversité': 1.2,
+    'Label Égalité Pro H/F': 1.2,
+    'Top Employer France': 0.5,
+    'Collectif Economie plus Inclusive': 1.0,
+    'Charte de la Diversité ': 1.0,
+}
+SOCIAL_SCORE_COLUMN = 'Score Social YahooFinance'
+SOCIAL_SCORE_NORMALIZED_COLUMN = 'Score Social YahooFinance normalisé'
+CONTROVERSY_COLUMN = 'Niveau de controverse Yahoo.Finance'
+FRENCH_COMPANY_COLUMN = 'Boite française'
+CONTROVERSY_WEIGHT = 0.5
+# Le fichier des actifs majore de moitié la pénalité de controverse des entreprises françaises
+FRENCH_CONTROVERSY_FACTOR = 1.5
+# Échelle Sustainalytics du niveau de controverse (1 : négligeable à 5 : sévère)
+MAX_CONTROVERSY_LEVEL = 5
+
+ESG_CACHE_PATH = os.path.join('data', 'esg', 'esg_scores.parquet')
+# Les notations Sustainalytics évoluent rarement : longue durée de validité
+ESG_CACHE_TTL = timedelta(days=30)
+
+# Résultat d'une requête en échec (quota épuisé, erreur réseau ou réponse illisible),
+# distinct de None qui signale un actif non couvert
+_FETCH_FAILED = object()
+
+
+class YahooEsgProvider:
+    """Source des notations Sustainalytics publiées par Yahoo Finance."""
+
+    def fetch(self, ticker: str) -> Optional[Dict[str, float]]:
+        """
+        Récupère le score de risque social et le niveau de controverse d'un actif.
+
+        Returns:
+            Optional[Dict[str, float]]: Clés 'social_score' et 'controversy_level',
+            ou None si l'actif n'est pas couvert
+
+        Raises:
+            RateLimitError: Si la source refuse la requête pour cause de quota
+            Exception: Toute autre erreur de la requête ou de lecture de la réponse
+        """
+        try:
+            sustainability = yf.Ticker(ticker).sustainability
+        except Exception as e:
+            if is_rate_limit_message(f"{type(e).__name__}: {str(e)}"):
+                raise RateLimitError(str(e)) from e
+            raise
+
+        if sustainability is None or sustainability.empty:
+            return None
+        scores = sustainability.iloc[:, 0]
+        if 'socialScore' not in scores or 'highestControversy' not in scores:
+            return None
+        return {
+            'social_score': float(scores['socialScore']),
+            'controversy_level': float(scores['highestControversy']),
+        }
+
+
+def _read_esg_cache(path: str) -> pd.DataFrame:
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['social_score', 'controversy_level', 'fetched_at'],
+                            index=pd.Index([], name='Ticker'))
+    return pd.read_parquet(path)
+
+
+def fetch_esg_scores(tickers: List[str], provider: Optional[YahooEsgProvider] = None,
+                     cache_path: str = ESG_CACHE_PATH, ttl: timedelta = ESG_CACHE_TTL,
+                     max_workers: int = 4, limiter: Optional[AdaptiveRateLimiter] = None,
+                     max_retries: int = 3, offline: bool = False) -> pd.DataFrame:
+    """
+    Récupère les notations ESG de tous les actifs, en réutilisant le cache disque.
+
+    Seuls les actifs absents du cache ou dont la notation a expiré sont
+    interrogés, en parallèle et sous le même limiteur de débit que les prix.
+    Hors ligne, les notations en cache sont renvoyées quel que soit leur âge.
+
+    Args:
+        tickers: Liste des tickers
+        provider: Source des notations (Yahoo Finance par défaut)
+        cache_path: Fichier Parquet du cache des notations
+        ttl: Durée de validité d'une notation en cache
+        max_workers: Nombre maximal de requêtes simultanées
+        limiter: Limiteur de débit partagé
+        max_retries: Nombre maximal de tentatives par actif
+        offline: Si True, n'utilise que le cache, sans accès réseau
+
+    Returns:
+        pd.DataFrame: Colonnes 'social_score', 'controversy_level' et 'fetched_at',
+        indexées par ticker (les actifs non couverts sont absents)
+    """
+    provider = provider or YahooEsgProvider()
+    limiter = limiter or AdaptiveRateLimiter()
+    cache = _read_esg_cache(cache_path)
+
+    expiry = pd.Timestamp(datetime.now() - ttl)
+    fresh = cache.index[pd.to_datetime(cache['fetched_at']) >= expiry]
+    stale = [ticker for ticker in tickers if ticker not in fresh]
+
+    def request(ticker: str):
+        for attempt in range(1, max_retries + 1):
+            limiter.wait()
+            try:
+                scores = provider.fetch(ticker)
+                limiter.on_success()
+                return scores
+            except RateLimitError:
+                logger.warning(f"Limite de requêtes atteinte ({attempt}/{max_retries}) pour {ticker}")
+                limiter.on_throttle()
+            except Exception as e:
+                logger.warning(f"Notation ESG indisponible pour {ticker}: {str(e)}")
+                return _FETCH_FAILED
+        return _FETCH_FAILED
+
+    if stale and not offline:
+        logger.info(f"Récupération des notations ESG pour {len(stale)} actifs")
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(stale)))) as executor:
+            results = dict(zip(stale, executor.map(request, stale)))
+
+        # Les actifs non couverts sont conservés (valeurs manquantes) pour ne pas
+        # être interrogés à nouveau avant l'expiration du cache ; les requêtes en
+        # échec n'y sont pas inscrites et seront retentées à la prochaine mise à jour
+        failed = [ticker for ticker, scores in results.items() if scores is _FETCH_FAILED]
+        if failed:
+            logger.warning(f"Notations ESG non récupérées pour {len(failed)} actifs, "
+                           f"retentées à la prochaine mise à jour")
+        empty = {'social_score': np.nan, 'controversy_level': np.nan}
+        received = {ticker: scores or empty for ticker, scores in results.items() if scores is not _FETCH_FAILED}
+        if received:
+            fetched = pd.DataFrame.from_dict(received, orient='index')
+            fetched['fetched_at'] = datetime.now().isoformat(timespec='seconds')
+            fetched.index.name = 'Ticker'
+            cache = pd.concat([cache[~cache.index.isin(fetched.index)], fetched])
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            cache.to_parquet(cache_path)
+
+    return cache[cache.index.isin(tickers)].dropna(subset=['social_score', 'controversy_level'])
+
+
+def compute_di_scores(assets_df: pd.DataFrame, esg_scores: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Calcule la note D&I de chaque actif selon la formule du README.
+
+    Note = somme pondérée des labels - score social normalisé
+    - 0,5 x niveau de controverse normalisé. Le score social est normalisé
+    entre le minimum et le maximum de l'univers, le niveau de controverse
+    par le maximum de l'échelle Sustainalytics ; comme dans le fichier des
+    actifs, la pénalité de controverse des entreprises françaises est
+    majorée (FRENCH_CONTROVERSY_FACTOR). Le calcul est vectorisé sur
+    l'ensemble des actifs.
+
+    Args:
+        assets_df: DataFrame des actifs avec les colonnes de labels et de risques
+        esg_scores: Notations récentes (voir fetch_esg_scores) remplaçant celles du fichier
+
+    Returns:
+        pd.DataFrame: Copie de assets_df avec les risques, le score normalisé et la note mis à jour
+    """
+    df = assets_df.copy()
+    if esg_scores is not None and not esg_scores.empty:
+        tickers = df['Ticker']
+        social = tickers.map(esg_scores['social_score'])
+        controversy = tickers.map(esg_scores['controversy_level'])
+        df[SOCIAL_SCORE_COLUMN] = social.fillna(df[SOCIAL_SCORE_COLUMN])
+        df[CONTROVERSY_COLUMN] = controversy.fillna(df[CONTROVERSY_COLUMN])
+
+    social = df[SOCIAL_SCORE_COLUMN].to_numpy(dtype=np.float64)
+    spread = np.nanmax(social) - np.nanmin(social)
+    social_normalized = (social - np.nanmin(social)) / spread if spread > 0 else np.zeros_like(social)
+    controversy_normalized = df[CONTROVERSY_COLUMN].to_numpy(dtype=np.float64) / MAX_CONTROVERSY_LEVEL
+    if FRENCH_COMPANY_COLUMN in df:
+        french = df[FRENCH_COMPANY_COLUMN].fillna(0).to_numpy(dtype=np.float64)
+        controversy_normalized *= 1 + (FRENCH_CONTROVERSY_FACTOR - 1) * french
+
+    labels = df[list(LABEL_WEIGHTS)].to_numpy(dtype=np.float64) @ np.array(list(LABEL_WEIGHTS.values()))
+    df[SOCIAL_SCORE_NORMALIZED_COLUMN] = social_normalized
+    df['Note'] = labels - social_normalized - CONTROVERSY_WEIGHT * controversy_normalized
+    return df
@@ -0,0 +1,202 @@
+import pandas as pd
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = 'data_collector.log'
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
+TELEMETRY_FILE = os.path.join('data', 'telemetry.jsonl')
+
+_logging_configured = False
+_logging_lock = threading.Lock()
+
+
+def configure_logging(level: int = logging.INFO, log_file: Optional[str] = LOG_FILE):
+    """
+    Configure une seule fois la journalisation de l'application.
+
+    Appelée par les points d'entrée (pages Streamlit, scripts) ; les modules
+    se contentent de logging.getLogger(__name__).
+
+    Args:
+        level: Niveau de journalisation
+        log_file: Fichier du journal (None = console uniquement)
+    """
+    global _logging_configured
+    with _logging_lock:
+        if _logging_configured:
+            return
+        handlers = [logging.StreamHandler()]
+        if log_file:
+            handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+        root = logging.getLogger()
+        for handler in handlers:
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            root.addHandler(handler)
+        root.setLevel(level)
+        _logging_configured = True
+
+
+class Telemetry:
+    """
+    Mesures des chemins critiques, émises en lignes JSON.
+
+    Deux types d'événements sont enregistrés : les intervalles chronométrés
+    ('span' : téléchargement, assemblage des rendements, sélection,
+    backtest, affichage) et les téléchargements par ticker ('fetch' :
+    latence, tentatives, taille en mémoire des cours, réutilisation du
+    stockage local). Les derniers événements sont conservés en mémoire pour
+    la synthèse affichée dans la page ; tous sont ajoutés au fichier JSONL
+    par lots, hors du chemin des requêtes, et à la fin du processus. Le
+    fichier dépassant max_file_bytes est renommé en '.1' (remplaçant
+    l'archive précédente) avant l'écriture suivante.
+    """
+
+    # Nombre d'événements en attente déclenchant l'écriture du fichier
+    FLUSH_EVERY = 256
+
+    def __init__(self, path: Optional[str] = TELEMETRY_FILE, max_events: int = 20000,
+                 max_file_bytes: int = 10 * 2 ** 20):
+        """
+        Args:
+            path: Fichier JSONL des événements (None = mémoire uniquement)
+            max_events: Nombre d'événements conservés en mémoire
+            max_file_bytes: Taille au-delà de laquelle le fichier est archivé
+        """
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self._events = deque(maxlen=max_events)
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def _emit(self, event: Dict[str, Any]):
+        event['timestamp'] = datetime.now().isoformat(timespec='milliseconds')
+        with self._lock:
+            self._events.append(event)
+            if self.path is not None:
+                self._pending.append(event)
+            if len(self._pending) >= self.FLUSH_EVERY:
+                self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending or self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_file_bytes:
+                os.replace(self.path, self.path + '.1')
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for event in self._pending:
+                    f.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+        except OSError as e:
+            logger.warning(f"Écriture de la télémétrie impossible: {str(e)}")
+        self._pending.clear()
+
+    def flush(self):
+        """Écrit les événements en attente dans le fichier JSONL"""
+        with self._lock:
+            self._flush_locked()
+
+    @contextmanager
+    def span(self, name: str, **fields) -> Iterator[Dict[str, Any]]:
+        """
+        Chronomètre un bloc de code.
+
+        Le dictionnaire renvoyé peut être complété dans le bloc (nombre
+        d'actifs, succès du cache...) ; il est enregistré avec la durée.
+
+        Exemple :
+            with telemetry.span('backtest', n_assets=5) as fields:
+                ...
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield fields
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            event = {'type': 'span', 'name': name,
+                     'duration_ms': round((time.perf_counter() - start) * 1000, 3), **fields}
+            if error is not None:
+                event['error'] = error
+            self._emit(event)
+
+    def record_fetch(self, ticker: str, latency_ms: float = 0.0, retries: int = 0, memory_bytes: int = 0,
+                     cache_hit: bool = False, ok: bool = True, **fields):
+        """
+        Enregistre le téléchargement des cours d'un ticker.
+
+        Args:
+            ticker: Ticker concerné
+            latency_ms: Durée de la requête ayant renvoyé le ticker (partagée par le lot)
+            retries: Nombre de tentatives supplémentaires
+            memory_bytes: Taille en mémoire des cours reçus (Series pandas, index compris)
+            cache_hit: True si le stockage local couvrait déjà la période
+            ok: False si aucune donnée n'a pu être obtenue
+        """
+        self._emit({'type': 'fetch', 'ticker': ticker, 'latency_ms': round(latency_ms, 3), 'retries': retries,
+                    'memory_bytes': memory_bytes, 'cache_hit': cache_hit, 'ok': ok, **fields})
+
+    def events(self, type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Derniers événements conservés en mémoire, éventuellement filtrés par type"""
+        with self._lock:
+            events = list(self._events)
+        return [event for event in events if type is None or event['type'] == type]
+
+    def span_summary(self) -> pd.DataFrame:
+        """
+        Synthèse des intervalles chronométrés.
+
+        Returns:
+            pd.DataFrame: Par nom d'intervalle, nombre d'appels, durées totale, moyenne,
+            95e centile et maximale (ms), triée par durée totale décroissante
+        """
+        spans = pd.DataFrame(self.events('span'), columns=['name', 'duration_ms'])
+        if spans.empty:
+            return pd.DataFrame(columns=['calls', 'total_ms', 'mean_ms', 'p95_ms', 'max_ms'])
+        grouped = spans.groupby('name')['duration_ms']
+        summary = pd.DataFrame({
+            'calls': grouped.count(),
+            'total_ms': grouped.sum(),
+            'mean_ms': grouped.mean(),
+            'p95_ms': grouped.quantile(0.95),
+            'max_ms': grouped.max(),
+        })
+        return summary.sort_values('total_ms', ascending=False)
+
+    def fetch_summary(self) -> Dict[str, float]:
+        """
+        Synthèse des téléchargements par ticker.
+
+        Returns:
+            Dict[str, float]: Nombre de tickers, réutilisations du stockage local, échecs,
+            tentatives supplémentaires, taille en mémoire des cours reçus (octets), latences moyenne et maximale (ms)
+        """
+        fetches = pd.DataFrame(self.events('fetch'),
+                               columns=['latency_ms', 'retries', 'memory_bytes', 'cache_hit', 'ok'])
+        downloaded = fetches[~fetches['cache_hit'].astype(bool)]
+        return {
+            'tickers': len(fetches),
+            'cache_hits': int(fetches['cache_hit'].astype(bool).sum()),
+            'failures': int((~fetches['ok'].astype(bool)).sum()),
+            'retries': int(fetches['retries'].sum()),
+            'memory_bytes': int(fetches['memory_bytes'].sum()),
+            'mean_latency_ms': float(downloaded['latency_ms'].mean()) if len(downloaded) else 0.0,
+            'max_latency_ms': float(downloaded['latency_ms'].max()) if len(downloaded) else 0.0,
+        }
+
+
+# Télémétrie partagée par tout le processus
+telemetry = Telemetry()
+atexit.register(telemetry.flush)
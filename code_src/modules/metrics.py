@@ -0,0 +1,213 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, Tuple, Union
+
+from modules.backtest import PERIODS_PER_YEAR
+
+# Métriques glissantes calculées par RollingMetrics
+ROLLING_METRICS = ('volatility', 'sharpe_ratio', 'sortino_ratio', 'drawdown', 'max_drawdown')
+
+
+def _block_scan(values: np.ndarray, size: int, reverse: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Plus haut, plus bas et plus forte baisse de chaque préfixe (ou suffixe) au sein de blocs de size lignes.
+
+    Args:
+        values: Log-valeurs, de forme (blocs x size, n)
+        size: Nombre de lignes par bloc
+        reverse: Si True, agrège chaque ligne avec la fin de son bloc plutôt qu'avec son début
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: Plus haut, plus bas et plus forte baisse
+        (plus haut moins plus bas ultérieur) de chaque préfixe ou suffixe, de même forme que values
+    """
+    blocks = values.reshape(-1, size, values.shape[1])
+    if reverse:
+        blocks = blocks[:, ::-1]
+    running_max = np.maximum.accumulate(blocks, axis=1)
+    running_min = np.minimum.accumulate(blocks, axis=1)
+    # Dans un préfixe, la baisse se mesure depuis le plus haut qui précède ; dans un suffixe
+    # (parcouru à rebours), depuis chaque point jusqu'au plus bas qui le suit
+    drops = blocks - running_min if reverse else running_max - blocks
+    drop = np.maximum.accumulate(drops, axis=1)
+    results = (running_max, running_min, drop)
+    if reverse:
+        results = tuple(result[:, ::-1] for result in results)
+    return tuple(result.reshape(-1, result.shape[-1]) for result in results)
+
+
+def rolling_max_drop(log_wealth: np.ndarray, points: int) -> np.ndarray:
+    """
+    Plus forte baisse (plus haut moins plus bas ultérieur) de chaque fenêtre de points lignes consécutives.
+
+    La série est découpée en blocs de la longueur d'une fenêtre : toute
+    fenêtre est la réunion de la fin d'un bloc et du début du suivant, dont
+    les agrégats (plus haut, plus bas, plus forte baisse) sont obtenus par
+    cumuls au sein des blocs. La plus forte baisse de la fenêtre est la plus
+    forte des deux, ou la baisse du plus haut de la première partie au plus
+    bas de la seconde. Le coût est en O(T) quelle que soit la fenêtre.
+
+    Args:
+        log_wealth: Log-valeurs, de forme (T, n)
+        points: Nombre de lignes par fenêtre
+
+    Returns:
+        np.ndarray: Plus forte baisse des T - points + 1 fenêtres, de forme (T - points + 1, n)
+    """
+    total = len(log_wealth)
+    # Complément par la dernière ligne, sans effet sur les plus hauts, plus bas et baisses des suffixes
+    padded = np.vstack((log_wealth, np.repeat(log_wealth[-1:], -total % points, axis=0)))
+    _, prefix_min, prefix_drop = _block_scan(padded, points)
+    suffix_max, _, suffix_drop = _block_scan(padded, points, reverse=True)
+
+    start = np.arange(total - points + 1)
+    end = start + points - 1
+    crossing = np.maximum(np.maximum(suffix_drop[start], prefix_drop[end]), suffix_max[start] - prefix_min[end])
+    # Une fenêtre alignée sur un bloc est entièrement décrite par le suffixe de sa première ligne
+    aligned = (start % points == 0)[:, None]
+    return np.where(aligned, suffix_drop[start], crossing)
+
+
+class RollingMetrics:
+    """
+    Métriques de risque glissantes, mises à jour de façon incrémentale.
+
+    Volatilité, ratio de Sharpe et ratio de Sortino sont obtenus par
+    différences de sommes cumulées (rendements, carrés, carrés négatifs),
+    dont les w dernières valeurs sont conservées dans un tampon circulaire :
+    chaque nouvelle période coûte O(1) par série. Le drawdown courant est
+    mesuré depuis le plus haut historique (pic courant), également en O(1).
+    Le drawdown maximal sur la fenêtre glissante est recalculé sur les w + 1
+    dernières log-valeurs suivies des nouvelles périodes (voir
+    rolling_max_drop) : un appel coûte O(w + m), soit O(1) amorti par période
+    lorsque les périodes sont ajoutées par blocs d'au moins w. L'état
+    conservé se limite à la dernière fenêtre, de sorte que l'ajout de
+    nouvelles semaines ne recalcule jamais l'historique.
+
+    Un même objet traite une série (vecteur de rendements) ou un lot de
+    séries (matrice périodes x portefeuilles).
+    """
+
+    def __init__(self, window: int = 26, periods_per_year: int = PERIODS_PER_YEAR,
+                 risk_free_rate: float = 0.0):
+        """
+        Args:
+            window: Nombre de périodes de la fenêtre glissante
+            periods_per_year: Nombre de périodes par an
+            risk_free_rate: Taux sans risque annuel (en décimal)
+        """
+        if window < 2:
+            raise ValueError("La fenêtre doit contenir au moins deux périodes")
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.risk_free_rate = risk_free_rate
+        self.n_periods = 0
+        # État : sommes cumulées depuis le début et leurs w dernières valeurs (tampon circulaire
+        # indexé par le numéro de période modulo w), dernières log-valeurs et plus haut courant
+        self._totals = None
+        self._cumulative = None
+        self._tail_log_wealth = None
+        self._peak = None
+
+    def update(self, returns: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Ajoute de nouvelles périodes et calcule leurs métriques.
+
+        Args:
+            returns: Rendements des nouvelles périodes, de forme (m,) ou (m, n)
+
+        Returns:
+            Dict[str, np.ndarray]: Une entrée par métrique (voir ROLLING_METRICS), de même
+            forme que returns ; NaN tant que la fenêtre n'est pas remplie. Les ratios et la
+            volatilité sont annualisés, volatilité et drawdowns en pourcentage.
+        """
+        returns = np.asarray(returns, dtype=np.float64)
+        single = returns.ndim == 1
+        block = returns.reshape(len(returns), -1)
+        m, n = block.shape
+        w = self.window
+        if self._totals is None:
+            self._totals = np.zeros((3, n))
+            self._cumulative = np.zeros((w, 3, n))
+            self._tail_log_wealth = np.zeros((1, n))
+            self._peak = np.zeros(n)
+
+        # Sommes cumulées (rendements, carrés, carrés négatifs) jusqu'à chaque nouvelle période
+        stats = np.stack((block, block ** 2, np.minimum(block, 0) ** 2), axis=1)
+        cumulative = self._totals + np.cumsum(stats, axis=0)
+        # Sommes cumulées au début de chaque fenêtre : dans le tampon ou parmi les nouvelles périodes
+        periods = self.n_periods + np.arange(1, m + 1)
+        first = periods - w
+        stored = first <= self.n_periods
+        window_start = np.empty_like(cumulative)
+        window_start[stored] = self._cumulative[first[stored] % w]
+        window_start[~stored] = cumulative[first[~stored] - self.n_periods - 1]
+        s1, s2, s_down = (cumulative - window_start).transpose(1, 0, 2)
+        filled = periods >= w
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = s1 / w
+            variance = np.clip((s2 - w * mean ** 2) / (w - 1), 0, None)
+            downside = np.sqrt(s_down / w * self.periods_per_year)
+            volatility = np.sqrt(variance * self.periods_per_year)
+            excess = mean * self.periods_per_year - self.risk_free_rate
+            sharpe = np.where(volatility > 0, excess / volatility, 0.0)
+            sortino = np.where(downside > 0, excess / downside, 0.0)
+
+        # Drawdown depuis le plus haut courant, en log-valeur pour la stabilité numérique
+        log_wealth = self._tail_log_wealth[-1] + np.cumsum(np.log1p(block), axis=0)
+        peak = np.maximum.accumulate(np.vstack((self._peak, log_wealth)), axis=0)[1:]
+        drawdown = np.expm1(log_wealth - peak)
+
+        # Drawdown maximal sur la fenêtre : plus forte baisse entre w + 1 log-valeurs consécutives
+        history = np.vstack((self._tail_log_wealth, log_wealth))
+        max_drawdown = np.full((m, n), np.nan)
+        if len(history) > w:
+            drops = rolling_max_drop(history, w + 1)[-m:]
+            max_drawdown[m - len(drops):] = np.expm1(-drops)
+
+        for values in (volatility, sharpe, sortino):
+            values[~filled] = np.nan
+
+        # Mise à jour de l'état : seule la dernière fenêtre est conservée
+        kept = min(m, w)
+        self._cumulative[periods[-kept:] % w] = cumulative[-kept:]
+        self._totals = cumulative[-1]
+        self._tail_log_wealth = history[-(w + 1):]
+        self._peak = peak[-1]
+        self.n_periods += m
+
+        results = {
+            'volatility': volatility * 100,
+            'sharpe_ratio': sharpe,
+            'sortino_ratio': sortino,
+            'drawdown': drawdown * 100,
+            'max_drawdown': max_drawdown * 100,
+        }
+        if single:
+            results = {name: values[:, 0] for name, values in results.items()}
+        return results
+
+
+def rolling_metrics(returns: Union[pd.Series, pd.DataFrame], window: int = 26,
+                    periods_per_year: int = PERIODS_PER_YEAR,
+                    risk_free_rate: float = 0.0) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Calcule les métriques glissantes d'un ou plusieurs portefeuilles en une passe.
+
+    Args:
+        returns: Rendements d'un portefeuille (Series) ou de plusieurs (DataFrame, une colonne par portefeuille)
+        window: Nombre de périodes de la fenêtre glissante
+        periods_per_year: Nombre de périodes par an
+        risk_free_rate: Taux sans risque annuel (en décimal)
+
+    Returns:
+        pd.DataFrame (une colonne par métrique) pour une Series, ou
+        Dict[str, pd.DataFrame] (une entrée par métrique) pour un DataFrame
+    """
+    engine = RollingMetrics(window, periods_per_year, risk_free_rate)
+    results = engine.update(returns.to_numpy(dtype=np.float64))
+    if isinstance(returns, pd.Series):
+        return pd.DataFrame(results, index=returns.index)
+    return {name: pd.DataFrame(values, index=returns.index, columns=returns.columns)
+            for name, values in results.items()}
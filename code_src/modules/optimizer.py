@@ -0,0 +1,283 @@
+import pandas as pd
+import numpy as np
+import logging
+from scipy.optimize import minimize, linprog
+from typing import Dict, List, Optional, Tuple
+
+from modules.backtest import PERIODS_PER_YEAR
+
+logger = logging.getLogger(__name__)
+
+
+class MomentCache:
+    """
+    Moments des rendements (moyenne et covariance annualisées), calculés une
+    seule fois pour un DataFrame de rendements puis réutilisés pour tous les
+    sous-ensembles d'actifs.
+    """
+
+    def __init__(self, returns_df: pd.DataFrame, periods_per_year: int = PERIODS_PER_YEAR):
+        """
+        Args:
+            returns_df: DataFrame des rendements (une colonne par actif), NaN pour les périodes invalides
+            periods_per_year: Nombre de périodes par an
+        """
+        # La première ligne est le point de départ des backtests, sans rendement réalisé
+        returns = returns_df.iloc[1:].to_numpy(dtype=np.float64)
+        self.assets = list(returns_df.columns)
+        self._positions = {asset: i for i, asset in enumerate(self.assets)}
+        n = len(self.assets)
+
+        valid = ~np.isnan(returns)
+        if valid.all():
+            self.mean = returns.mean(axis=0) * periods_per_year
+            self.cov = np.cov(returns, rowvar=False, ddof=1).reshape(n, n) * periods_per_year
+            return
+
+        # Périodes invalides exclues : moyenne par actif, covariance sur les périodes communes à chaque paire
+        counts = valid.sum(axis=0)
+        mean = np.where(counts > 0, np.where(valid, returns, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        centered = np.where(valid, returns - mean, 0.0)
+        pair_counts = valid.T.astype(np.float64) @ valid.astype(np.float64)
+        cov = centered.T @ centered / np.maximum(pair_counts - 1, 1)
+        # La covariance par paires peut perdre la semi-définie positivité : valeurs propres négatives ramenées à 0
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        if eigenvalues.min() < 0:
+            cov = (eigenvectors * eigenvalues.clip(min=0)) @ eigenvectors.T
+        self.mean = mean * periods_per_year
+        self.cov = cov * periods_per_year
+
+    @classmethod
+    def from_moments(cls, assets: List[str], mean: np.ndarray, cov: np.ndarray) -> 'MomentCache':
+        """
+        Moments déjà calculés (par exemple sur une fenêtre d'apprentissage, voir walk_forward).
+
+        Args:
+            assets: Liste des actifs
+            mean: Moyennes annualisées
+            cov: Matrice de covariance annualisée
+        """
+        cache = cls.__new__(cls)
+        cache.assets = list(assets)
+        cache._positions = {asset: i for i, asset in enumerate(cache.assets)}
+        cache.mean = np.asarray(mean, dtype=np.float64)
+        cache.cov = np.asarray(cov, dtype=np.float64)
+        return cache
+
+    def moments(self, assets: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne la moyenne et la covariance annualisées d'un sous-ensemble d'actifs.
+
+        Args:
+            assets: Liste des actifs
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Vecteur des moyennes et matrice de covariance
+        """
+        idx = np.array([self._positions[asset] for asset in assets], dtype=int)
+        return self.mean[idx], self.cov[np.ix_(idx, idx)]
+
+
+class PortfolioOptimizer:
+    """
+    Optimiseur moyenne-variance sous contraintes de score D&I et de taille.
+
+    Les poids sont positifs, somment à 1 et peuvent être plafonnés. Une
+    contrainte optionnelle impose un score D&I moyen pondéré minimal.
+    """
+
+    def __init__(self, returns_df: Optional[pd.DataFrame], notes: pd.Series,
+                 periods_per_year: int = PERIODS_PER_YEAR, risk_free_rate: float = 0.0,
+                 moments: Optional[MomentCache] = None):
+        """
+        Args:
+            returns_df: DataFrame des rendements (une colonne par actif), inutile si moments est fourni
+            notes: Note D&I de chaque actif, indexée par ticker
+            periods_per_year: Nombre de périodes par an
+            risk_free_rate: Taux sans risque annuel (en décimal)
+            moments: Moments déjà calculés (par défaut calculés sur returns_df)
+        """
+        self.moments = moments if moments is not None else MomentCache(returns_df, periods_per_year)
+        self.notes = notes
+        self.risk_free_rate = risk_free_rate
+
+    def _constraints(self, notes: np.ndarray, min_score: Optional[float],
+                     mean: Optional[np.ndarray] = None, target_return: Optional[float] = None) -> List[Dict]:
+        constraints = [{
+            'type': 'eq',
+            'fun': lambda w: w.sum() - 1.0,
+            'jac': lambda w: np.ones_like(w),
+        }]
+        if min_score is not None:
+            constraints.append({
+                'type': 'ineq',
+                'fun': lambda w: w @ notes - min_score,
+                'jac': lambda w: notes,
+            })
+        if target_return is not None:
+            constraints.append({
+                'type': 'eq',
+                'fun': lambda w: w @ mean - target_return,
+                'jac': lambda w: mean,
+            })
+        return constraints
+
+    @staticmethod
+    def _max_linear(values: np.ndarray, notes: np.ndarray, min_score: Optional[float], max_weight: float) -> float:
+        """Valeur maximale de values·w sur l'ensemble des poids admissibles (programme linéaire)"""
+        n = len(values)
+        result = linprog(
+            -values,
+            A_ub=None if min_score is None else -notes.reshape(1, -1),
+            b_ub=None if min_score is None else [-min_score],
+            A_eq=np.ones((1, n)),
+            b_eq=[1.0],
+            bounds=[(0.0, max_weight)] * n,
+            method='highs',
+        )
+        return -result.fun if result.success else -np.inf
+
+    def _solve(self, objective, assets: List[str], min_score: Optional[float], max_weight: float,
+               x0: Optional[np.ndarray] = None, target_return: Optional[float] = None) -> np.ndarray:
+        mean, _ = self.moments.moments(assets)
+        notes = self.notes.reindex(assets).to_numpy(dtype=np.float64)
+        n = len(assets)
+        if min_score is not None and self._max_linear(notes, notes, None, max_weight) < min_score - 1e-9:
+            raise ValueError("Le score D&I minimal est inatteignable avec ces actifs")
+
+        x0 = np.full(n, 1.0 / n) if x0 is None else x0
+        result = minimize(
+            objective,
+            x0,
+            jac=True,
+            method='SLSQP',
+            bounds=[(0.0, max_weight)] * n,
+            constraints=self._constraints(notes, min_score, mean, target_return),
+            options={'maxiter': 500, 'ftol': 1e-12},
+        )
+        if not result.success:
+            logger.warning(f"Optimisation non convergée : {result.message}")
+        weights = np.clip(result.x, 0.0, None)
+        return weights / weights.sum()
+
+    def _variance_objective(self, assets: List[str]):
+        _, cov = self.moments.moments(assets)
+
+        def objective(w):
+            return w @ cov @ w, 2 * cov @ w
+        return objective
+
+    def _sharpe_objective(self, assets: List[str]):
+        mean, cov = self.moments.moments(assets)
+        excess = mean - self.risk_free_rate
+
+        def objective(w):
+            variance = w @ cov @ w
+            volatility = np.sqrt(max(variance, 1e-18))
+            ret = w @ excess
+            grad = -(excess * volatility - ret * (cov @ w) / volatility) / variance
+            return -ret / volatility, grad
+        return objective
+
+    @staticmethod
+    def _check_feasible(assets: List[str], size: Optional[int], max_weight: float):
+        """Vérifie que les poids plafonnés à max_weight d'au plus size actifs peuvent sommer à 1"""
+        if not assets:
+            raise ValueError("Aucun actif candidat")
+        held = len(assets) if size is None else min(size, len(assets))
+        if held * max_weight < 1.0 - 1e-9:
+            raise ValueError(
+                f"Poids maximal de {max_weight:.0%} inatteignable avec {held} actif(s) : "
+                f"il faut au moins {int(np.ceil(1.0 / max_weight - 1e-9))} actifs "
+                f"ou un poids maximal d'au moins {1.0 / max(held, 1):.0%}"
+            )
+
+    def _with_cardinality(self, build_objective, assets: List[str], size: Optional[int],
+                          min_score: Optional[float], max_weight: float) -> pd.Series:
+        """Résout, puis ne conserve que les size poids les plus élevés et résout à nouveau"""
+        self._check_feasible(assets, size, max_weight)
+        weights = self._solve(build_objective(assets), assets, min_score, max_weight)
+        if size is not None and np.count_nonzero(weights > 1e-6) > size:
+            kept = [assets[i] for i in np.argsort(weights)[::-1][:size]]
+            x0 = weights[[assets.index(asset) for asset in kept]]
+            weights = self._solve(build_objective(kept), kept, min_score, max_weight, x0=x0 / x0.sum())
+            assets = kept
+        return pd.Series(weights, index=assets)
+
+    def min_variance(self, assets: List[str], size: Optional[int] = None, min_score: Optional[float] = None,
+                     max_weight: float = 1.0) -> pd.Series:
+        """
+        Portefeuille de variance minimale.
+
+        Args:
+            assets: Actifs candidats
+            size: Nombre maximal d'actifs détenus
+            min_score: Score D&I moyen pondéré minimal
+            max_weight: Poids maximal par actif
+
+        Returns:
+            pd.Series: Poids des actifs retenus
+
+        Raises:
+            ValueError: Si aucun actif n'est candidat ou si size actifs plafonnés à max_weight
+                ne peuvent pas totaliser 100 %
+        """
+        return self._with_cardinality(self._variance_objective, assets, size, min_score, max_weight)
+
+    def max_sharpe(self, assets: List[str], size: Optional[int] = None, min_score: Optional[float] = None,
+                   max_weight: float = 1.0) -> pd.Series:
+        """
+        Portefeuille de ratio de Sharpe maximal.
+
+        Args:
+            assets: Actifs candidats
+            size: Nombre maximal d'actifs détenus
+            min_score: Score D&I moyen pondéré minimal
+            max_weight: Poids maximal par actif
+
+        Returns:
+            pd.Series: Poids des actifs retenus
+
+        Raises:
+            ValueError: Si aucun actif n'est candidat ou si size actifs plafonnés à max_weight
+                ne peuvent pas totaliser 100 %
+        """
+        return self._with_cardinality(self._sharpe_objective, assets, size, min_score, max_weight)
+
+    def efficient_frontier(self, assets: List[str], n_points: int = 20, min_score: Optional[float] = None,
+                           max_weight: float = 1.0) -> pd.DataFrame:
+        """
+        Trace la frontière efficiente, chaque résolution partant de la solution précédente.
+
+        Args:
+            assets: Actifs candidats
+            n_points: Nombre de points de la frontière
+            min_score: Score D&I moyen pondéré minimal
+            max_weight: Poids maximal par actif
+
+        Returns:
+            pd.DataFrame: Une ligne par point avec 'return', 'volatility' et 'sharpe_ratio'
+            (en pourcentage) suivis des poids de chaque actif
+
+        Raises:
+            ValueError: Si aucun actif n'est candidat ou si les actifs plafonnés à max_weight
+                ne peuvent pas totaliser 100 %
+        """
+        self._check_feasible(assets, None, max_weight)
+        mean, cov = self.moments.moments(assets)
+        objective = self._variance_objective(assets)
+
+        weights = self._solve(objective, assets, min_score, max_weight)
+        # Rendement maximal atteignable sous les mêmes contraintes
+        notes = self.notes.reindex(assets).to_numpy(dtype=np.float64)
+        max_return = self._max_linear(mean, notes, min_score, max_weight)
+
+        points = []
+        for target in np.linspace(weights @ mean, max_return, n_points):
+            weights = self._solve(objective, assets, min_score, max_weight, x0=weights, target_return=target)
+            ret = weights @ mean
+            volatility = np.sqrt(weights @ cov @ weights)
+            points.append([ret * 100, volatility * 100,
+                           (ret - self.risk_free_rate) / volatility if volatility > 0 else 0.0, *weights])
+
+        return pd.DataFrame(points, columns=['return', 'volatility', 'sharpe_ratio', *assets])
@@ -3,90 +3,389 @@ import numpy as np
 import yfinance as yf
 from datetime import datetime
 import logging
-from typing import Dict
+from typing import Dict, List, Optional, Tuple, Union
+
+from modules.backtest import (
+    backtest_constant_weights, backtest_rebalanced, performance_metrics, rebalancing_mask,
+    threshold_mask, infer_periods_per_year, REBALANCING_SCHEDULES
+)
+from modules.asset_universe import AssetUniverse
+from modules.optimizer import PortfolioOptimizer
+from modules.simulation import simulate_portfolio
+from modules.cache import LRUCache, dataset_version
+from modules.metrics import rolling_metrics
+from modules.walk_forward import walk_forward
+from modules.instrumentation import telemetry
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class PortfolioManager:
-    def __init__(self, notation_df, returns_df):
+    def __init__(self, notation_df, returns_df, results_cache: Optional[LRUCache] = None,
+                 periods_per_year: Optional[int] = None):
         """
         Initialise le gestionnaire de portefeuille
         Args:
             notation_df (pd.DataFrame): DataFrame contenant les informations des actifs
             returns_df (pd.DataFrame): DataFrame contenant les rendements des actifs
+            results_cache (LRUCache): Cache des simulations pour un investissement unitaire,
+                éventuellement partagé entre plusieurs gestionnaires
+            periods_per_year (int): Nombre de périodes par an servant à l'annualisation
+                (par défaut déduit de l'intervalle des rendements : 252, 52 ou 12)
         """
         if not isinstance(notation_df, pd.DataFrame) or notation_df.empty:
             raise ValueError("Le DataFrame des actifs ne peut pas être vide")
         
         self.notation_df = notation_df
         self.returns_df = returns_df
+        self.periods_per_year = periods_per_year or infer_periods_per_year(returns_df)
+        # Index des notes des actifs disposant de rendements
+        self.universe = AssetUniverse(notation_df, assets=returns_df.columns)
 
         self.portfolio_history = None
         self.weights = None
         self.total_investment = None
+        self._optimizer = None
+        self.results_cache = results_cache if results_cache is not None else LRUCache(max_entries=128)
+        self.dataset_version = dataset_version(returns_df)
+
+    # Modes de pondération disponibles dans create_portfolio
+    WEIGHTING_SCHEMES = ('notes', 'min_variance', 'max_sharpe')
+
+    @property
+    def optimizer(self) -> PortfolioOptimizer:
+        """Optimiseur moyenne-variance, dont les moments sont calculés une seule fois"""
+        if self._optimizer is None:
+            self._optimizer = PortfolioOptimizer(
+                self.returns_df,
+                self.notation_df.set_index('Ticker')['Note'],
+                periods_per_year=self.periods_per_year
+            )
+        return self._optimizer
 
-    def create_portfolio(self, total_investment: float = 10000, min_notation: float = 1.0, corresponding_assets: list = [], size: int = 5) -> Dict:
+    def create_portfolio(self, total_investment: float = 10000, min_notation: float = 1.0, corresponding_assets: list = [], size: int = 5,
+                         weighting: str = 'notes', min_score: Optional[float] = None, max_weight: float = 1.0,
+                         rebalancing: str = 'weekly', threshold: float = 0.05, transaction_cost: float = 0.0) -> Dict:
         """
-        Crée un portefeuille avec rebalancement hebdomadaire optimisé
+        Crée un portefeuille et simule son évolution selon le calendrier de rééquilibrage choisi
         
         Args:
             total_investment: Montant total à investir
             min_notation: Note minimale requise
             corresponding_assets: Liste des actifs à inclure dans le portefeuille
             size: Nombre d'actifs à sélectionner
+            weighting: Mode de pondération ('notes' : les size actifs les mieux notés pondérés
+                par leur note, 'min_variance' ou 'max_sharpe' : poids optimisés parmi les actifs)
+            min_score: Score D&I moyen pondéré minimal (modes optimisés uniquement)
+            max_weight: Poids maximal par actif (modes optimisés uniquement)
+            rebalancing: Calendrier de rééquilibrage ('none' : achat et conservation,
+                'weekly', 'monthly', 'quarterly' ou 'threshold' : dès qu'un poids dérive de plus de threshold)
+            threshold: Dérive maximale tolérée sur un poids (mode 'threshold')
+            transaction_cost: Frais proportionnels au montant échangé lors des rééquilibrages
             
         Returns:
             Dict: Dictionnaire contenant les métriques et l'historique du portefeuille
         """
         try:
-            # Initialiser les DataFrames pour stocker les résultats
-            portfolio_value = pd.DataFrame(index=self.returns_df.index)
-            portfolio_value['value'] = total_investment
-            
-            # Sélectionner les size actifs les mieux notés
-            asset_notes = {asset: self.notation_df[self.notation_df['Ticker'] == asset]['Note'].iloc[0] 
-                         for asset in corresponding_assets}
-            
-            # Trier les actifs par note et prendre les size premiers
-            sorted_assets = sorted(asset_notes.items(), key=lambda x: x[1], reverse=True)[:size]
-            selected_assets = [asset for asset, _ in sorted_assets]
-            
-            # Calculer les poids basés sur les notes des actifs sélectionnés
-            total_notes = sum(note for _, note in sorted_assets)
-            weights = {asset: note/total_notes for asset, note in sorted_assets}
-
-            # Pour chaque semaine, calculer les rendements
-            for i in range(len(self.returns_df)):
-                # Calculer le rendement du portefeuille pour cette semaine
-                weekly_return = 0
-                for asset, weight in weights.items():
-                    weekly_return += self.returns_df[asset].iloc[i] * weight
-                
-                # Mettre à jour la valeur du portefeuille
-                if i > 0:
-                    portfolio_value.iloc[i] = portfolio_value.iloc[i-1] * (1 + weekly_return)
+            if rebalancing not in REBALANCING_SCHEDULES:
+                raise ValueError(f"Calendrier de rééquilibrage inconnu : {rebalancing}")
+
+            with telemetry.span('selection', weighting=weighting, n_candidates=len(corresponding_assets)):
+                if weighting == 'notes':
+                    # Sélectionner les size actifs les mieux notés et les pondérer par leur note
+                    selected_assets, weights = self._select_by_notes(corresponding_assets, size)
+                elif weighting in self.WEIGHTING_SCHEMES:
+                    # Optimisation moyenne-variance sous contraintes de score et de taille
+                    solve = getattr(self.optimizer, weighting)
+                    optimized = solve(list(corresponding_assets), size=size, min_score=min_score,
+                                      max_weight=max_weight)
+                    optimized = optimized[optimized > 1e-6].sort_values(ascending=False)
+                    selected_assets = list(optimized.index)
+                    weights = (optimized / optimized.sum()).to_dict()
+                else:
+                    raise ValueError(f"Mode de pondération inconnu : {weighting}")
+
+            # Simulation pour un euro investi (mise en cache), puis mise à l'échelle du montant
+            unit = self._simulate_unit(selected_assets, weights, rebalancing, threshold, transaction_cost)
+            portfolio_value = pd.Series(unit['values'] * total_investment, index=self.returns_df.index, name='value')
+            metrics = unit['metrics']
+
+            # Conserver le dernier portefeuille créé pour les métriques et la répartition
+            self.portfolio_history = portfolio_value
+            self.weights = weights
+            self.total_investment = total_investment
 
-            # Calculer les métriques finales
-            returns = portfolio_value['value'].pct_change().dropna()
-            annual_return = ((1 + returns.mean()) ** 52 - 1) * 100
-            volatility = returns.std() * np.sqrt(52) * 100
-            sharpe_ratio = annual_return / volatility if volatility != 0 else 0
-            
             return {
-                'annual_return': annual_return,
-                'volatility': volatility,
-                'sharpe_ratio': sharpe_ratio,
-                'portfolio_value': portfolio_value['value'],
-                'weights': weights,  # Poids basés sur les notes
-                'selected_assets': selected_assets  # Liste des actifs sélectionnés
+                'annual_return': metrics['annual_return'],
+                'volatility': metrics['volatility'],
+                'sharpe_ratio': metrics['sharpe_ratio'],
+                'portfolio_value': portfolio_value,
+                'weights': weights,  # Poids basés sur les notes ou optimisés
+                'selected_assets': selected_assets,  # Liste des actifs sélectionnés
+                'n_rebalances': unit['n_rebalances'],
+                'annual_turnover': unit['annual_turnover'],  # En % du portefeuille
+                'transaction_costs': unit['transaction_costs'] * total_investment
             }
             
         except Exception as e:
             logger.error(f"Erreur lors de la création du portefeuille : {str(e)}")
             raise
 
+    def _simulate_unit(self, selected_assets: List[str], weights: Dict[str, float], rebalancing: str,
+                       threshold: float, transaction_cost: float) -> Dict:
+        """
+        Simule le portefeuille pour un investissement de 1, avec mise en cache.
+
+        La trajectoire étant proportionnelle au montant investi, le résultat
+        est réutilisé pour tout montant : la clé ne dépend que des actifs, des
+        poids, des paramètres de rééquilibrage, de la version des rendements et
+        de leur intervalle (nombre de périodes par an servant à l'annualisation
+        des métriques), le cache pouvant être partagé entre gestionnaires.
+
+        Returns:
+            Dict: Valeurs unitaires, métriques, nombre de rééquilibrages,
+            rotation annuelle et frais pour un investissement de 1
+        """
+        key = (
+            self.dataset_version,
+            self.returns_df.attrs.get('interval'),
+            self.periods_per_year,
+            tuple(selected_assets),
+            tuple(round(float(weights[asset]), 12) for asset in selected_assets),
+            rebalancing,
+            threshold if rebalancing == 'threshold' else None,
+            transaction_cost,
+        )
+        # L'intervalle 'backtest' inclut la consultation du cache ; cache_hit indique si la simulation a été évitée
+        with telemetry.span('backtest', n_assets=len(selected_assets), rebalancing=rebalancing) as fields:
+            fields['cache_hit'] = True
+
+            def compute():
+                fields['cache_hit'] = False
+                return self._run_backtest(selected_assets, weights, rebalancing, threshold, transaction_cost)
+
+            return self.results_cache.get_or_compute(key, compute)
+
+    def _run_backtest(self, selected_assets: List[str], weights: Dict[str, float], rebalancing: str,
+                      threshold: float, transaction_cost: float) -> Dict:
+        # Calcul vectorisé de la valeur du portefeuille sur toute la période
+        returns = self.returns_df[selected_assets].to_numpy(dtype=np.float64)
+        weights_vector = np.array([weights[asset] for asset in selected_assets])
+        if rebalancing == 'threshold':
+            mask = threshold_mask(returns, weights_vector, threshold)
+        else:
+            mask = rebalancing_mask(self.returns_df.index, rebalancing)
+        simulation = backtest_rebalanced(returns, weights_vector, mask,
+                                         initial_value=1.0,
+                                         transaction_cost=transaction_cost)
+        values = simulation['values']
+        values.setflags(write=False)
+        years = max(len(values) - 1, 1) / self.periods_per_year
+
+        return {
+            'values': values,
+            # Calculer les métriques finales
+            'metrics': performance_metrics(values, self.periods_per_year),
+            'n_rebalances': int((simulation['turnover'] > 0).sum()),
+            'annual_turnover': simulation['turnover'].sum() / years * 100,
+            'transaction_costs': simulation['costs'].sum(),
+        }
+
+    def cache_info(self) -> Dict[str, int]:
+        """
+        Compteurs du cache des simulations
+        
+        Returns:
+            Dict[str, int]: Succès, échecs, évictions et taille du cache
+        """
+        return self.results_cache.info()
+
+    def _select_by_notes(self, corresponding_assets: List[str], size: int) -> Tuple[List[str], Dict[str, float]]:
+        """
+        Sélectionne les size actifs les mieux notés et calcule leurs poids
+        proportionnels aux notes.
+
+        Args:
+            corresponding_assets: Liste des actifs éligibles
+            size: Nombre d'actifs à sélectionner
+
+        Returns:
+            Tuple[List[str], Dict[str, float]]: Actifs sélectionnés et poids associés
+        """
+        # Trier les actifs par note et prendre les size premiers
+        selected_assets = self.universe.top_k(size, candidates=corresponding_assets)
+        notes = self.universe.notes(selected_assets)
+        
+        # Calculer les poids basés sur les notes des actifs sélectionnés
+        weights = dict(zip(selected_assets, notes / notes.sum()))
+        return selected_assets, weights
+
+    def evaluate_portfolios(self, configurations: Optional[List[Tuple[float, int]]] = None,
+                            weights: Optional[Union[pd.DataFrame, List[Dict[str, float]]]] = None,
+                            total_investment: float = 10000) -> pd.DataFrame:
+        """
+        Évalue d'un seul coup un ensemble de portefeuilles candidats.
+
+        Les portefeuilles sont décrits soit par des configurations
+        (note minimale, taille), sélectionnées comme dans create_portfolio,
+        soit directement par des vecteurs de poids. Toutes les trajectoires
+        sont obtenues par un unique produit matrice des rendements x matrice des poids.
+
+        Args:
+            configurations: Liste de couples (min_notation, size)
+            weights: Poids par actif, un portefeuille par ligne (DataFrame) ou par dictionnaire
+            total_investment: Montant total investi dans chaque portefeuille
+
+        Returns:
+            pd.DataFrame: Une ligne par portefeuille avec le nombre d'actifs, le rendement
+            annuel, la volatilité, le ratio de Sharpe et la valeur finale
+        """
+        if (configurations is None) == (weights is None):
+            raise ValueError("Il faut fournir soit des configurations, soit des poids")
+
+        try:
+            assets = list(self.returns_df.columns)
+            if configurations is not None:
+                rows = []
+                for min_notation, size in configurations:
+                    # Les size mieux notés au-dessus du seuil : recherche dichotomique puis tranche
+                    selected = self.universe.top_k(int(size), min_note=min_notation)
+                    notes = self.universe.notes(selected)
+                    rows.append(dict(zip(selected, notes / notes.sum())) if selected else {})
+                weights_df = pd.DataFrame(rows, columns=assets)
+                table = pd.DataFrame(configurations, columns=['min_notation', 'size'])
+            else:
+                weights_df = weights if isinstance(weights, pd.DataFrame) else pd.DataFrame(weights)
+                weights_df = weights_df.reindex(columns=assets)
+                table = pd.DataFrame(index=weights_df.index)
+
+            weights_matrix = weights_df.fillna(0).to_numpy(dtype=np.float64)
+            table['n_assets'] = (weights_matrix > 0).sum(axis=1)
+
+            # Trajectoires de tous les portefeuilles : (T x k) @ (k x n)
+            values = backtest_constant_weights(
+                self.returns_df.to_numpy(dtype=np.float64),
+                weights_matrix.T,
+                initial_value=total_investment
+            )
+            metrics = performance_metrics(values, self.periods_per_year)
+
+            table['annual_return'] = metrics['annual_return']
+            table['volatility'] = metrics['volatility']
+            table['sharpe_ratio'] = metrics['sharpe_ratio']
+            table['final_value'] = values[-1]
+            # Une configuration sans actif éligible n'a pas de sens
+            table.loc[table['n_assets'] == 0, ['annual_return', 'volatility', 'sharpe_ratio', 'final_value']] = np.nan
+            return table
+
+        except Exception as e:
+            logger.error(f"Erreur lors de l'évaluation des portefeuilles : {str(e)}")
+            raise
+
+    def efficient_frontier(self, corresponding_assets: List[str], n_points: int = 20,
+                           min_score: Optional[float] = None, max_weight: float = 1.0) -> pd.DataFrame:
+        """
+        Trace la frontière efficiente des actifs éligibles
+        
+        Args:
+            corresponding_assets: Liste des actifs éligibles
+            n_points: Nombre de points de la frontière
+            min_score: Score D&I moyen pondéré minimal
+            max_weight: Poids maximal par actif
+            
+        Returns:
+            pd.DataFrame: Rendement, volatilité, ratio de Sharpe et poids de chaque point
+        """
+        try:
+            return self.optimizer.efficient_frontier(list(corresponding_assets), n_points=n_points,
+                                                     min_score=min_score, max_weight=max_weight)
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la frontière efficiente : {str(e)}")
+            raise
+
+    def walk_forward(self, corresponding_assets: List[str], train_size: Optional[int] = None,
+                     test_size: Optional[int] = None, mode: str = 'rolling', total_investment: float = 10000,
+                     size: int = 5, weighting: str = 'notes', min_score: Optional[float] = None,
+                     max_weight: float = 1.0, rebalancing: str = 'weekly', threshold: float = 0.05,
+                     transaction_cost: float = 0.0, n_workers: Optional[int] = None) -> Dict:
+        """
+        Évalue hors échantillon la construction du portefeuille de create_portfolio.
+
+        Contrairement à create_portfolio, qui choisit et évalue le portefeuille
+        sur la même période, la sélection et la pondération sont réestimées
+        sur chaque fenêtre d'apprentissage puis appliquées à la période
+        suivante (voir modules.walk_forward).
+
+        Args:
+            corresponding_assets: Liste des actifs éligibles
+            train_size: Longueur de la fenêtre d'apprentissage en périodes (par défaut un an)
+            test_size: Longueur de la fenêtre de test en périodes (par défaut un trimestre)
+            mode: 'rolling' (fenêtre glissante) ou 'expanding' (fenêtre croissante)
+            n_workers: Nombre de processus pour les optimisations des fenêtres
+                (par défaut, choisi selon le nombre de fenêtres, voir modules.walk_forward)
+            Les autres paramètres sont ceux de create_portfolio.
+
+        Returns:
+            Dict: Courbe hors échantillon, ses métriques et diagnostics par fenêtre
+        """
+        train_size = train_size or self.periods_per_year
+        test_size = test_size or max(self.periods_per_year // 4, 2)
+        try:
+            if rebalancing not in REBALANCING_SCHEDULES:
+                raise ValueError(f"Calendrier de rééquilibrage inconnu : {rebalancing}")
+            if weighting not in self.WEIGHTING_SCHEMES:
+                raise ValueError(f"Mode de pondération inconnu : {weighting}")
+            with telemetry.span('walk_forward', weighting=weighting, mode=mode, train_size=train_size,
+                                test_size=test_size) as fields:
+                result = walk_forward(
+                    self.notation_df, self.returns_df, corresponding_assets, train_size, test_size,
+                    mode=mode, weighting=weighting, size=size, min_score=min_score, max_weight=max_weight,
+                    rebalancing=rebalancing, threshold=threshold, transaction_cost=transaction_cost,
+                    total_investment=total_investment, periods_per_year=self.periods_per_year,
+                    n_workers=n_workers
+                )
+                fields['n_windows'] = len(result['windows'])
+            return result
+        except Exception as e:
+            logger.error(f"Erreur lors du backtest hors échantillon : {str(e)}")
+            raise
+
+    def project_portfolio(self, weights: Dict[str, float], horizon: Optional[int] = None, total_investment: float = 10000,
+                          n_paths: int = 10000, method: str = 'bootstrap', seed: Optional[int] = None,
+                          n_workers: int = 1, **kwargs) -> Dict:
+        """
+        Projette la distribution future de la valeur d'un portefeuille
+        
+        Args:
+            weights: Poids des actifs du portefeuille
+            horizon: Nombre de périodes projetées (par défaut un an)
+            total_investment: Montant investi au départ de la projection
+            n_paths: Nombre de trajectoires simulées
+            method: 'bootstrap' (blocs de rendements historiques) ou 'normal' (loi normale ajustée)
+            seed: Graine aléatoire, pour des résultats reproductibles
+            n_workers: Nombre de processus utilisés pour la simulation
+            **kwargs: Paramètres supplémentaires de simulate_portfolio
+            
+        Returns:
+            Dict: Bandes de percentiles, probabilité de perte, VaR et CVaR à l'horizon
+        """
+        try:
+            assets = list(weights)
+            # La première ligne est le point de départ des backtests, sans rendement réalisé
+            return simulate_portfolio(
+                self.returns_df[assets].iloc[1:].to_numpy(dtype=np.float64),
+                np.array([weights[asset] for asset in assets]),
+                horizon=horizon or self.periods_per_year,
+                n_paths=n_paths,
+                method=method,
+                initial_value=total_investment,
+                seed=seed,
+                n_workers=n_workers,
+                **kwargs
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de la projection du portefeuille : {str(e)}")
+            raise
+
     def get_portfolio_metrics(self):
         """
         Calcule les métriques du portefeuille
@@ -99,28 +398,51 @@ class PortfolioManager:
         try:
             # Calcul des rendements
             returns = self.portfolio_history.pct_change().dropna()
+            years = len(returns) / self.periods_per_year
             
             # Métriques
             total_return = (self.portfolio_history.iloc[-1] / self.portfolio_history.iloc[0] - 1) * 100
-            annual_return = ((1 + total_return/100) ** (1/2) - 1) * 100  # Sur 2 ans
-            volatility = returns.std() * np.sqrt(252) * 100  # Volatilité annualisée
+            annual_return = ((1 + total_return/100) ** (1/years) - 1) * 100
+            volatility = returns.std() * np.sqrt(self.periods_per_year) * 100  # Volatilité annualisée
             
-            # Note environnementale moyenne
-            env_rating = 0
-            for ticker, weight in self.weights.items():
-                asset_rating = self.assets_df[self.assets_df['Ticker'] == ticker]['Note'].iloc[0]
-                env_rating += (weight / 100) * asset_rating
+            # Note D&I moyenne pondérée
+            tickers = list(self.weights)
+            env_rating = float(np.dot([self.weights[ticker] for ticker in tickers], self.universe.notes(tickers)))
+            
+            # Drawdown maximal sur toute la période
+            drawdown = self.portfolio_history / self.portfolio_history.cummax() - 1
             
             return {
                 'Total Return': total_return,
                 'Annual Return': annual_return,
                 'Volatility': volatility,
+                'Max Drawdown': drawdown.min() * 100,
                 'Environmental Rating': env_rating
             }
         except Exception as e:
             logger.error(f"Erreur lors du calcul des métriques: {str(e)}")
             raise
 
+    def get_rolling_metrics(self, window: Optional[int] = None) -> pd.DataFrame:
+        """
+        Calcule les métriques glissantes du dernier portefeuille créé
+        Args:
+            window: Nombre de périodes de la fenêtre glissante (par défaut six mois)
+        Returns:
+            pd.DataFrame: Volatilité, ratios de Sharpe et de Sortino, drawdown courant
+            et drawdown maximal sur la fenêtre, pour chaque période
+        """
+        if self.portfolio_history is None:
+            raise ValueError("Le portefeuille n'a pas été créé")
+        
+        try:
+            returns = self.portfolio_history.pct_change().iloc[1:]
+            return rolling_metrics(returns, window=window or self.periods_per_year // 2,
+                                   periods_per_year=self.periods_per_year)
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul des métriques glissantes: {str(e)}")
+            raise
+
     def get_portfolio_breakdown(self):
         """
         Retourne la répartition actuelle du portefeuille
@@ -133,14 +455,13 @@ class PortfolioManager:
         try:
             breakdown = []
             for ticker, weight in self.weights.items():
-                asset_data = self.assets_df[self.assets_df['Ticker'] == ticker].iloc[0]
+                asset_data = self.universe.row(ticker)
                 breakdown.append({
                     'Ticker': ticker,
-                    'Name': asset_data['Nom'],
-                    'Type': asset_data['Type'],
-                    'Weight': weight,
-                    'Investment': self.total_investment * (weight / 100),
-                    'Environmental Rating': asset_data['']
+                    'Name': asset_data['Actions'],
+                    'Weight': weight * 100,  # En pourcentage
+                    'Investment': self.total_investment * weight,
+                    'Environmental Rating': asset_data['Note']
                 })
             
             return pd.DataFrame(breakdown)
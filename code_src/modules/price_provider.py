@@ -0,0 +1,210 @@
+import pandas as pd
+import numpy as np
+import yfinance as yf
+from abc import ABC, abstractmethod
+from datetime import datetime
+import time
+import zlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DateLike = Union[str, datetime, pd.Timestamp]
+
+# Correspondance entre les intervalles yfinance et les fréquences pandas
+INTERVAL_FREQUENCIES = {
+    '1d': 'B',
+    '1wk': 'W-MON',
+    '1mo': 'MS',
+}
+
+
+class RateLimitError(Exception):
+    """
+    Levée par un fournisseur lorsque la source signale un dépassement de quota.
+
+    Les cours des tickers obtenus avant la limitation sont transmis dans
+    prices, afin que seuls les tickers limités soient demandés à nouveau.
+    """
+
+    def __init__(self, message: str, prices: Optional[Dict[str, pd.Series]] = None):
+        super().__init__(message)
+        self.prices = prices or {}
+
+
+def is_rate_limit_message(message: str) -> bool:
+    """Indique si un message d'erreur de Yahoo Finance correspond à un dépassement de quota"""
+    message = message.lower()
+    return 'ratelimit' in message or 'rate limit' in message or 'too many requests' in message
+
+
+class PriceProvider(ABC):
+    """
+    Source de prix historiques interchangeable.
+
+    Un fournisseur reçoit un lot de tickers et renvoie, pour chacun, la série
+    des cours de clôture indexée par date (sans fuseau horaire). Les tickers
+    absents du résultat sont considérés comme en échec et pourront être
+    retentés par l'appelant.
+    """
+
+    # Nombre maximal de tickers par requête groupée
+    max_batch_size: int = 20
+
+    @abstractmethod
+    def fetch_prices(self, tickers: List[str], start: DateLike, end: DateLike,
+                     interval: str = '1wk') -> Dict[str, pd.Series]:
+        """
+        Télécharge les cours de clôture d'un lot de tickers.
+
+        Args:
+            tickers: Liste des symboles à télécharger
+            start: Date de début (incluse)
+            end: Date de fin (exclue)
+            interval: Intervalle des cours ('1d', '1wk', '1mo')
+
+        Returns:
+            Dict[str, pd.Series]: Cours de clôture par ticker
+
+        Raises:
+            RateLimitError: Si la source refuse la requête pour cause de quota
+        """
+
+
+def _strip_timezone(index: pd.Index) -> pd.DatetimeIndex:
+    """Ramène un index de dates à des dates naïves (sans fuseau horaire)"""
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+class YahooFinanceProvider(PriceProvider):
+    """
+    Fournisseur basé sur Yahoo Finance.
+
+    L'API de Yahoo ne servant qu'un ticker par requête, un lot est téléchargé
+    en parallèle, un historique par ticker, comme le fait yf.download. Les
+    erreurs de chaque ticker sont levées par yfinance (raise_errors) plutôt
+    que consignées dans son état global : les limitations de débit sont
+    identifiées ticker par ticker et les cours déjà obtenus sont conservés.
+    """
+
+    max_batch_size = 20
+
+    def __init__(self, max_threads: int = 4):
+        """
+        Args:
+            max_threads: Nombre maximal de requêtes simultanées par lot
+        """
+        self.max_threads = max_threads
+
+    @staticmethod
+    def _fetch_one(ticker: str, start: DateLike, end: DateLike, interval: str) -> Optional[pd.Series]:
+        history = yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=True,
+                                            raise_errors=True)
+        if history is None or history.empty or 'Close' not in history:
+            return None
+        close = history['Close'].dropna()
+        if close.empty:
+            return None
+        close.index = _strip_timezone(close.index)
+        return close.rename(ticker)
+
+    def fetch_prices(self, tickers: List[str], start: DateLike, end: DateLike,
+                     interval: str = '1wk') -> Dict[str, pd.Series]:
+        prices = {}
+        throttled = []
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_threads, len(tickers)))) as executor:
+            futures = {ticker: executor.submit(self._fetch_one, ticker, start, end, interval) for ticker in tickers}
+            for ticker, future in futures.items():
+                try:
+                    close = future.result()
+                except Exception as e:
+                    if is_rate_limit_message(f"{type(e).__name__}: {str(e)}"):
+                        throttled.append(ticker)
+                    else:
+                        logger.debug(f"Aucun cours pour {ticker}: {str(e)}")
+                    continue
+                if close is not None:
+                    prices[ticker] = close
+
+        if throttled:
+            raise RateLimitError(f"Limite de requêtes atteinte pour {throttled}", prices=prices)
+        return prices
+
+
+class FakePriceProvider(PriceProvider):
+    """
+    Fournisseur local synthétique, sans réseau.
+
+    Les cours suivent une marche aléatoire géométrique déterministe par ticker,
+    ce qui permet d'exécuter tout le pipeline d'ingestion hors ligne.
+    """
+
+    def __init__(self, latency: float = 0.0, fail_tickers: Optional[List[str]] = None,
+                 rate_limit_every: int = 0, max_batch_size: int = 50,
+                 flaky_tickers: Optional[List[str]] = None, throttled_tickers: Optional[List[str]] = None):
+        """
+        Args:
+            latency: Latence simulée par requête (en secondes)
+            fail_tickers: Tickers pour lesquels aucune donnée n'est renvoyée
+            rate_limit_every: Lève une RateLimitError toutes les n requêtes (0 = jamais)
+            max_batch_size: Nombre maximal de tickers par requête groupée
+            flaky_tickers: Tickers absents de la première requête qui les demande seulement
+            throttled_tickers: Tickers limités par la source lors de la première requête qui les
+                demande seulement (RateLimitError portant les cours des autres tickers)
+        """
+        self.latency = latency
+        self.fail_tickers = set(fail_tickers or [])
+        self.rate_limit_every = rate_limit_every
+        self.max_batch_size = max_batch_size
+        self.flaky_tickers = set(flaky_tickers or [])
+        self.throttled_tickers = set(throttled_tickers or [])
+        self.calls = 0
+        # Tickers de chaque requête reçue, dans l'ordre
+        self.requests: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def fetch_prices(self, tickers: List[str], start: DateLike, end: DateLike,
+                     interval: str = '1wk') -> Dict[str, pd.Series]:
+        with self._lock:
+            self.calls += 1
+            calls = self.calls
+            self.requests.append(list(tickers))
+            flaky = self.flaky_tickers.intersection(tickers)
+            self.flaky_tickers -= flaky
+            throttled = self.throttled_tickers.intersection(tickers)
+            self.throttled_tickers -= throttled
+        if self.latency:
+            time.sleep(self.latency)
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise RateLimitError("Limite de requêtes simulée")
+
+        freq = INTERVAL_FREQUENCIES.get(interval, 'W-MON')
+        dates = pd.date_range(start=start, end=end, freq=freq, inclusive='left')
+        prices = {}
+        for ticker in tickers:
+            if ticker in self.fail_tickers or ticker in flaky or ticker in throttled or len(dates) == 0:
+                continue
+            prices[ticker] = self._price_path(ticker, dates, freq)
+        if throttled:
+            raise RateLimitError(f"Limite de requêtes simulée pour {sorted(throttled)}", prices=prices)
+        return prices
+
+    @staticmethod
+    def _price_path(ticker: str, dates: pd.DatetimeIndex, freq: str) -> pd.Series:
+        """Génère un chemin de prix reproductible, indépendant de la fenêtre demandée"""
+        seed = zlib.crc32(ticker.encode('utf-8'))
+        origin = pd.Timestamp('2000-01-01')
+        # Les tirages sont indexés par période depuis l'origine pour que deux
+        # fenêtres qui se chevauchent renvoient les mêmes prix
+        offsets = ((dates - origin).days // {'B': 1, 'W-MON': 7, 'MS': 30}[freq]).to_numpy()
+        rng = np.random.default_rng(seed)
+        steps = rng.normal(0.001, 0.03, size=int(offsets.max()) + 1)
+        log_prices = np.cumsum(steps)[offsets]
+        base = 20 + seed % 200
+        return pd.Series(base * np.exp(log_prices), index=dates, name=ticker)
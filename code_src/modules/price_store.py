@@ -0,0 +1,174 @@
+import pandas as pd
+import os
+import json
+import threading
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStore:
+    """
+    Stockage local des cours de clôture, un fichier Parquet par ticker.
+
+    Un manifeste JSON conserve pour chaque ticker la première et la dernière
+    date de cours stockées ainsi que la période sur laquelle la source a été
+    interrogée, ce qui permet de ne télécharger que les périodes manquantes.
+    """
+
+    MANIFEST = 'manifest.json'
+
+    def __init__(self, root: str = os.path.join('data', 'prices'), interval: str = '1wk'):
+        """
+        Args:
+            root: Répertoire racine du stockage
+            interval: Intervalle des cours stockés ('1d', '1wk', '1mo')
+        """
+        self.root = os.path.join(root, interval)
+        self.interval = interval
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self) -> Dict[str, Dict]:
+        path = os.path.join(self.root, self.MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifeste illisible, reconstruction du stockage: {str(e)}")
+            return {}
+
+    def _write_manifest(self):
+        path = os.path.join(self.root, self.MANIFEST)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker}.parquet")
+
+    @property
+    def version(self) -> str:
+        """Identifiant du contenu du stockage, modifié à chaque écriture"""
+        path = os.path.join(self.root, self.MANIFEST)
+        return str(os.stat(path).st_mtime_ns) if os.path.exists(path) else '0'
+
+    def tickers(self) -> List[str]:
+        """Liste des tickers présents dans le stockage"""
+        return sorted(self._manifest)
+
+    def coverage(self, ticker: str) -> Optional[Dict]:
+        """
+        Retourne les informations de couverture d'un ticker.
+
+        Returns:
+            Optional[Dict]: Clés 'first', 'last' (dates de cours), 'covered_from'
+            et 'covered_until' (période interrogée), ou None si absent
+        """
+        return self._manifest.get(ticker)
+
+    def fetch_start(self, ticker: str, start_date: datetime, end_date: datetime) -> Optional[pd.Timestamp]:
+        """
+        Détermine à partir de quelle date le ticker doit être téléchargé.
+
+        La dernière période stockée est retéléchargée car elle peut être incomplète.
+
+        Returns:
+            Optional[pd.Timestamp]: Date de début du téléchargement, ou None si
+            le stockage couvre déjà la période demandée
+        """
+        info = self._manifest.get(ticker)
+        if info is None or pd.Timestamp(info['covered_from']) > pd.Timestamp(start_date):
+            return pd.Timestamp(start_date)
+        if pd.Timestamp(info['covered_until']) >= pd.Timestamp(end_date):
+            return None
+        return pd.Timestamp(info['last'])
+
+    def load(self, ticker: str, start_date: Optional[datetime] = None,
+             end_date: Optional[datetime] = None) -> Optional[pd.Series]:
+        """
+        Charge les cours stockés d'un ticker.
+
+        Args:
+            ticker: Symbole de l'actif
+            start_date: Date de début (incluse), optionnelle
+            end_date: Date de fin (exclue), optionnelle
+
+        Returns:
+            Optional[pd.Series]: Cours de clôture, ou None si absent
+        """
+        path = self._path(ticker)
+        if ticker not in self._manifest or not os.path.exists(path):
+            return None
+        prices = pd.read_parquet(path)['Close'].rename(ticker)
+        if start_date is not None:
+            prices = prices[prices.index >= pd.Timestamp(start_date)]
+        if end_date is not None:
+            prices = prices[prices.index < pd.Timestamp(end_date)]
+        return prices
+
+    def load_all(self, tickers: List[str], start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None) -> Dict[str, pd.Series]:
+        """Charge les cours stockés d'une liste de tickers (les absents sont ignorés)"""
+        prices = {}
+        for ticker in tickers:
+            series = self.load(ticker, start_date, end_date)
+            if series is not None and not series.empty:
+                prices[ticker] = series
+        return prices
+
+    def append(self, ticker: str, prices: pd.Series, covered_from: datetime, covered_until: datetime):
+        """
+        Fusionne de nouveaux cours avec ceux déjà stockés.
+
+        Les dates déjà présentes sont remplacées par les nouvelles valeurs.
+
+        Args:
+            ticker: Symbole de l'actif
+            prices: Nouveaux cours de clôture
+            covered_from: Date de début de l'interrogation ayant produit ces cours
+            covered_until: Date de fin de l'interrogation ayant produit ces cours
+        """
+        self.append_many({ticker: prices}, covered_from, covered_until)
+
+    def append_many(self, prices: Dict[str, pd.Series], covered_from: datetime, covered_until: datetime):
+        """Fusionne les nouveaux cours de plusieurs tickers, avec une seule écriture du manifeste"""
+        with self._lock:
+            for ticker, series in prices.items():
+                self._merge(ticker, series, covered_from, covered_until)
+            self._write_manifest()
+
+    def _merge(self, ticker: str, prices: pd.Series, covered_from: datetime, covered_until: datetime):
+        existing = self.load(ticker)
+        info = self._manifest.get(ticker)
+        if existing is not None and pd.Timestamp(info['covered_from']) <= pd.Timestamp(covered_from):
+            covered_from = info['covered_from']
+            prices = pd.concat([existing[existing.index < prices.index.min()], prices])
+        prices = prices[~prices.index.duplicated(keep='last')].sort_index()
+
+        frame = prices.astype('float64').to_frame('Close')
+        frame.index.name = 'Date'
+        frame.to_parquet(self._path(ticker))
+
+        self._manifest[ticker] = {
+            'first': prices.index.min().strftime('%Y-%m-%d'),
+            'last': prices.index.max().strftime('%Y-%m-%d'),
+            'covered_from': pd.Timestamp(covered_from).strftime('%Y-%m-%d'),
+            'covered_until': pd.Timestamp(covered_until).strftime('%Y-%m-%d'),
+            'fetched_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def mark_covered(self, tickers: List[str], covered_until: datetime):
+        """Enregistre qu'une interrogation sans nouveau cours a couvert la période"""
+        with self._lock:
+            for ticker in tickers:
+                if ticker in self._manifest:
+                    self._manifest[ticker]['covered_until'] = pd.Timestamp(covered_until).strftime('%Y-%m-%d')
+                    self._manifest[ticker]['fetched_at'] = datetime.now().isoformat(timespec='seconds')
+            self._write_manifest()
@@ -0,0 +1,50 @@
+import time
+import threading
+
+
+class AdaptiveRateLimiter:
+    """
+    Limiteur de débit partagé entre les workers de téléchargement.
+
+    Impose un intervalle minimal entre deux requêtes. L'intervalle est
+    multiplié en cas de limitation par la source (backoff exponentiel)
+    puis réduit progressivement à chaque succès.
+    """
+
+    def __init__(self, min_interval: float = 0.2, max_interval: float = 30.0,
+                 backoff_factor: float = 2.0, recovery_factor: float = 0.8):
+        """
+        Args:
+            min_interval: Intervalle minimal entre deux requêtes (en secondes)
+            max_interval: Intervalle maximal atteint par le backoff
+            backoff_factor: Facteur multiplicatif appliqué après une limitation
+            recovery_factor: Facteur de réduction appliqué après un succès
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.recovery_factor = recovery_factor
+        self.interval = min_interval
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Bloque jusqu'au prochain créneau de requête disponible"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def on_success(self):
+        """Relâche progressivement l'intervalle après une requête réussie"""
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * self.recovery_factor)
+
+    def on_throttle(self):
+        """Augmente l'intervalle après une limitation de la source"""
+        with self._lock:
+            self.interval = min(self.max_interval, max(self.interval, self.min_interval) * self.backoff_factor)
+            self._next_slot = time.monotonic() + self.interval
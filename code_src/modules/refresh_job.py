@@ -0,0 +1,164 @@
+import pandas as pd
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules.data_collector import update_assets_data, ASSETS_FILE
+from modules.cache import read_excel_cached
+
+logger = logging.getLogger(__name__)
+
+# États d'une mise à jour
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+
+class RefreshJob:
+    """
+    Mise à jour des données exécutée dans un thread d'arrière-plan.
+
+    Le script Streamlit n'attend plus la fin du téléchargement : il lit à
+    chaque exécution l'avancement de la mise à jour (tickers obtenus, en
+    échec ou déjà à jour) et continue de servir le dernier jeu de données
+    valide jusqu'à ce qu'un nouveau soit disponible. Les cours reçus étant
+    écrits dans le stockage local au fil des lots, une mise à jour annulée
+    ou en échec reprend là où elle s'est arrêtée lorsqu'elle est relancée.
+    """
+
+    _ids = 0
+
+    def __init__(self, assets_file: str = ASSETS_FILE, **kwargs):
+        """
+        Args:
+            assets_file: Fichier Excel des actifs
+            **kwargs: Paramètres transmis à update_assets_data (interval, missing, refresh_esg...)
+        """
+        RefreshJob._ids += 1
+        self.id = RefreshJob._ids
+        self.params = dict(kwargs, assets_file=assets_file)
+        self.state = RUNNING
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.result: Optional[Tuple] = None
+        self.error: Optional[str] = None
+        self._total = 0
+        self._tickers: Dict[str, Tuple[str, datetime]] = {}
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"refresh-{self.id}", daemon=True)
+
+    def start(self) -> 'RefreshJob':
+        """Démarre la mise à jour en arrière-plan"""
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Demande l'arrêt de la mise à jour : les lots en cours se terminent et restent stockés"""
+        self._cancel_event.set()
+
+    def join(self, timeout: Optional[float] = None):
+        """Attend la fin de la mise à jour"""
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self.state == RUNNING
+
+    @property
+    def cancelling(self) -> bool:
+        return self.running and self._cancel_event.is_set()
+
+    def _on_progress(self, done: List[str], failed: List[str], cached: bool):
+        now = datetime.now()
+        with self._lock:
+            for ticker in done:
+                self._tickers[ticker] = ('à jour' if cached else 'téléchargé', now)
+            for ticker in failed:
+                self._tickers[ticker] = ('échec', now)
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self._total = int(read_excel_cached(self.params['assets_file'])['Ticker'].nunique())
+            result = update_assets_data(progress=self._on_progress, cancel_event=self._cancel_event,
+                                        **self.params)
+            if self._cancel_event.is_set():
+                self.state = CANCELLED
+            elif result is None or result[1].empty:
+                self.error = "Aucune donnée n'a pu être récupérée"
+                self.state = FAILED
+            else:
+                self.result = result
+                self.state = SUCCEEDED
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {str(e)}"
+            self.state = FAILED
+        self.finished_at = datetime.now()
+        logger.info(f"Mise à jour {self.id} terminée ({self.state}) en {time.perf_counter() - start:.1f}s")
+
+    def progress(self) -> Dict[str, Any]:
+        """
+        Avancement de la mise à jour.
+
+        Returns:
+            Dict[str, Any]: Nombre total de tickers, tickers traités, téléchargés,
+            déjà à jour et en échec, fraction traitée et durée écoulée (s)
+        """
+        with self._lock:
+            statuses = [status for status, _ in self._tickers.values()]
+        processed = len(statuses)
+        end = self.finished_at or datetime.now()
+        return {
+            'total': self._total,
+            'processed': processed,
+            'downloaded': statuses.count('téléchargé'),
+            'up_to_date': statuses.count('à jour'),
+            'failed': statuses.count('échec'),
+            'fraction': min(processed / self._total, 1.0) if self._total else 0.0,
+            'elapsed': (end - self.started_at).total_seconds(),
+        }
+
+    def recent(self, n: int = 20) -> pd.DataFrame:
+        """
+        Derniers tickers traités, du plus récent au plus ancien.
+
+        Returns:
+            pd.DataFrame: Colonnes 'Ticker', 'Statut' et 'Heure'
+        """
+        with self._lock:
+            items = list(self._tickers.items())[-n:]
+        return pd.DataFrame([(ticker, status, at.strftime('%H:%M:%S')) for ticker, (status, at) in reversed(items)],
+                            columns=['Ticker', 'Statut', 'Heure'])
+
+
+# Mise à jour en cours ou dernière terminée, partagée par toutes les sessions
+# (elles partagent le même stockage local des cours)
+_current_job: Optional[RefreshJob] = None
+_jobs_lock = threading.Lock()
+
+
+def start_refresh(**kwargs) -> RefreshJob:
+    """
+    Lance une mise à jour en arrière-plan, sauf si une autre est déjà en cours.
+
+    Args:
+        **kwargs: Paramètres de RefreshJob
+
+    Returns:
+        RefreshJob: La nouvelle mise à jour, ou celle déjà en cours
+    """
+    global _current_job
+    with _jobs_lock:
+        if _current_job is not None and _current_job.running:
+            return _current_job
+        _current_job = RefreshJob(**kwargs).start()
+        return _current_job
+
+
+def current_refresh() -> Optional[RefreshJob]:
+    """Mise à jour en cours ou dernière terminée, ou None"""
+    return _current_job
@@ -0,0 +1,235 @@
+import pandas as pd
+import numpy as np
+import os
+import json
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional
+
+from modules.portfolio_manager import PortfolioManager
+from modules.cache import dataset_version
+from modules.returns_matrix import ReturnsMatrix
+
+logger = logging.getLogger(__name__)
+
+# Valeurs par défaut des paramètres d'un scénario (mêmes que la page de gestion)
+SCENARIO_DEFAULTS = {
+    'scenario_id': None,
+    'total_investment': 10000.0,
+    'min_rating': 3.0,
+    'size': 5,
+    'weighting': 'notes',
+    'min_score': None,
+    'max_weight': 1.0,
+    'rebalancing': 'weekly',
+    'threshold': 0.05,
+    'transaction_cost': 0.0,
+    'start_date': None,
+    'end_date': None,
+}
+
+# État des processus de calcul, initialisé une fois par processus
+_worker_state: Dict[str, Any] = {}
+
+
+def read_scenarios(path: str) -> List[Dict[str, Any]]:
+    """
+    Lit un fichier de scénarios JSONL (un objet par ligne) ou CSV (une ligne par scénario).
+
+    Les colonnes reconnues sont celles de SCENARIO_DEFAULTS ; les valeurs
+    absentes prennent leur valeur par défaut. start_date et end_date
+    délimitent la période de backtest.
+
+    Returns:
+        List[Dict[str, Any]]: Scénarios complétés, numérotés dans l'ordre du fichier
+    """
+    if path.endswith('.csv'):
+        frame = pd.read_csv(path)
+    elif path.endswith(('.jsonl', '.json')):
+        frame = pd.read_json(path, lines=True)
+    else:
+        raise ValueError(f"Format de scénarios non pris en charge : {path}")
+
+    unknown = set(frame.columns) - set(SCENARIO_DEFAULTS)
+    if unknown:
+        logger.warning(f"Colonnes ignorées dans {path}: {sorted(unknown)}")
+
+    scenarios = []
+    for position, record in enumerate(frame.to_dict('records')):
+        scenario = dict(SCENARIO_DEFAULTS)
+        # Cellule vide (CSV) ou clé absente d'une ligne (JSONL) : valeur par défaut
+        scenario.update({key: value for key, value in record.items()
+                         if key in SCENARIO_DEFAULTS and not pd.isna(value)})
+        if scenario['scenario_id'] is None:
+            scenario['scenario_id'] = position
+        scenarios.append(scenario)
+    return scenarios
+
+
+def _init_worker(source: Dict[str, Any], notation_df: pd.DataFrame):
+    """
+    Reconstruit la matrice des rendements du processus, sans copie.
+
+    La matrice est lue soit depuis sa projection mémoire sur disque
+    (ReturnsMatrix), soit depuis un segment de mémoire partagée. Elle est en
+    lecture seule : chaque processus ne copie que les colonnes des actifs
+    qu'il simule.
+    """
+    if 'matrix' in source:
+        returns_df = ReturnsMatrix(source['matrix']).to_frame()
+        shm = None
+    else:
+        # Les processus du pool partagent le suivi des ressources du processus parent,
+        # qui reste seul responsable de la suppression du segment
+        shm = shared_memory.SharedMemory(name=source['shm'])
+        values = np.ndarray(source['shape'], dtype=np.float64, buffer=shm.buf)
+        values.setflags(write=False)
+        returns_df = pd.DataFrame(values, index=pd.DatetimeIndex(source['index']), columns=source['columns'],
+                                  copy=False)
+        returns_df.attrs.update(version=source['version'], interval=source['interval'])
+    _worker_state.update(shm=shm, returns_df=returns_df, notation_df=notation_df, managers={})
+
+
+def _manager_for_period(start_date, end_date) -> PortfolioManager:
+    """Gestionnaire de portefeuille d'une période, réutilisé par tous les scénarios de cette période"""
+    key = (start_date, end_date)
+    managers = _worker_state['managers']
+    if key not in managers:
+        returns_df = _worker_state['returns_df']
+        if start_date is not None or end_date is not None:
+            attrs = dict(returns_df.attrs, version=f"{returns_df.attrs['version']}:{start_date}:{end_date}")
+            returns_df = returns_df.loc[start_date:end_date]
+            returns_df.attrs.update(attrs)
+        managers[key] = PortfolioManager(_worker_state['notation_df'], returns_df)
+    return managers[key]
+
+
+def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Crée le portefeuille d'un scénario et en résume les résultats.
+
+    Les erreurs sont renvoyées dans la colonne 'error' plutôt que levées,
+    pour ne pas interrompre le lot.
+
+    Returns:
+        Dict[str, Any]: Paramètres du scénario, métriques, actifs et poids (JSON),
+        valeur finale et durée de calcul
+    """
+    start = time.perf_counter()
+    result = dict(scenario)
+    try:
+        manager = _manager_for_period(scenario['start_date'], scenario['end_date'])
+        portfolio = manager.create_portfolio(
+            total_investment=float(scenario['total_investment']),
+            min_notation=scenario['min_rating'],
+            corresponding_assets=manager.universe.eligible(scenario['min_rating']),
+            size=int(scenario['size']),
+            weighting=scenario['weighting'],
+            min_score=scenario['min_score'],
+            max_weight=scenario['max_weight'],
+            rebalancing=scenario['rebalancing'],
+            threshold=scenario['threshold'],
+            transaction_cost=scenario['transaction_cost'],
+        )
+        result.update(
+            n_assets=len(portfolio['selected_assets']),
+            selected_assets=','.join(portfolio['selected_assets']),
+            weights=json.dumps({asset: float(w) for asset, w in portfolio['weights'].items()}),
+            annual_return=portfolio['annual_return'],
+            volatility=portfolio['volatility'],
+            sharpe_ratio=portfolio['sharpe_ratio'],
+            final_value=float(portfolio['portfolio_value'].iloc[-1]),
+            n_rebalances=portfolio['n_rebalances'],
+            annual_turnover=portfolio['annual_turnover'],
+            transaction_costs=portfolio['transaction_costs'],
+            error=None,
+        )
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {str(e)}"
+    result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def run_scenarios(scenarios: List[Dict[str, Any]], notation_df: pd.DataFrame, returns_df: pd.DataFrame,
+                  n_workers: Optional[int] = None, chunksize: Optional[int] = None) -> pd.DataFrame:
+    """
+    Exécute un lot de scénarios sur un pool de processus.
+
+    Les processus lisent la matrice des rendements sans la copier : ils
+    ouvrent sa projection mémoire lorsqu'elle existe sur disque (voir
+    ReturnsMatrix), sinon elle est placée une seule fois dans un segment de
+    mémoire partagée. Les scénarios d'une même période
+    partagent le gestionnaire de portefeuille (et son cache de simulations)
+    de leur processus.
+
+    Args:
+        scenarios: Scénarios (voir read_scenarios)
+        notation_df: DataFrame des actifs et de leurs notes
+        returns_df: DataFrame des rendements
+        n_workers: Nombre de processus (par défaut le nombre de cœurs ; 1 = sans pool)
+        chunksize: Nombre de scénarios transmis à la fois à un processus
+
+    Returns:
+        pd.DataFrame: Une ligne par scénario, dans l'ordre d'entrée
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(scenarios) // (n_workers * 4))
+    shm = None
+    if os.path.exists(returns_df.attrs.get('returns_matrix') or ''):
+        source = {'matrix': returns_df.attrs['returns_matrix']}
+    else:
+        values = returns_df.to_numpy(dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+        source = {'shm': shm.name, 'shape': values.shape, 'index': returns_df.index.to_numpy(),
+                  'columns': list(returns_df.columns), 'version': dataset_version(returns_df),
+                  'interval': returns_df.attrs.get('interval', '1wk')}
+
+    try:
+        if n_workers == 1:
+            _init_worker(source, notation_df)
+            try:
+                results = [run_scenario(scenario) for scenario in scenarios]
+            finally:
+                _worker_state.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(source, notation_df)) as executor:
+                results = list(executor.map(run_scenario, scenarios, chunksize=chunksize))
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    return pd.DataFrame(results)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Point d'entrée en ligne de commande (voir run_scenarios.py)"""
+    import argparse
+    from modules.data_collector import load_assets_data, update_assets_data
+    from modules.instrumentation import configure_logging
+
+    parser = argparse.ArgumentParser(description="Exécute un lot de scénarios de portefeuille")
+    parser.add_argument('scenarios', help="Fichier de scénarios (.jsonl ou .csv)")
+    parser.add_argument('-o', '--output', default='scenarios_results.parquet', help="Fichier Parquet des résultats")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="Nombre de processus (défaut : nombre de cœurs)")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Télécharge les périodes manquantes avant le calcul (sinon stockage local uniquement)")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    scenarios = read_scenarios(args.scenarios)
+    data = update_assets_data() if args.refresh else load_assets_data()
+    if data is None:
+        raise SystemExit("Aucune donnée disponible : lancez d'abord une mise à jour des données")
+    notation_df, returns_df, _ = data
+
+    start = time.perf_counter()
+    results = run_scenarios(scenarios, notation_df, returns_df, n_workers=args.workers)
+    results.to_parquet(args.output, index=False)
+    failures = int(results['error'].notna().sum())
+    logger.info(f"{len(results)} scénarios calculés en {time.perf_counter() - start:.1f}s "
+                f"({failures} en erreur), résultats dans {args.output}")
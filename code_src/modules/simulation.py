@@ -0,0 +1,111 @@
+import pandas as pd
+import numpy as np
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence
+
+from modules.backtest import valid_returns
+
+logger = logging.getLogger(__name__)
+
+# Méthodes de projection disponibles
+SIMULATION_METHODS = ('bootstrap', 'normal')
+
+
+def _simulate_chunk(portfolio_returns: np.ndarray, horizon: int, n_paths: int, method: str,
+                    block_size: int, seed: np.random.SeedSequence, band_steps: np.ndarray):
+    """
+    Simule un bloc de trajectoires de valeur (valeur initiale 1).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Valeurs aux pas des bandes (n_paths x n_steps, float32)
+        et valeurs finales (n_paths,)
+    """
+    rng = np.random.default_rng(seed)
+    if method == 'bootstrap':
+        # Bootstrap par blocs circulaires des rendements historiques
+        n_blocks = -(-horizon // block_size)
+        starts = rng.integers(0, len(portfolio_returns), size=(n_paths, n_blocks, 1))
+        rows = (starts + np.arange(block_size)) % len(portfolio_returns)
+        simulated = portfolio_returns[rows.reshape(n_paths, -1)[:, :horizon]]
+    else:
+        # Loi normale ajustée : pour des poids constants, le rendement du
+        # portefeuille issu d'une loi normale multivariée est lui-même normal
+        simulated = rng.normal(portfolio_returns.mean(), portfolio_returns.std(ddof=1), size=(n_paths, horizon))
+
+    paths = np.cumprod(1 + simulated, axis=1)
+    paths = np.concatenate((np.ones((n_paths, 1)), paths), axis=1)
+    return paths[:, band_steps].astype(np.float32), paths[:, -1]
+
+
+def simulate_portfolio(returns: np.ndarray, weights: np.ndarray, horizon: int, n_paths: int = 10000,
+                       method: str = 'bootstrap', block_size: int = 4, initial_value: float = 1.0,
+                       seed: Optional[int] = None, chunk_size: int = 5000, n_workers: int = 1,
+                       percentiles: Sequence[float] = (5, 25, 50, 75, 95), confidence: float = 0.95,
+                       n_band_points: int = 60) -> Dict:
+    """
+    Projette la distribution future de la valeur d'un portefeuille à poids constants.
+
+    Les trajectoires sont générées par blocs de taille fixe (mémoire bornée),
+    éventuellement répartis sur un pool de processus. Chaque bloc dispose de
+    son propre générateur dérivé de la graine, si bien que le résultat ne
+    dépend ni du nombre de workers ni de l'ordre d'exécution.
+
+    Args:
+        returns: Rendements historiques des actifs (T x k), NaN pour les périodes invalides
+        weights: Poids des actifs (k,)
+        horizon: Nombre de périodes projetées
+        n_paths: Nombre de trajectoires
+        method: 'bootstrap' (blocs de rendements historiques) ou 'normal' (loi normale ajustée)
+        block_size: Longueur des blocs du bootstrap
+        initial_value: Valeur initiale du portefeuille
+        seed: Graine aléatoire
+        chunk_size: Nombre de trajectoires générées par bloc
+        n_workers: Nombre de processus (1 = exécution locale)
+        percentiles: Percentiles des bandes de projection
+        confidence: Niveau de confiance de la VaR et de la CVaR
+        n_band_points: Nombre maximal de pas conservés pour les bandes
+
+    Returns:
+        Dict: 'bands' (DataFrame des percentiles par pas), 'final_values',
+        'expected_value', 'prob_loss', 'var' et 'cvar' (pertes positives, en valeur)
+    """
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"Méthode de simulation inconnue : {method}")
+    if horizon < 1 or n_paths < 1:
+        raise ValueError("L'horizon et le nombre de trajectoires doivent être positifs")
+
+    portfolio_returns = valid_returns(returns) @ np.asarray(weights, dtype=np.float64)
+    band_steps = np.unique(np.linspace(0, horizon, min(n_band_points, horizon + 1)).round().astype(int))
+
+    chunk_sizes = [min(chunk_size, n_paths - start) for start in range(0, n_paths, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    tasks = [(portfolio_returns, horizon, size, method, block_size, chunk_seed, band_steps)
+             for size, chunk_seed in zip(chunk_sizes, seeds)]
+
+    if n_workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = list(executor.map(_simulate_chunk, *zip(*tasks)))
+    else:
+        results = [_simulate_chunk(*task) for task in tasks]
+
+    band_values = np.concatenate([band for band, _ in results]) * initial_value
+    final_values = np.concatenate([final for _, final in results]) * initial_value
+
+    bands = pd.DataFrame(
+        np.percentile(band_values, percentiles, axis=0).T,
+        index=pd.Index(band_steps, name='step'),
+        columns=[f"p{p:g}" for p in percentiles]
+    )
+    losses = initial_value - final_values
+    var = np.percentile(losses, confidence * 100)
+    tail = losses[losses >= var]
+
+    return {
+        'bands': bands,
+        'final_values': final_values,
+        'expected_value': final_values.mean(),
+        'prob_loss': (final_values < initial_value).mean(),
+        'var': var,
+        'cvar': tail.mean() if len(tail) else var,
+    }
@@ -0,0 +1,312 @@
+import pandas as pd
+import numpy as np
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules.backtest import (
+    backtest_rebalanced, performance_metrics, rebalancing_mask, threshold_mask, valid_returns
+)
+from modules.optimizer import MomentCache, PortfolioOptimizer
+from modules.asset_universe import AssetUniverse
+
+logger = logging.getLogger(__name__)
+
+# Modes de construction des fenêtres d'apprentissage
+WINDOW_MODES = ('rolling', 'expanding')
+
+# Nombre de fenêtres à optimiser au-delà duquel un pool de processus est utilisé par défaut
+PARALLEL_MIN_WINDOWS = 40
+
+
+def walk_forward_windows(n_rows: int, train_size: int, test_size: int,
+                         mode: str = 'rolling') -> List[Tuple[int, int, int]]:
+    """
+    Découpe la période en fenêtres d'apprentissage et de test successives.
+
+    Les indices portent sur les lignes de la matrice des rendements, la
+    ligne 0 étant le point de départ sans rendement réalisé. Chaque fenêtre
+    d'apprentissage [début, fin) est suivie de sa fenêtre de test [fin, fin
+    + test_size) ; les fenêtres de test se succèdent sans recouvrement. Une
+    dernière fenêtre de test incomplète est conservée si elle compte au
+    moins deux périodes.
+
+    Args:
+        n_rows: Nombre de lignes de la matrice des rendements
+        train_size: Longueur de la fenêtre d'apprentissage (en périodes)
+        test_size: Longueur de la fenêtre de test (en périodes)
+        mode: 'rolling' (fenêtre de longueur fixe) ou 'expanding' (depuis le début)
+
+    Returns:
+        List[Tuple[int, int, int]]: Triplets (début d'apprentissage, début du test, fin du test)
+    """
+    if mode not in WINDOW_MODES:
+        raise ValueError(f"Mode de fenêtre inconnu : {mode}")
+    if train_size < 2 or test_size < 2:
+        raise ValueError("Les fenêtres d'apprentissage et de test doivent compter au moins deux périodes")
+
+    windows = []
+    test_start = 1 + train_size
+    while n_rows - test_start >= 2:
+        test_end = min(test_start + test_size, n_rows)
+        train_start = 1 if mode == 'expanding' else test_start - train_size
+        windows.append((train_start, test_start, test_end))
+        test_start = test_end
+    return windows
+
+
+class WindowMoments:
+    """
+    Moments des rendements sur des fenêtres quelconques.
+
+    Seuls les nombres d'observations valides de chaque actif sont cumulés aux
+    bornes des fenêtres (T x k au plus), ce qui donne la couverture d'une
+    fenêtre par différence de deux cumuls. Les moyennes et covariances sont
+    calculées directement sur les lignes de la fenêtre et les seuls actifs
+    candidats, sans conserver de matrice k x k par borne. Les périodes invalides (NaN) sont
+    exclues comme dans MomentCache : moyenne par actif, covariance sur les
+    périodes communes à chaque paire.
+    """
+
+    def __init__(self, returns: np.ndarray, boundaries: List[int], periods_per_year: int):
+        """
+        Args:
+            returns: Matrice des rendements (T x k), NaN pour les périodes invalides
+            boundaries: Lignes auxquelles les cumuls sont conservés (bornes des fenêtres)
+            periods_per_year: Nombre de périodes par an
+        """
+        self.returns = np.asarray(returns, dtype=np.float64)
+        self.periods_per_year = periods_per_year
+        self.boundaries = sorted(set(boundaries))
+        self._positions = {row: i for i, row in enumerate(self.boundaries)}
+
+        # Nombre cumulé de rendements valides de chaque actif avant chaque borne
+        valid_counts = np.vstack([np.zeros(self.returns.shape[1]),
+                                  np.cumsum(~np.isnan(self.returns), axis=0)])
+        self._counts = valid_counts[self.boundaries]
+
+    def counts(self, start: int, end: int) -> np.ndarray:
+        """Nombre de rendements valides de chaque actif sur les lignes [start, end)"""
+        return self._counts[self._positions[end]] - self._counts[self._positions[start]]
+
+    def moments(self, start: int, end: int, idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Moyenne et covariance annualisées des actifs idx sur les lignes [start, end).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Vecteur des moyennes et matrice de covariance
+        """
+        window = self.returns[start:end, idx]
+        valid = ~np.isnan(window)
+        counts = valid.sum(axis=0)
+        mean = np.where(counts > 0, np.where(valid, window, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+        # Somme des produits centrés sur les périodes communes à chaque paire
+        centered = np.where(valid, window - mean, 0.0)
+        pair_counts = valid.T.astype(np.float64) @ valid.astype(np.float64)
+        cov = centered.T @ centered / np.maximum(pair_counts - 1, 1)
+        eigenvalues, eigenvectors = np.linalg.eigh(cov)
+        if eigenvalues.min() < 0:
+            cov = (eigenvectors * eigenvalues.clip(min=0)) @ eigenvectors.T
+        return mean * self.periods_per_year, cov * self.periods_per_year
+
+
+def _fit_window(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Optimise les poids d'une fenêtre à partir de ses moments (exécuté dans un processus du pool).
+
+    Returns:
+        Dict[str, Any]: Poids des actifs retenus, ou message d'erreur
+    """
+    if not task['assets']:
+        return {'weights': None, 'error': "Aucun actif candidat"}
+    try:
+        moments = MomentCache.from_moments(task['assets'], task['mean'], task['cov'])
+        optimizer = PortfolioOptimizer(None, task['notes'], moments=moments)
+        solve = getattr(optimizer, task['weighting'])
+        optimized = solve(task['assets'], size=task['size'], min_score=task['min_score'],
+                          max_weight=task['max_weight'])
+        optimized = optimized[optimized > 1e-6].sort_values(ascending=False)
+        return {'weights': (optimized / optimized.sum()).to_dict(), 'error': None}
+    except Exception as e:
+        return {'weights': None, 'error': f"{type(e).__name__}: {str(e)}"}
+
+
+def _simulate_segment(returns: np.ndarray, index: pd.DatetimeIndex, weights: np.ndarray, rebalancing: str,
+                      threshold: float, transaction_cost: float) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    Simule un segment (première ligne = point de départ) et renvoie les poids dérivés en fin de segment.
+    """
+    if rebalancing == 'threshold':
+        mask = threshold_mask(returns, weights, threshold)
+    else:
+        mask = rebalancing_mask(index, rebalancing)
+    simulation = backtest_rebalanced(returns, weights, mask, initial_value=1.0, transaction_cost=transaction_cost)
+
+    # Dérive des positions depuis le dernier rééquilibrage effectif (voir backtest_rebalanced)
+    last = int(np.flatnonzero(mask[:-1])[-1]) if len(mask) > 1 else 0
+    holdings = weights * np.prod(1 + valid_returns(returns[last + 1:]), axis=0)
+    total = holdings.sum()
+    return simulation, holdings / total if total > 0 else weights
+
+
+def walk_forward(notation_df: pd.DataFrame, returns_df: pd.DataFrame, corresponding_assets: List[str],
+                 train_size: int, test_size: int, mode: str = 'rolling', weighting: str = 'notes',
+                 size: int = 5, min_score: Optional[float] = None, max_weight: float = 1.0,
+                 rebalancing: str = 'weekly', threshold: float = 0.05, transaction_cost: float = 0.0,
+                 total_investment: float = 10000, periods_per_year: int = 52, min_coverage: float = 0.8,
+                 n_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Backtest hors échantillon : sélection et pondération réestimées à chaque fenêtre.
+
+    Pour chaque fenêtre, le portefeuille est construit uniquement à partir
+    des rendements de la fenêtre d'apprentissage (actifs suffisamment cotés,
+    moments calculés par WindowMoments), puis détenu sur la fenêtre de test
+    suivante. Les optimisations des fenêtres sont indépendantes : elles sont
+    exécutées dans le processus courant, ou réparties sur un pool de
+    processus si c'est demandé ou si les fenêtres sont nombreuses (le coût
+    de démarrage du pool n'est alors plus dominant) ; les segments de test
+    sont ensuite enchaînés dans l'ordre, le passage d'un portefeuille au
+    suivant étant facturé comme un rééquilibrage. Une fenêtre dont
+    l'optimisation échoue conserve le portefeuille précédent.
+
+    Args:
+        notation_df: DataFrame des actifs et de leurs notes
+        returns_df: DataFrame des rendements (ligne 0 = point de départ)
+        corresponding_assets: Actifs éligibles
+        train_size: Longueur de la fenêtre d'apprentissage (en périodes)
+        test_size: Longueur de la fenêtre de test (en périodes)
+        mode: 'rolling' ou 'expanding' (voir walk_forward_windows)
+        weighting: Mode de pondération ('notes', 'min_variance' ou 'max_sharpe')
+        size: Nombre d'actifs à sélectionner
+        min_score: Score D&I moyen pondéré minimal (modes optimisés uniquement)
+        max_weight: Poids maximal par actif (modes optimisés uniquement)
+        rebalancing: Calendrier de rééquilibrage dans chaque fenêtre de test
+        threshold: Dérive maximale tolérée sur un poids (mode 'threshold')
+        transaction_cost: Frais proportionnels au montant échangé
+        total_investment: Montant investi au début du premier test
+        periods_per_year: Nombre de périodes par an
+        min_coverage: Part minimale de rendements valides sur la fenêtre d'apprentissage
+            pour qu'un actif soit candidat
+        n_workers: Nombre de processus (1 = exécution locale ; par défaut, le nombre de
+            cœurs à partir de PARALLEL_MIN_WINDOWS fenêtres à optimiser, 1 sinon)
+
+    Returns:
+        Dict[str, Any]: Courbe hors échantillon ('portfolio_value'), ses métriques
+        ('annual_return', 'volatility', 'sharpe_ratio'), frais payés ('transaction_costs')
+        et diagnostics par fenêtre ('windows')
+    """
+    assets = [asset for asset in returns_df.columns if asset in set(corresponding_assets)]
+    if not assets:
+        raise ValueError("Aucun actif éligible disposant de rendements")
+    windows = walk_forward_windows(len(returns_df), train_size, test_size, mode)
+    if not windows:
+        raise ValueError("Période trop courte pour ces fenêtres d'apprentissage et de test")
+
+    returns = returns_df[assets].to_numpy(dtype=np.float64)
+    index = returns_df.index
+    optimized = weighting != 'notes'
+    window_moments = WindowMoments(returns, [row for window in windows for row in window[:2]],
+                                   periods_per_year)
+    universe = AssetUniverse(notation_df, assets=assets)
+
+    # Construction des portefeuilles : sélection directe ou tâches d'optimisation indépendantes
+    candidates_per_window, fits, tasks = [], [], []
+    for train_start, test_start, _ in windows:
+        coverage = window_moments.counts(train_start, test_start) / (test_start - train_start)
+        candidates = [asset for asset, ok in zip(assets, coverage >= min_coverage) if ok]
+        candidates_per_window.append(candidates)
+        if not optimized:
+            selected = universe.top_k(size, candidates=candidates)
+            selected_notes = universe.notes(selected)
+            fits.append({'weights': dict(zip(selected, selected_notes / selected_notes.sum())) if selected else None,
+                         'error': None if selected else "Aucun actif candidat"})
+            continue
+        idx = np.array([assets.index(asset) for asset in candidates], dtype=int)
+        mean, cov = window_moments.moments(train_start, test_start, idx) if len(idx) else (None, None)
+        tasks.append({'assets': candidates, 'mean': mean, 'cov': cov,
+                      'notes': pd.Series(universe.notes(candidates), index=candidates),
+                      'weighting': weighting, 'size': size, 'min_score': min_score, 'max_weight': max_weight})
+
+    if optimized:
+        if n_workers is None:
+            n_workers = (os.cpu_count() or 1) if len(tasks) >= PARALLEL_MIN_WINDOWS else 1
+        if n_workers <= 1 or len(tasks) <= 1:
+            fits = [_fit_window(task) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=min(n_workers, len(tasks))) as executor:
+                fits = list(executor.map(_fit_window, tasks))
+
+    # Enchaînement des fenêtres de test dans l'ordre
+    position = {asset: i for i, asset in enumerate(assets)}
+    first_row = windows[0][1] - 1
+    values = np.full(len(returns_df) - first_row, float(total_investment))
+    held = None
+    held_weights = None
+    rows = []
+    for (train_start, test_start, test_end), candidates, fit in zip(windows, candidates_per_window, fits):
+        error = fit['error']
+        if fit['weights'] is not None:
+            weights = fit['weights']
+        elif held is not None:
+            logger.warning(f"Fenêtre du {index[test_start]:%Y-%m-%d} : {error}, portefeuille précédent conservé")
+            weights = held
+        else:
+            raise ValueError(f"Aucun portefeuille pour la première fenêtre : {error}")
+        selected = list(weights)
+        idx = [position[asset] for asset in selected]
+        weights_vector = np.array([weights[asset] for asset in selected])
+
+        # Performance sur la fenêtre d'apprentissage (en échantillon)
+        in_sample, _ = _simulate_segment(returns[train_start - 1:test_start, idx], index[train_start - 1:test_start],
+                                         weights_vector, rebalancing, threshold, transaction_cost)
+        in_sample_metrics = performance_metrics(in_sample['values'], periods_per_year)
+
+        # Changement de portefeuille au début du test, facturé comme un rééquilibrage
+        switch_turnover = 0.0
+        if held_weights is not None:
+            previous = pd.Series(held_weights)
+            switch_turnover = float(previous.sub(pd.Series(weights), fill_value=0.0).abs().sum())
+        start_value = values[test_start - 1 - first_row]
+        switch_cost = start_value * transaction_cost * switch_turnover
+
+        # Performance sur la fenêtre de test (hors échantillon)
+        out_of_sample, drifted = _simulate_segment(returns[test_start - 1:test_end, idx], index[test_start - 1:test_end],
+                                                   weights_vector, rebalancing, threshold, transaction_cost)
+        segment = out_of_sample['values']
+        values[test_start - first_row:test_end - first_row] = (start_value - switch_cost) * segment[1:]
+        out_of_sample_metrics = performance_metrics(segment, periods_per_year)
+
+        rows.append({
+            'train_start': index[train_start],
+            'train_end': index[test_start - 1],
+            'test_start': index[test_start],
+            'test_end': index[test_end - 1],
+            'n_candidates': len(candidates),
+            'selected_assets': selected,
+            'weights': weights,
+            'in_sample_return': in_sample_metrics['annual_return'],
+            'in_sample_volatility': in_sample_metrics['volatility'],
+            'in_sample_sharpe': in_sample_metrics['sharpe_ratio'],
+            'out_of_sample_return': out_of_sample_metrics['annual_return'],
+            'out_of_sample_volatility': out_of_sample_metrics['volatility'],
+            'out_of_sample_sharpe': out_of_sample_metrics['sharpe_ratio'],
+            'period_return': (segment[-1] * (1 - transaction_cost * switch_turnover) - 1) * 100,
+            'switch_turnover': switch_turnover * 100,
+            'transaction_costs': switch_cost + (start_value - switch_cost) * out_of_sample['costs'].sum(),
+            'error': error,
+        })
+        held = weights
+        held_weights = dict(zip(selected, drifted))
+
+    portfolio_value = pd.Series(values, index=index[first_row:], name='value')
+    metrics = performance_metrics(values, periods_per_year)
+    windows_df = pd.DataFrame(rows)
+    return {
+        'annual_return': metrics['annual_return'],
+        'volatility': metrics['volatility'],
+        'sharpe_ratio': metrics['sharpe_ratio'],
+        'portfolio_value': portfolio_value,
+        'transaction_costs': float(windows_df['transaction_costs'].sum()),
+        'windows': windows_df,
+    }
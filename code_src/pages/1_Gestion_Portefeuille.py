@@ -4,11 +4,17 @@ import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from modules.portfolio_manager import PortfolioManager
-from modules.data_collector import update_assets_data
+from modules.data_collector import load_assets_data
+from modules.refresh_job import start_refresh, current_refresh, SUCCEEDED, CANCELLED
+from modules.cache import returns_statistics, portfolio_results_cache
+from modules.backtest import FREQUENCY_INTERVALS
+from modules.instrumentation import configure_logging, telemetry
+from modules.charts import line_chart, fan_chart
 import logging
+import time
 
-# Configuration du logging
-logging.basicConfig(level=logging.INFO)
+# Configuration du logging (une seule fois par processus)
+configure_logging()
 logger = logging.getLogger(__name__)
 
 # Configuration de la page
@@ -38,51 +44,179 @@ if 'portfolio_size' not in st.session_state:
     st.session_state.portfolio_size = 5
 if 'corresponding_assets' not in st.session_state:
     st.session_state.corresponding_assets = []  
+if 'weighting' not in st.session_state:
+    st.session_state.weighting = 'notes'
+if 'rebalancing' not in st.session_state:
+    st.session_state.rebalancing = 'weekly'
+if 'transaction_cost_bps' not in st.session_state:
+    st.session_state.transaction_cost_bps = 0.0
+if 'frequency' not in st.session_state:
+    st.session_state.frequency = 'weekly'
+if 'missing_data' not in st.session_state:
+    st.session_state.missing_data = 'mask'
+if 'loaded_dataset' not in st.session_state:
+    st.session_state.loaded_dataset = None
+if 'applied_refresh' not in st.session_state:
+    # Une mise à jour déjà terminée à l'ouverture de la session n'est pas réappliquée
+    last_refresh = current_refresh()
+    st.session_state.applied_refresh = last_refresh.id if last_refresh is not None and not last_refresh.running else None
+
+# Libellés des fréquences de rendements proposées
+FREQUENCY_LABELS = {
+    'daily': "Quotidienne",
+    'weekly': "Hebdomadaire",
+    'monthly': "Mensuelle",
+}
+
+# Libellés des traitements des périodes sans cours
+MISSING_DATA_LABELS = {
+    'mask': "Période invalide (exclue des statistiques)",
+    'ffill': "Report du dernier cours",
+    'drop': "Suppression des dates incomplètes",
+}
+
+# Libellés des modes de pondération proposés
+WEIGHTING_LABELS = {
+    'notes': "Proportionnelle aux notes D&I",
+    'min_variance': "Variance minimale",
+    'max_sharpe': "Ratio de Sharpe maximal",
+}
+
+# Libellés des modes de fenêtre du backtest hors échantillon
+WINDOW_MODE_LABELS = {
+    'rolling': "Fenêtre glissante",
+    'expanding': "Fenêtre croissante (depuis le début)",
+}
+
+# Libellés des calendriers de rééquilibrage proposés
+REBALANCING_LABELS = {
+    'none': "Aucun (achat et conservation)",
+    'weekly': "Hebdomadaire",
+    'monthly': "Mensuel",
+    'quarterly': "Trimestriel",
+    'threshold': "Sur dérive des poids",
+}
+
+# Démarrage à partir des cours déjà stockés localement, sans accès réseau, et
+# rechargement lorsque la fréquence ou le traitement des données manquantes
+# change : le jeu de données chargé (matrice projetée en mémoire) est partagé
+# par toutes les sessions
+dataset_options = (st.session_state.frequency, st.session_state.missing_data)
+if st.session_state.portfolio_manager is None or st.session_state.loaded_dataset != dataset_options:
+    st.session_state.loaded_dataset = dataset_options
+    cached_data = load_assets_data(interval=FREQUENCY_INTERVALS[st.session_state.frequency],
+                                   missing=st.session_state.missing_data)
+    if cached_data is not None:
+        notation_df, returns_df, available_assets = cached_data
+        st.session_state.returns_df = returns_df
+        st.session_state.available_assets = available_assets
+        st.session_state.notation_df = notation_df
+        st.session_state.portfolio_manager = PortfolioManager(
+            notation_df=notation_df,
+            returns_df=returns_df,
+            results_cache=portfolio_results_cache
+        )
+    else:
+        # Aucune donnée stockée à cette fréquence : une mise à jour est nécessaire
+        st.session_state.returns_df = None
+        st.session_state.notation_df = None
+        st.session_state.portfolio_manager = None
 
 
 
 # Section pour la mise à jour des données
 st.header("Mise à jour des données")
-if st.button("Mettre à jour les données"):
-    with st.spinner("Mise à jour des données en cours... (1-2 minutes)"):
-        try:
-            # Message d'information sur le temps d'attente
-            st.info("""
-            ⏱️ La mise à jour des données prend environ 1-2 minutes car nous devons :
-            - Télécharger les données historiques de chaque actif depuis Yahoo Finance
-            - Calculer les rendements hebdomadaires
-            
-            Veuillez patienter pendant le téléchargement...
-            """)
-            
-            # Mise à jour des données
-            notation_df, returns_df, available_assets = update_assets_data()
-            
-            if returns_df is not None and not returns_df.empty:
-                st.success("✅ Données mises à jour avec succès!")
-                
+st.selectbox(
+    "Fréquence des rendements",
+    options=list(FREQUENCY_LABELS),
+    format_func=FREQUENCY_LABELS.get,
+    key='frequency',
+    help="L'annualisation des métriques (252, 52 ou 12 périodes par an) suit la fréquence choisie"
+)
+st.selectbox(
+    "Dates sans cours",
+    options=list(MISSING_DATA_LABELS),
+    format_func=MISSING_DATA_LABELS.get,
+    key='missing_data',
+    help="Jours fériés, décalages entre places de cotation ou introduction en bourse en cours de période"
+)
+refresh_esg = st.checkbox(
+    "Rafraîchir les notations ESG",
+    value=False,
+    help="Met à jour les scores sociaux et niveaux de controverse (conservés 30 jours) et recalcule les notes D&I"
+)
+# La mise à jour s'exécute en arrière-plan : la page reste utilisable et
+# continue de servir le dernier jeu de données valide pendant le téléchargement
+refresh_job = current_refresh()
+if refresh_job is not None and refresh_job.running:
+    progress = refresh_job.progress()
+    st.info("""
+    ⏱️ Mise à jour des données en cours :
+    - Téléchargement par lots des périodes manquantes depuis Yahoo Finance (les cours déjà stockés sont réutilisés)
+    - Calcul des rendements à la fréquence choisie
+    - Si demandé, récupération des notations ESG et recalcul des notes D&I
+    
+    Les données précédentes restent utilisables pendant la mise à jour.
+    """)
+    st.progress(progress['fraction'],
+                text=f"{progress['processed']}/{progress['total']} actifs traités "
+                     f"({progress['elapsed']:.0f}s)")
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Téléchargés", progress['downloaded'])
+    col2.metric("Déjà à jour", progress['up_to_date'])
+    col3.metric("En échec", progress['failed'])
+    st.dataframe(refresh_job.recent(), hide_index=True)
+    if refresh_job.cancelling:
+        st.caption("Annulation en cours : les lots déjà lancés se terminent et restent stockés.")
+    elif st.button("Annuler la mise à jour"):
+        refresh_job.cancel()
+        st.rerun()
+else:
+    if refresh_job is not None and refresh_job.id != st.session_state.applied_refresh:
+        # Mise à jour terminée depuis la dernière exécution : résultat appliqué une seule fois par session
+        st.session_state.applied_refresh = refresh_job.id
+        if refresh_job.state == SUCCEEDED:
+            notation_df, returns_df, available_assets = refresh_job.result
+            if (refresh_job.params['interval'] == FREQUENCY_INTERVALS[st.session_state.frequency]
+                    and refresh_job.params['missing'] == st.session_state.missing_data):
                 # Stocker les données dans la session
                 st.session_state.returns_df = returns_df
                 st.session_state.available_assets = available_assets
                 st.session_state.notation_df = notation_df
+                st.session_state.loaded_dataset = dataset_options
                 
                 # Initialiser le gestionnaire de portefeuille
                 st.session_state.portfolio_manager = PortfolioManager(
                     notation_df=notation_df,
-                    returns_df=returns_df
+                    returns_df=returns_df,
+                    results_cache=portfolio_results_cache
                 )
-                
+                st.success(f"✅ Données mises à jour avec succès! ({len(available_assets)} actifs)")
             else:
-                st.error("❌ Aucune donnée n'a pu être récupérée")
-        except Exception as e:
-            st.error(f"❌ Erreur lors de la mise à jour des données: {str(e)}")
+                st.warning("⚠️ Mise à jour terminée, mais la fréquence ou le traitement des dates sans cours "
+                           "ont changé depuis son lancement : ses données n'ont pas été appliquées. "
+                           "Relancez la mise à jour (les cours déjà reçus sont réutilisés).")
+        elif refresh_job.state == CANCELLED:
+            st.warning("⏹️ Mise à jour annulée : les cours déjà reçus sont conservés et seront "
+                       "réutilisés à la reprise.")
+        else:
+            st.error(f"❌ Erreur lors de la mise à jour des données: {refresh_job.error}. "
+                     "Les données précédentes restent utilisées.")
+    resume = refresh_job is not None and refresh_job.state != SUCCEEDED
+    if st.button("Reprendre la mise à jour" if resume else "Mettre à jour les données"):
+        start_refresh(
+            refresh_esg=refresh_esg,
+            interval=FREQUENCY_INTERVALS[st.session_state.frequency],
+            missing=st.session_state.missing_data
+        )
+        st.rerun()
 
 
 # Afficher les statistiques des rendements
 if st.session_state.returns_df is not None: 
     st.subheader("Statistiques des rendements")
     st.write("Rendements sur la période du 01/01/2023 au 31/12/2024")
-    st.dataframe(st.session_state.returns_df.describe())
+    st.dataframe(returns_statistics(st.session_state.returns_df)['describe'])
 
 
 
@@ -113,12 +247,115 @@ with st.sidebar:
             value=st.session_state.min_rating,
             step=0.1
         )
-        st.session_state.corresponding_assets = []
+        # Actifs au-dessus de la note minimale, par recherche dichotomique dans l'index des notes
+        st.session_state.corresponding_assets = st.session_state.portfolio_manager.universe.eligible(
+            st.session_state.min_rating
+        )
+
+        # Mode de pondération et contraintes d'optimisation
+        st.session_state.weighting = st.selectbox(
+            "Pondération",
+            options=list(WEIGHTING_LABELS),
+            format_func=WEIGHTING_LABELS.get,
+            index=list(WEIGHTING_LABELS).index(st.session_state.weighting)
+        )
+        if st.session_state.weighting != 'notes':
+            st.session_state.min_score = st.slider(
+                "Score D&I moyen minimal du portefeuille",
+                min_value=float(st.session_state.notation_df['Note'].min()),
+                max_value=float(st.session_state.notation_df['Note'].max()),
+                value=st.session_state.get('min_score', st.session_state.min_rating),
+                step=0.1
+            )
+            st.session_state.max_weight = st.slider(
+                "Poids maximal par actif",
+                min_value=0.05,
+                max_value=1.0,
+                value=st.session_state.get('max_weight', 0.4),
+                step=0.05
+            )
+            if st.session_state.portfolio_size * st.session_state.max_weight < 1.0 - 1e-9:
+                st.warning(f"Avec {st.session_state.portfolio_size} actifs plafonnés à "
+                           f"{st.session_state.max_weight:.0%}, le portefeuille ne peut pas être investi en totalité : "
+                           "augmentez le poids maximal ou le nombre d'actifs.")
+
+        # Rééquilibrage et frais de transaction
+        st.session_state.rebalancing = st.selectbox(
+            "Rééquilibrage",
+            options=list(REBALANCING_LABELS),
+            format_func=REBALANCING_LABELS.get,
+            index=list(REBALANCING_LABELS).index(st.session_state.rebalancing)
+        )
+        if st.session_state.rebalancing == 'threshold':
+            st.session_state.threshold = st.slider(
+                "Dérive maximale d'un poids avant rééquilibrage",
+                min_value=0.01,
+                max_value=0.20,
+                value=st.session_state.get('threshold', 0.05),
+                step=0.01
+            )
+        st.session_state.transaction_cost_bps = st.number_input(
+            "Frais de transaction (points de base)",
+            min_value=0.0,
+            max_value=200.0,
+            value=st.session_state.transaction_cost_bps,
+            step=5.0
+        )
+
+        # Projection de la valeur future du portefeuille
+        st.session_state.projection = st.checkbox(
+            "Projeter la valeur future",
+            value=st.session_state.get('projection', False)
+        )
+        if st.session_state.projection:
+            periods_per_year = (st.session_state.portfolio_manager.periods_per_year
+                                if st.session_state.portfolio_manager is not None else 52)
+            st.session_state.projection_horizon = st.number_input(
+                "Horizon de projection (périodes)",
+                min_value=1,
+                max_value=10 * periods_per_year,
+                value=min(st.session_state.get('projection_horizon', periods_per_year), 10 * periods_per_year),
+                step=1
+            )
+            st.session_state.projection_method = st.selectbox(
+                "Méthode de projection",
+                options=['bootstrap', 'normal'],
+                format_func={'bootstrap': "Bootstrap par blocs", 'normal': "Loi normale ajustée"}.get
+            )
 
-        
-        for asset in st.session_state.available_assets:     
-            if st.session_state.notation_df[st.session_state.notation_df['Ticker']==asset]['Note'].iloc[0]>= st.session_state.min_rating:
-                st.session_state.corresponding_assets.append(asset)
+        # Surface de compromis note minimale / taille, évaluée en un seul appel puis conservée
+        # dans la session : les exécutions de suivi d'une mise à jour ne la recalculent pas
+        if st.session_state.portfolio_manager is not None and st.checkbox("Afficher le compromis note / taille"):
+            notes_grid = np.round(np.arange(
+                np.floor(st.session_state.notation_df['Note'].min()),
+                st.session_state.notation_df['Note'].max(),
+                0.5
+            ), 1)
+            sizes_grid = range(5, len(st.session_state.available_assets) + 1)
+            surface_key = (st.session_state.portfolio_manager, st.session_state.total_investment,
+                           tuple(notes_grid), tuple(sizes_grid))
+            cached_surface = st.session_state.get('tradeoff_surface')
+            if cached_surface is not None and cached_surface[0] == surface_key:
+                fig = cached_surface[1]
+            elif refresh_job is not None and refresh_job.running:
+                fig = None
+                st.caption("Compromis note / taille calculé à la fin de la mise à jour des données.")
+            else:
+                surface = st.session_state.portfolio_manager.evaluate_portfolios(
+                    configurations=[(note, size) for note in notes_grid for size in sizes_grid],
+                    total_investment=st.session_state.total_investment
+                )
+                # Les configurations sans assez d'actifs éligibles ne sont pas proposées
+                surface.loc[surface['n_assets'] < surface['size'], 'sharpe_ratio'] = np.nan
+                fig = px.imshow(
+                    surface.pivot(index='min_notation', columns='size', values='sharpe_ratio'),
+                    labels=dict(x="Nombre d'actifs", y="Note minimale", color="Sharpe"),
+                    title="Ratio de Sharpe par configuration",
+                    aspect='auto'
+                )
+                st.session_state.tradeoff_surface = (surface_key, fig)
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
             
 
 # Vérifier si des données sont disponibles
@@ -133,6 +370,8 @@ else:
     st.header("Création du portefeuille")
     # Bouton pour créer le portefeuille
     if st.button("Créer le portefeuille"):
+        # Le portefeuille affiché ne doit pas être effacé par le suivi de la mise à jour
+        refresh_job = None
         with st.spinner("Création du portefeuille en cours..."):
             try:
                 # Création du portefeuille
@@ -140,38 +379,191 @@ else:
                     total_investment=st.session_state.total_investment,
                     min_notation=st.session_state.min_rating,
                     corresponding_assets=st.session_state.corresponding_assets,
-                    size=st.session_state.portfolio_size
+                    size=st.session_state.portfolio_size,
+                    weighting=st.session_state.weighting,
+                    min_score=st.session_state.get('min_score') if st.session_state.weighting != 'notes' else None,
+                    max_weight=st.session_state.get('max_weight', 1.0),
+                    rebalancing=st.session_state.rebalancing,
+                    threshold=st.session_state.get('threshold', 0.05),
+                    transaction_cost=st.session_state.transaction_cost_bps / 10000
                 )
                 
-                # Affichage des résultats
-                st.subheader("Résultats du portefeuille")
-                st.write(f"Rendement annuel: {portfolio['annual_return']:.2f}%")
-                st.write(f"Volatilité: {portfolio['volatility']:.2f}%")
-                st.write(f"Ratio de Sharpe: {portfolio['sharpe_ratio']:.2f}")
-                st.write(f"Valeur finale du portefeuille: {portfolio['portfolio_value'][-1]:.2f}€")
+                # Affichage des résultats, chronométré pour la synthèse d'instrumentation
+                with telemetry.span('rendering', weighting=st.session_state.weighting,
+                                    projection=bool(st.session_state.get('projection', False))):
+                    st.subheader("Résultats du portefeuille")
+                    st.write(f"Rendement annuel: {portfolio['annual_return']:.2f}%")
+                    st.write(f"Volatilité: {portfolio['volatility']:.2f}%")
+                    st.write(f"Ratio de Sharpe: {portfolio['sharpe_ratio']:.2f}")
+                    st.write(f"Valeur finale du portefeuille: {portfolio['portfolio_value'].iloc[-1]:.2f}€")
+                    st.write(f"Rééquilibrages: {portfolio['n_rebalances']} "
+                             f"(rotation annuelle: {portfolio['annual_turnover']:.1f}%, "
+                             f"frais payés: {portfolio['transaction_costs']:.2f}€)")
+                    cache_info = st.session_state.portfolio_manager.cache_info()
+                    st.caption(f"Cache des simulations : {cache_info['hits']} succès, {cache_info['misses']} échecs, "
+                               f"{cache_info['size']}/{cache_info['max_entries']} entrées")
                 
-                # Création du diagramme camembert
-                weights_df = pd.DataFrame(list(portfolio['weights'].items()), columns=['Actif', 'Poids'])
-                fig = px.pie(weights_df, values='Poids', names='Actif', 
-                            title='Répartition du portefeuille',
-                            hole=0.3)  # Crée un donut chart
-                fig.update_traces(textposition='inside', textinfo='percent+label')
-                st.plotly_chart(fig)
+                    # Création du diagramme camembert
+                    weights_df = pd.DataFrame(list(portfolio['weights'].items()), columns=['Actif', 'Poids'])
+                    fig = px.pie(weights_df, values='Poids', names='Actif', 
+                                title='Répartition du portefeuille',
+                                hole=0.3)  # Crée un donut chart
+                    fig.update_traces(textposition='inside', textinfo='percent+label')
+                    st.plotly_chart(fig)
                 
-                # Affichage des actifs sélectionnés
-                st.subheader("Actifs sélectionnés")
-                st.write("Les actifs suivants ont été sélectionnés pour le portefeuille :")
-                for asset in portfolio['selected_assets']:
-                    st.write(f"- {asset}")
+                    # Affichage des actifs sélectionnés
+                    st.subheader("Actifs sélectionnés")
+                    st.write("Les actifs suivants ont été sélectionnés pour le portefeuille :")
+                    for asset in portfolio['selected_assets']:
+                        st.write(f"- {asset}")
                 
 
-                # Graphique de l'évolution du portefeuille
-                st.subheader("Évolution du portefeuille")
-                fig = px.line(portfolio['portfolio_value'], title="Valeur du portefeuille au fil du temps")
-                st.plotly_chart(fig)
+                    # Graphique de l'évolution du portefeuille
+                    st.subheader("Évolution du portefeuille")
+                    fig = line_chart(portfolio['portfolio_value'], title="Valeur du portefeuille au fil du temps",
+                                     yaxis_title="Valeur (€)")
+                    st.plotly_chart(fig)
+
+                    # Métriques de risque glissantes
+                    st.subheader("Risque glissant (6 mois)")
+                    rolling = st.session_state.portfolio_manager.get_rolling_metrics()
+                    fig = line_chart(rolling[['volatility', 'drawdown', 'max_drawdown']],
+                                     yaxis_title='%', legend_title='Métrique',
+                                     title="Volatilité annualisée et drawdowns")
+                    st.plotly_chart(fig)
+                    fig = line_chart(rolling[['sharpe_ratio', 'sortino_ratio']],
+                                     yaxis_title='Ratio', legend_title='Métrique',
+                                     title="Ratios de Sharpe et de Sortino glissants")
+                    st.plotly_chart(fig)
+
+                    # Projection Monte Carlo de la valeur du portefeuille
+                    if st.session_state.projection:
+                        st.subheader("Projection de la valeur du portefeuille")
+                        final_value = portfolio['portfolio_value'].iloc[-1]
+                        projection = st.session_state.portfolio_manager.project_portfolio(
+                            portfolio['weights'],
+                            horizon=st.session_state.projection_horizon,
+                            total_investment=final_value,
+                            method=st.session_state.projection_method,
+                            seed=0
+                        )
+                        st.write(f"Probabilité de perte à l'horizon: {projection['prob_loss'] * 100:.1f}%")
+                        st.write(f"VaR 95%: {projection['var']:.2f}€ — CVaR 95%: {projection['cvar']:.2f}€")
+                        fig = fan_chart(projection['bands'], title="Distribution projetée de la valeur du portefeuille",
+                                        xaxis_title="Périodes", yaxis_title="Valeur (€)")
+                        st.plotly_chart(fig)
+
+                    # Frontière efficiente pour les modes optimisés : la frontière ignore la limite
+                    # du nombre d'actifs, elle est donc tracée sur les actifs retenus par cette
+                    # limite pour rester comparable au portefeuille
+                    if st.session_state.weighting != 'notes':
+                        st.subheader("Frontière efficiente")
+                        frontier = st.session_state.portfolio_manager.efficient_frontier(
+                            portfolio['selected_assets'],
+                            min_score=st.session_state.min_score,
+                            max_weight=st.session_state.max_weight
+                        )
+                        fig = px.line(frontier, x='volatility', y='return', markers=True,
+                                      labels={'volatility': 'Volatilité (%)', 'return': 'Rendement annuel (%)'},
+                                      title=f"Frontière efficiente des {len(portfolio['selected_assets'])} "
+                                            f"actifs du portefeuille")
+                        # Position du portefeuille calculée avec les mêmes moments que la frontière
+                        selected_weights = pd.Series(portfolio['weights'])
+                        mean, cov = st.session_state.portfolio_manager.optimizer.moments.moments(list(selected_weights.index))
+                        fig.add_trace(go.Scatter(x=[np.sqrt(selected_weights.values @ cov @ selected_weights.values) * 100],
+                                                 y=[selected_weights.values @ mean * 100],
+                                                 mode='markers', marker=dict(size=12), name='Portefeuille'))
+                        st.plotly_chart(fig)
   
                 
             except Exception as e:
                 st.error(f"Erreur lors de la création du portefeuille: {str(e)}")
 
-        
+    # Backtest hors échantillon : construction réestimée à chaque fenêtre avec les paramètres de la barre latérale
+    st.header("Validation hors échantillon (walk-forward)")
+    periods_per_year = st.session_state.portfolio_manager.periods_per_year
+    col1, col2, col3 = st.columns(3)
+    window_mode = col1.selectbox("Fenêtre d'apprentissage", options=list(WINDOW_MODE_LABELS),
+                                 format_func=WINDOW_MODE_LABELS.get)
+    train_size = col2.number_input("Apprentissage (périodes)", min_value=2, value=periods_per_year, step=1)
+    test_size = col3.number_input("Test (périodes)", min_value=2, value=max(periods_per_year // 4, 2), step=1)
+    if st.button("Lancer le backtest hors échantillon"):
+        refresh_job = None
+        with st.spinner("Réestimation du portefeuille sur chaque fenêtre..."):
+            try:
+                walk = st.session_state.portfolio_manager.walk_forward(
+                    st.session_state.corresponding_assets,
+                    train_size=int(train_size),
+                    test_size=int(test_size),
+                    mode=window_mode,
+                    total_investment=st.session_state.total_investment,
+                    size=st.session_state.portfolio_size,
+                    weighting=st.session_state.weighting,
+                    min_score=st.session_state.get('min_score') if st.session_state.weighting != 'notes' else None,
+                    max_weight=st.session_state.get('max_weight', 1.0),
+                    rebalancing=st.session_state.rebalancing,
+                    threshold=st.session_state.get('threshold', 0.05),
+                    transaction_cost=st.session_state.transaction_cost_bps / 10000
+                )
+                windows = walk['windows']
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Rendement annuel hors échantillon", f"{walk['annual_return']:.2f}%")
+                col2.metric("Volatilité", f"{walk['volatility']:.2f}%")
+                col3.metric("Ratio de Sharpe", f"{walk['sharpe_ratio']:.2f}",
+                            delta=f"{walk['sharpe_ratio'] - windows['in_sample_sharpe'].mean():.2f} vs en échantillon")
+                st.write(f"{len(windows)} fenêtres, valeur finale: {walk['portfolio_value'].iloc[-1]:.2f}€, "
+                         f"frais payés: {walk['transaction_costs']:.2f}€")
+                # Comparaison avec le portefeuille construit sur toute la période, ramené à la même valeur initiale
+                in_sample = st.session_state.portfolio_manager.create_portfolio(
+                    total_investment=st.session_state.total_investment,
+                    min_notation=st.session_state.min_rating,
+                    corresponding_assets=st.session_state.corresponding_assets,
+                    size=st.session_state.portfolio_size,
+                    weighting=st.session_state.weighting,
+                    min_score=st.session_state.get('min_score') if st.session_state.weighting != 'notes' else None,
+                    max_weight=st.session_state.get('max_weight', 1.0),
+                    rebalancing=st.session_state.rebalancing,
+                    threshold=st.session_state.get('threshold', 0.05),
+                    transaction_cost=st.session_state.transaction_cost_bps / 10000
+                )['portfolio_value']
+                in_sample = in_sample.loc[walk['portfolio_value'].index[0]:]
+                in_sample = in_sample / in_sample.iloc[0] * st.session_state.total_investment
+                fig = line_chart({"Hors échantillon (walk-forward)": walk['portfolio_value'],
+                                  "En échantillon (période complète)": in_sample},
+                                 title="Valeur du portefeuille hors échantillon (fenêtres de test enchaînées)",
+                                 yaxis_title="Valeur (€)")
+                for test_start in windows['test_start'].iloc[1:]:
+                    fig.add_vline(x=test_start, line_dash='dot', line_width=1, opacity=0.4)
+                st.plotly_chart(fig)
+                st.subheader("Diagnostics par fenêtre")
+                diagnostics = windows.drop(columns=['weights']).assign(
+                    selected_assets=windows['selected_assets'].str.join(', '))
+                st.dataframe(diagnostics.round(2), hide_index=True)
+            except Exception as e:
+                st.error(f"Erreur lors du backtest hors échantillon: {str(e)}")
+
+
+# Synthèse de l'instrumentation : répartition du temps des mises à jour et des portefeuilles
+with st.expander("⏱️ Instrumentation"):
+    spans = telemetry.span_summary()
+    if spans.empty:
+        st.write("Aucune mesure enregistrée pour le moment.")
+    else:
+        st.write("Temps passé par étape (ms) depuis le démarrage de l'application :")
+        st.dataframe(spans.round(1))
+        fetches = telemetry.fetch_summary()
+        if fetches['tickers']:
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Tickers", fetches['tickers'])
+            col2.metric("Déjà stockés", fetches['cache_hits'])
+            col3.metric("Nouvelles tentatives", fetches['retries'])
+            col4.metric("Latence moyenne", f"{fetches['mean_latency_ms']:.0f} ms")
+            st.caption(f"{fetches['memory_bytes'] / 2 ** 20:.2f} Mo de cours en mémoire, {fetches['failures']} échecs. "
+                       f"Détail des événements : {telemetry.path}")
+
+
+# Suivi de la mise à jour en arrière-plan : nouvelle exécution de la page une
+# fois celle-ci entièrement affichée (toute interaction l'interrompt)
+if refresh_job is not None and refresh_job.running:
+    time.sleep(1)
+    st.rerun()
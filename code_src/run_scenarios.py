@@ -0,0 +1,10 @@
+"""
+Exécution d'un lot de scénarios de portefeuille sans l'interface Streamlit.
+
+Utilisation (depuis la racine du dépôt) :
+    python code_src/run_scenarios.py scenarios.jsonl -o resultats.parquet -j 8
+"""
+from modules.scenario_runner import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Les modules de l'application s'importent depuis code_src (from modules.x import y)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.instrumentation import telemetry  # noqa: E402
+
+# Les tests ne doivent pas écrire de télémétrie dans data/
+telemetry.path = None
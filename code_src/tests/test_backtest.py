@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.backtest import backtest_rebalanced, rebalancing_mask, threshold_mask
+
+
+def reference_backtest(returns, weights, schedule=None, threshold=None, transaction_cost=0.0):
+    """Boucle période par période : dérive des positions, rééquilibrage et frais"""
+    returns = np.nan_to_num(returns)
+    T = len(returns)
+    values = np.ones(T)
+    turnover = np.zeros(T)
+    mask = np.zeros(T, dtype=bool)
+    mask[0] = True
+    holdings = weights.copy()
+    for t in range(1, T):
+        holdings = holdings * (1 + returns[t])
+        values[t] = holdings.sum()
+        if t == T - 1:
+            break
+        drifted = holdings / values[t]
+        if threshold is not None:
+            rebalance = np.abs(drifted - weights).max() > threshold
+        else:
+            rebalance = schedule[t] != schedule[t + 1]
+        if rebalance:
+            mask[t] = True
+            turnover[t] = np.abs(drifted - weights).sum()
+            values[t] *= 1 - transaction_cost * turnover[t]
+            holdings = values[t] * weights
+    return values, turnover, mask
+
+
+@pytest.fixture
+def market():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.002, 0.04, size=(120, 4))
+    returns[0] = np.nan
+    # Actif introduit en cours de période et jour sans cotation
+    returns[:30, 3] = np.nan
+    returns[70, 1] = np.nan
+    index = pd.date_range('2022-01-03', periods=len(returns), freq='W-MON')
+    return returns, index, np.array([0.4, 0.3, 0.2, 0.1])
+
+
+@pytest.mark.parametrize('schedule, freq', [('weekly', 'W'), ('monthly', 'M'), ('quarterly', 'Q')])
+@pytest.mark.parametrize('transaction_cost', [0.0, 0.002])
+def test_calendar_rebalancing_matches_reference_loop(market, schedule, freq, transaction_cost):
+    returns, index, weights = market
+    mask = rebalancing_mask(index, schedule)
+
+    result = backtest_rebalanced(returns, weights, mask, transaction_cost=transaction_cost)
+
+    values, turnover, expected_mask = reference_backtest(returns, weights, schedule=index.to_period(freq),
+                                                         transaction_cost=transaction_cost)
+    np.testing.assert_array_equal(mask[:-1], expected_mask[:-1])
+    np.testing.assert_allclose(result['values'], values)
+    np.testing.assert_allclose(result['turnover'], turnover, atol=1e-12)
+    np.testing.assert_allclose(result['costs'][1:], (values * transaction_cost * turnover
+                                                     / (1 - transaction_cost * turnover))[1:], atol=1e-12)
+
+
+@pytest.mark.parametrize('threshold', [0.01, 0.05, 0.2])
+def test_threshold_rebalancing_matches_reference_loop(market, threshold):
+    returns, _, weights = market
+    mask = threshold_mask(returns, weights, threshold, lookahead=4)
+
+    result = backtest_rebalanced(returns, weights, mask, transaction_cost=0.001)
+
+    values, turnover, expected_mask = reference_backtest(returns, weights, threshold=threshold,
+                                                         transaction_cost=0.001)
+    np.testing.assert_array_equal(mask, expected_mask)
+    np.testing.assert_allclose(result['values'], values)
+    np.testing.assert_allclose(result['turnover'], turnover, atol=1e-12)
+
+
+def test_buy_and_hold_has_no_costs(market):
+    returns, index, weights = market
+
+    result = backtest_rebalanced(returns, weights, rebalancing_mask(index, 'none'), transaction_cost=0.01)
+
+    growth = np.cumprod(1 + np.nan_to_num(returns[1:]), axis=0) @ weights
+    np.testing.assert_allclose(result['values'][1:], growth)
+    assert result['costs'].sum() == 0.0
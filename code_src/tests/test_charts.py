@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.charts import downsample, downsample_frame, lttb_indices
+
+
+def random_walk(n, seed=0):
+    dates = pd.date_range('2020-01-06', periods=n, freq='W-MON')
+    return pd.Series(np.random.default_rng(seed).normal(0, 1, n).cumsum(), index=dates)
+
+
+@pytest.mark.parametrize('n, n_out', [(10, 3), (1000, 100), (1001, 250)])
+def test_lttb_keeps_endpoints_and_target_length(n, n_out):
+    y = random_walk(n).to_numpy()
+
+    indices = lttb_indices(np.arange(n), y, n_out)
+
+    assert len(indices) == n_out
+    assert indices[0] == 0 and indices[-1] == n - 1
+    assert (np.diff(indices) > 0).all()
+
+
+def test_lttb_keeps_isolated_peak():
+    y = np.zeros(500)
+    y[123] = 10.0
+
+    assert 123 in lttb_indices(np.arange(500), y, 20)
+
+
+@pytest.mark.parametrize('n_out', [50, 60, 2])
+def test_short_inputs_pass_through(n_out):
+    series = random_walk(50)
+
+    assert (lttb_indices(np.arange(50), series.to_numpy(), n_out) == np.arange(50)).all()
+    if n_out >= 50:
+        pd.testing.assert_series_equal(downsample(series, n_out), series)
+        pd.testing.assert_frame_equal(downsample_frame(series.to_frame(), n_out), series.to_frame())
+
+
+def test_downsample_frame_keeps_shared_rows_within_budget():
+    frame = pd.DataFrame({'p5': random_walk(2000, seed=1), 'p50': random_walk(2000, seed=2),
+                          'p95': random_walk(2000, seed=3)})
+
+    reduced = downsample_frame(frame, max_points=300)
+
+    assert len(reduced) <= 300
+    assert reduced.index[0] == frame.index[0] and reduced.index[-1] == frame.index[-1]
+    # Toutes les colonnes conservent les mêmes lignes, dans l'ordre
+    assert reduced.index.is_monotonic_increasing
+    pd.testing.assert_frame_equal(reduced, frame.loc[reduced.index])
+    assert len(downsample(frame['p50'], 300)) == 300
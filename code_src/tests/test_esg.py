@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from modules.data_collector import update_assets_data
+from modules.esg_collector import (
+    CONTROVERSY_COLUMN, LABEL_WEIGHTS, SOCIAL_SCORE_COLUMN, compute_di_scores, fetch_esg_scores
+)
+from modules.price_provider import FakePriceProvider, RateLimitError
+from modules.price_store import PriceStore
+from modules.rate_limiter import AdaptiveRateLimiter
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 6, 30)
+
+
+class FailingEsgProvider:
+    """Source ESG qui échoue si elle est interrogée"""
+
+    def fetch(self, ticker):
+        raise AssertionError("accès réseau inattendu")
+
+
+class ScriptedEsgProvider:
+    """Source ESG : notation, actif non couvert, quota épuisé ou erreur réseau selon le ticker"""
+
+    def __init__(self):
+        self.requests = []
+
+    def fetch(self, ticker):
+        self.requests.append(ticker)
+        if ticker == 'THROTTLED':
+            raise RateLimitError("Too Many Requests")
+        if ticker == 'BROKEN':
+            raise ConnectionError("connexion interrompue")
+        if ticker == 'UNCOVERED':
+            return None
+        return {'social_score': 12.0, 'controversy_level': 2.0}
+
+
+def write_assets(path):
+    assets = pd.DataFrame({'Actions': ['A', 'B', 'C'], 'Ticker': ['AAA', 'BBB', 'CCC']})
+    for column in LABEL_WEIGHTS:
+        assets[column] = [1, 0, 1]
+    assets[SOCIAL_SCORE_COLUMN] = [5.0, 10.0, 15.0]
+    assets[CONTROVERSY_COLUMN] = [1.0, 2.0, 3.0]
+    assets['Note'] = 0.0
+    assets.to_excel(path, index=False)
+    return assets
+
+
+def write_esg_cache(path, fetched_at):
+    cache = pd.DataFrame({'social_score': [20.0, 4.0], 'controversy_level': [4.0, 0.0],
+                          'fetched_at': [fetched_at.isoformat(timespec='seconds')] * 2},
+                         index=pd.Index(['AAA', 'BBB'], name='Ticker'))
+    cache.to_parquet(path)
+    return cache
+
+
+def test_offline_esg_scores_use_cache_regardless_of_age(tmp_path):
+    cache_path = str(tmp_path / 'esg.parquet')
+    write_esg_cache(cache_path, datetime.now() - timedelta(days=365))
+
+    scores = fetch_esg_scores(['AAA', 'BBB', 'CCC'], provider=FailingEsgProvider(),
+                              cache_path=cache_path, offline=True)
+
+    assert sorted(scores.index) == ['AAA', 'BBB']
+
+
+def test_offline_update_applies_cached_esg_scores(tmp_path):
+    assets_file = str(tmp_path / 'actifs.xlsx')
+    cache_path = str(tmp_path / 'esg.parquet')
+    assets = write_assets(assets_file)
+    cache = write_esg_cache(cache_path, datetime.now())
+    store = PriceStore(root=str(tmp_path / 'prices'), interval='1wk')
+    store.append_many(FakePriceProvider().fetch_prices(['AAA', 'BBB', 'CCC'], START, END), START, END)
+
+    notation_df, _, available = update_assets_data(store=store, offline=True, assets_file=assets_file,
+                                                   esg_cache_path=cache_path, start_date=START,
+                                                   end_date=END, returns_root=None)
+
+    expected = compute_di_scores(assets, cache).set_index('Ticker')
+    notation_df = notation_df.set_index('Ticker')
+    assert sorted(available) == ['AAA', 'BBB', 'CCC']
+    assert notation_df.loc['AAA', SOCIAL_SCORE_COLUMN] == 20.0
+    assert notation_df.loc['CCC', SOCIAL_SCORE_COLUMN] == 15.0
+    pd.testing.assert_series_equal(notation_df['Note'], expected['Note'], check_exact=False)
+
+
+def test_failed_esg_requests_are_not_cached(tmp_path):
+    cache_path = str(tmp_path / 'esg.parquet')
+    tickers = ['AAA', 'UNCOVERED', 'THROTTLED', 'BROKEN']
+    limiter = AdaptiveRateLimiter(min_interval=0.0, max_interval=0.0)
+
+    scores = fetch_esg_scores(tickers, provider=ScriptedEsgProvider(), cache_path=cache_path,
+                              limiter=limiter, max_retries=2)
+
+    assert list(scores.index) == ['AAA']
+    cached = pd.read_parquet(cache_path)
+    assert sorted(cached.index) == ['AAA', 'UNCOVERED']
+    assert cached.loc['UNCOVERED', ['social_score', 'controversy_level']].isna().all()
+
+    # Seuls les actifs en échec sont interrogés à nouveau
+    provider = ScriptedEsgProvider()
+    fetch_esg_scores(tickers, provider=provider, cache_path=cache_path, limiter=limiter, max_retries=2)
+    assert sorted(provider.requests) == ['BROKEN', 'THROTTLED', 'THROTTLED']
@@ -0,0 +1,148 @@
+import pandas as pd
+import pytest
+import yfinance as yf
+
+from modules import data_collector
+from modules.data_collector import fetch_all_prices, fetch_batch
+from modules.rate_limiter import AdaptiveRateLimiter
+from modules.price_provider import FakePriceProvider, RateLimitError, YahooFinanceProvider
+
+START = pd.Timestamp('2023-01-02')
+END = pd.Timestamp('2023-06-30')
+
+
+class RecordingLimiter(AdaptiveRateLimiter):
+    """Limiteur sans attente qui compte les succès et les limitations"""
+
+    def __init__(self):
+        super().__init__(min_interval=0.0)
+        self.successes = 0
+        self.throttles = 0
+
+    def on_success(self):
+        self.successes += 1
+        super().on_success()
+
+    def on_throttle(self):
+        self.throttles += 1
+        super().on_throttle()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Remplace les attentes par un enregistrement de leur durée"""
+    durations = []
+    monkeypatch.setattr(data_collector.time, 'sleep', durations.append)
+    return durations
+
+
+def tickers(n):
+    return [f"T{i:03d}" for i in range(n)]
+
+
+def test_fetch_all_prices_splits_tickers_into_batches(sleeps):
+    provider = FakePriceProvider(max_batch_size=10)
+
+    prices = fetch_all_prices(tickers(45), provider=provider, limiter=RecordingLimiter(),
+                              start_date=START, end_date=END)
+
+    assert sorted(prices) == tickers(45)
+    assert sorted(len(request) for request in provider.requests) == [5, 10, 10, 10, 10]
+    assert all(series.index.is_monotonic_increasing for series in prices.values())
+
+
+def test_missing_tickers_are_retried_with_backoff(sleeps):
+    provider = FakePriceProvider(fail_tickers=['T001'], flaky_tickers=['T003'])
+    limiter = RecordingLimiter()
+
+    prices = fetch_batch(provider, tickers(5), limiter, START, END, max_retries=3, retry_delay=0.5)
+
+    assert sorted(prices) == ['T000', 'T002', 'T003', 'T004']
+    # Seuls les tickers encore absents sont redemandés
+    assert provider.requests == [tickers(5), ['T001', 'T003'], ['T001']]
+    assert sleeps == [0.5, 1.0]
+    # Un lot incomplet ne relâche pas le limiteur
+    assert limiter.successes == 0
+
+
+def test_complete_batch_relaxes_limiter(sleeps):
+    provider = FakePriceProvider(flaky_tickers=['T002'])
+    limiter = RecordingLimiter()
+
+    prices = fetch_batch(provider, tickers(4), limiter, START, END, retry_delay=0.5)
+
+    assert sorted(prices) == tickers(4)
+    assert len(provider.requests) == 2
+    assert limiter.successes == 1
+    assert limiter.throttles == 0
+
+
+def test_rate_limit_triggers_throttle_then_recovers(sleeps):
+    provider = FakePriceProvider(rate_limit_every=2, flaky_tickers=['T000'])
+    limiter = RecordingLimiter()
+
+    prices = fetch_batch(provider, tickers(3), limiter, START, END, max_retries=3, retry_delay=0.0)
+
+    # 1re requête : T000 absent ; 2e : limitation ; 3e : T000 reçu
+    assert sorted(prices) == tickers(3)
+    assert limiter.throttles == 1
+    assert limiter.successes == 1
+
+
+def test_persistent_rate_limit_returns_nothing(sleeps):
+    provider = FakePriceProvider(rate_limit_every=1)
+    limiter = RecordingLimiter()
+    limiter.min_interval = 0.1
+
+    prices = fetch_batch(provider, tickers(2), limiter, START, END, max_retries=3, retry_delay=0.0)
+
+    assert prices == {}
+    assert limiter.throttles == 3
+    assert limiter.interval > limiter.min_interval
+
+
+def test_partial_rate_limit_keeps_received_tickers(sleeps):
+    provider = FakePriceProvider(throttled_tickers=['T001'])
+    limiter = RecordingLimiter()
+
+    prices = fetch_batch(provider, tickers(3), limiter, START, END, retry_delay=0.0)
+
+    assert sorted(prices) == tickers(3)
+    # Seul le ticker limité est redemandé
+    assert provider.requests == [tickers(3), ['T001']]
+    assert limiter.throttles == 1
+    assert limiter.successes == 1
+
+
+class FakeYahooTicker:
+    """Remplace yf.Ticker : historique, limitation ou erreur selon le ticker"""
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    def history(self, start, end, interval, auto_adjust, raise_errors):
+        assert raise_errors
+        if self.ticker == 'AI.PA':
+            raise Exception("YFRateLimitError('Too Many Requests. Rate limited. Try after a while.')")
+        if self.ticker == 'XXX.PA':
+            raise Exception("YFTzMissingError('possibly delisted; no timezone found')")
+        dates = pd.date_range(start, end, freq='W-MON', tz='Europe/Paris', inclusive='left')
+        return pd.DataFrame({'Close': range(1, len(dates) + 1)}, index=dates, dtype=float)
+
+
+def test_yahoo_provider_returns_received_tickers_with_rate_limit(monkeypatch):
+    monkeypatch.setattr(yf, 'Ticker', FakeYahooTicker)
+
+    with pytest.raises(RateLimitError) as error:
+        YahooFinanceProvider().fetch_prices(['AI.PA', 'OR.PA', 'XXX.PA'], START, END)
+
+    assert list(error.value.prices) == ['OR.PA']
+    assert error.value.prices['OR.PA'].index.tz is None
+
+
+def test_yahoo_provider_ignores_other_per_ticker_errors(monkeypatch):
+    monkeypatch.setattr(yf, 'Ticker', FakeYahooTicker)
+
+    prices = YahooFinanceProvider().fetch_prices(['XXX.PA', 'OR.PA'], START, END)
+
+    assert list(prices) == ['OR.PA']
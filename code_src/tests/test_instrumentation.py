@@ -0,0 +1,48 @@
+import json
+
+from modules.instrumentation import Telemetry
+
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_spans_are_written_in_batches(tmp_path):
+    path = tmp_path / 'telemetry.jsonl'
+    telemetry = Telemetry(path=str(path))
+    telemetry.FLUSH_EVERY = 3
+
+    for _ in range(2):
+        with telemetry.span('selection'):
+            pass
+    # Aucune écriture sur le chemin des requêtes avant que le lot soit complet
+    assert not path.exists()
+
+    with telemetry.span('selection'):
+        pass
+    assert len(read_events(path)) == 3
+
+    telemetry.record_fetch('OR.PA', memory_bytes=1024)
+    telemetry.flush()
+    events = read_events(path)
+    assert [event['type'] for event in events] == ['span'] * 3 + ['fetch']
+    assert telemetry.fetch_summary()['memory_bytes'] == 1024
+
+
+def test_file_is_rotated_beyond_size_cap(tmp_path):
+    path = tmp_path / 'telemetry.jsonl'
+    telemetry = Telemetry(path=str(path), max_file_bytes=200)
+
+    for i in range(4):
+        with telemetry.span('backtest', batch=i):
+            pass
+        telemetry.flush()
+
+    # Chaque lot fait un peu plus de 100 octets : le fichier est archivé après le deuxième,
+    # puis l'archive est remplacée après le quatrième
+    with telemetry.span('backtest', batch=4):
+        pass
+    telemetry.flush()
+    assert [event['batch'] for event in read_events(str(path) + '.1')] == [2, 3]
+    assert [event['batch'] for event in read_events(path)] == [4]
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from modules.metrics import RollingMetrics, rolling_max_drop
+
+
+def brute_force_max_drop(log_wealth, points):
+    drops = []
+    for start in range(len(log_wealth) - points + 1):
+        window = log_wealth[start:start + points]
+        drops.append((np.maximum.accumulate(window, axis=0) - window).max(axis=0))
+    return np.array(drops)
+
+
+def test_rolling_max_drop_matches_brute_force():
+    rng = np.random.default_rng(0)
+    log_wealth = np.cumsum(rng.normal(0.0, 0.03, size=(103, 4)), axis=0)
+
+    for points in (2, 5, 27, 103):
+        np.testing.assert_allclose(rolling_max_drop(log_wealth, points), brute_force_max_drop(log_wealth, points))
+
+
+def test_incremental_max_drawdown_matches_single_pass():
+    rng = np.random.default_rng(1)
+    returns = rng.normal(0.001, 0.03, size=(200, 3))
+    single = RollingMetrics(window=26).update(returns)['max_drawdown']
+
+    engine = RollingMetrics(window=26)
+    chunks = [engine.update(chunk)['max_drawdown'] for chunk in np.array_split(returns, [7, 30, 31, 120])]
+
+    np.testing.assert_allclose(np.vstack(chunks), single, equal_nan=True)
+    assert np.isnan(single[:25]).all() and (single[25:] <= 0).all()
+
+
+def test_single_period_updates_match_pandas_rolling():
+    rng = np.random.default_rng(2)
+    returns = rng.normal(0.001, 0.03, size=60)
+    engine = RollingMetrics(window=10, periods_per_year=52)
+
+    volatility = np.concatenate([engine.update(returns[i:i + 1])['volatility'] for i in range(len(returns))])
+
+    expected = pd.Series(returns).rolling(10).std() * np.sqrt(52) * 100
+    np.testing.assert_allclose(volatility, expected.to_numpy(), equal_nan=True)
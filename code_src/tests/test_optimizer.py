@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.optimizer import PortfolioOptimizer
+
+
+@pytest.fixture
+def optimizer():
+    assets = list('ABCD')
+    returns = pd.DataFrame(np.random.default_rng(0).normal(0.002, 0.02, size=(60, 4)), columns=assets)
+    return PortfolioOptimizer(returns, pd.Series([1.0, 2.0, 3.0, 4.0], index=assets))
+
+
+def test_weights_respect_max_weight(optimizer):
+    weights = optimizer.min_variance(list('ABCD'), size=3, max_weight=0.34)
+
+    assert weights.sum() == pytest.approx(1.0)
+    assert (weights <= 0.34 + 1e-6).all()
+
+
+@pytest.mark.parametrize('assets, size, max_weight', [
+    (list('ABCD'), 2, 0.4),
+    (list('AB'), None, 0.3),
+])
+def test_infeasible_max_weight_is_rejected(optimizer, assets, size, max_weight):
+    with pytest.raises(ValueError, match="Poids maximal"):
+        optimizer.max_sharpe(assets, size=size, max_weight=max_weight)
+
+
+def test_empty_assets_are_rejected(optimizer):
+    with pytest.raises(ValueError, match="Aucun actif"):
+        optimizer.min_variance([])
+    with pytest.raises(ValueError, match="Aucun actif"):
+        optimizer.efficient_frontier([])
+
+
+def test_size_limited_portfolio_lies_on_frontier_of_its_assets(optimizer):
+    weights = optimizer.min_variance(list('ABCD'), size=2)
+    held = weights[weights > 1e-6]
+
+    frontier = optimizer.efficient_frontier(list(held.index), n_points=5)
+    _, cov = optimizer.moments.moments(list(held.index))
+
+    # Le premier point de la frontière est le portefeuille de variance minimale des mêmes actifs
+    assert frontier['volatility'].iloc[0] == pytest.approx(np.sqrt(held.values @ cov @ held.values) * 100, rel=1e-3)
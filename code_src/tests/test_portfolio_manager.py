@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.cache import LRUCache
+from modules.portfolio_manager import PortfolioManager
+
+ASSETS = ['AI.PA', 'OR.PA', 'SU.PA']
+
+
+def make_returns(version, interval='1wk', seed=0):
+    dates = pd.date_range('2023-01-02', periods=40, freq='W-MON')
+    returns = pd.DataFrame(np.random.default_rng(seed).normal(0.002, 0.02, size=(40, 3)),
+                           index=dates, columns=ASSETS)
+    returns.attrs.update(version=version, interval=interval)
+    return returns
+
+
+def make_manager(returns, cache):
+    notation = pd.DataFrame({'Ticker': ASSETS, 'Note': [3.0, 2.0, 1.0]})
+    return PortfolioManager(notation, returns, results_cache=cache)
+
+
+def create(manager, total_investment=10000):
+    return manager.create_portfolio(total_investment=total_investment, corresponding_assets=ASSETS, size=2)
+
+
+def test_simulation_cache_hit_miss_and_invalidation():
+    cache = LRUCache()
+    manager = make_manager(make_returns('v1'), cache)
+
+    first = create(manager)
+    assert cache.info()['misses'] == 1
+
+    # Même portefeuille pour un autre montant : la simulation unitaire est réutilisée
+    second = create(manager, total_investment=500)
+    assert cache.info()['hits'] == 1
+    assert second['portfolio_value'].to_numpy() == pytest.approx(first['portfolio_value'].to_numpy() / 20)
+
+    # Nouvelle version des rendements : la simulation est recalculée sur les nouvelles données
+    updated = create(make_manager(make_returns('v2', seed=1), cache))
+    assert cache.info()['misses'] == 2
+    assert not np.allclose(updated['portfolio_value'], first['portfolio_value'])
+
+
+def test_simulation_cache_is_keyed_by_interval():
+    cache = LRUCache()
+    weekly = create(make_manager(make_returns('v1', interval='1wk'), cache))
+    # Mêmes rendements et même version, mais annualisés sur 12 périodes par an
+    monthly = create(make_manager(make_returns('v1', interval='1mo'), cache))
+
+    assert cache.info()['misses'] == 2
+    assert monthly['volatility'] == pytest.approx(weekly['volatility'] * np.sqrt(12 / 52))
@@ -0,0 +1,95 @@
+import os
+
+import pandas as pd
+import pytest
+
+from modules import data_collector
+from modules.data_collector import refresh_prices
+from modules.price_provider import FakePriceProvider
+from modules.price_store import PriceStore
+
+START = pd.Timestamp('2023-01-02')
+MIDDLE = pd.Timestamp('2023-04-03')
+END = pd.Timestamp('2023-07-03')
+TICKERS = ['AAA', 'BBB']
+
+
+class RecordingProvider(FakePriceProvider):
+    """Fournisseur synthétique qui enregistre la date de début de chaque requête"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.starts = []
+
+    def fetch_prices(self, tickers, start, end, interval='1wk'):
+        self.starts.append(pd.Timestamp(start))
+        return super().fetch_prices(tickers, start, end, interval)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(root=str(tmp_path), interval='1wk')
+
+
+def full_history(ticker, start=START, end=END):
+    return FakePriceProvider().fetch_prices([ticker], start, end)[ticker]
+
+
+def test_empty_store_fetches_whole_period(store):
+    provider = RecordingProvider()
+
+    assert store.fetch_start('AAA', START, END) == START
+    assert refresh_prices(TICKERS, store, provider=provider, start_date=START, end_date=END) == 2
+
+    assert provider.starts == [START]
+    pd.testing.assert_series_equal(store.load('AAA'), full_history('AAA'), check_names=False, check_freq=False)
+    coverage = store.coverage('AAA')
+    assert (coverage['covered_from'], coverage['covered_until']) == ('2023-01-02', '2023-07-03')
+    assert store.fetch_start('AAA', START, END) is None
+
+
+def test_partly_covered_store_fetches_from_last_stored_period(store):
+    refresh_prices(TICKERS, store, provider=FakePriceProvider(), start_date=START, end_date=MIDDLE)
+    last = pd.Timestamp(store.coverage('AAA')['last'])
+    provider = RecordingProvider()
+
+    assert store.fetch_start('AAA', START, END) == last
+    assert refresh_prices(TICKERS, store, provider=provider, start_date=START, end_date=END) == 2
+
+    # La dernière période stockée est retéléchargée, l'historique antérieur ne l'est pas
+    assert provider.starts == [last]
+    pd.testing.assert_series_equal(store.load('AAA'), full_history('AAA'), check_names=False, check_freq=False)
+    assert store.coverage('AAA')['covered_from'] == '2023-01-02'
+    # Une période demandée plus tôt que la couverture impose de repartir du début
+    assert store.fetch_start('AAA', START - pd.Timedelta(weeks=4), END) == START - pd.Timedelta(weeks=4)
+
+
+def test_overlapping_refresh_replaces_stored_rows(store):
+    history = full_history('AAA')
+    store.append('AAA', history[history.index < MIDDLE], START, MIDDLE)
+
+    overlap = history[history.index >= MIDDLE - pd.Timedelta(weeks=3)] * 2
+    store.append('AAA', overlap, MIDDLE - pd.Timedelta(weeks=3), END)
+
+    stored = store.load('AAA')
+    assert stored.index.is_unique and stored.index.is_monotonic_increasing
+    assert len(stored) == len(history)
+    pd.testing.assert_series_equal(stored[stored.index < overlap.index[0]],
+                                   history[history.index < overlap.index[0]], check_names=False, check_freq=False)
+    pd.testing.assert_series_equal(stored[overlap.index], overlap, check_names=False, check_freq=False)
+    assert store.coverage('AAA')['covered_from'] == '2023-01-02'
+
+
+def test_refresh_without_new_prices_marks_period_covered(store, monkeypatch):
+    monkeypatch.setattr(data_collector.time, 'sleep', lambda seconds: None)
+    refresh_prices(['AAA'], store, provider=FakePriceProvider(), start_date=START, end_date=MIDDLE)
+    last = store.coverage('AAA')['last']
+
+    refresh_prices(['AAA'], store, provider=FakePriceProvider(fail_tickers=['AAA']), start_date=START,
+                   end_date=END)
+
+    assert store.coverage('AAA')['last'] == last
+    assert store.coverage('AAA')['covered_until'] == '2023-07-03'
+    assert store.fetch_start('AAA', START, END) is None
+    # Le manifeste est relu par un nouveau stockage sur le même répertoire
+    assert PriceStore(root=os.path.dirname(store.root), interval='1wk').coverage('AAA') == store.coverage('AAA')
@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pandas as pd
+
+from modules.price_provider import FakePriceProvider
+from modules.price_store import PriceStore
+from modules.rate_limiter import AdaptiveRateLimiter
+from modules.refresh_job import CANCELLED, SUCCEEDED, RefreshJob
+
+START = datetime(2023, 1, 2)
+END = datetime(2023, 6, 30)
+TICKERS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+
+
+class CancellingProvider(FakePriceProvider):
+    """Source qui annule la mise à jour pendant sa première requête"""
+
+    def __init__(self, job=None):
+        # La latence laisse le temps d'annuler les lots non commencés
+        super().__init__(latency=0.05)
+        self.job = job
+
+    def fetch_prices(self, tickers, start, end, interval='1wk'):
+        if self.job is not None:
+            self.job.cancel()
+        return super().fetch_prices(tickers, start, end, interval)
+
+
+def run_job(tmp_path, provider):
+    return RefreshJob(assets_file=str(tmp_path / 'assets.xlsx'), provider=provider, batch_size=1,
+                      max_workers=1, store=PriceStore(root=str(tmp_path / 'prices'), interval='1wk'),
+                      esg_cache_path=str(tmp_path / 'esg.parquet'), returns_root=None,
+                      limiter=AdaptiveRateLimiter(min_interval=0.0), start_date=START, end_date=END)
+
+
+def test_cancelled_refresh_keeps_stored_batches_and_resumes(tmp_path):
+    pd.DataFrame({'Actions': TICKERS, 'Ticker': TICKERS, 'Note': 1.0}).to_excel(tmp_path / 'assets.xlsx',
+                                                                                index=False)
+
+    provider = CancellingProvider()
+    job = run_job(tmp_path, provider)
+    provider.job = job
+    job.start().join(timeout=30)
+
+    assert job.state == CANCELLED
+    assert job.result is None
+    # Les lots reçus avant l'annulation sont écrits dans le stockage local
+    fetched = [ticker for request in provider.requests for ticker in request]
+    stored = PriceStore(root=str(tmp_path / 'prices'), interval='1wk').tickers()
+    assert 0 < len(fetched) < len(TICKERS)
+    assert stored == sorted(fetched)
+    assert job.progress()['downloaded'] == len(fetched)
+
+    # La mise à jour relancée ne télécharge que les tickers manquants
+    provider = CancellingProvider()
+    job = run_job(tmp_path, provider)
+    job.start().join(timeout=30)
+
+    assert job.state == SUCCEEDED
+    assert sorted(ticker for request in provider.requests for ticker in request) == \
+        sorted(set(TICKERS) - set(stored))
+    progress = job.progress()
+    assert (progress['up_to_date'], progress['downloaded'], progress['fraction']) == \
+        (len(stored), len(TICKERS) - len(stored), 1.0)
+    assert list(job.result[1].columns) == TICKERS
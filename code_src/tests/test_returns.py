@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.data_collector import align_prices, returns_from_prices, trading_calendar
+
+DATES = pd.date_range('2023-01-02', periods=6, freq='W-MON')
+NAN = np.nan
+
+
+@pytest.fixture
+def aligned():
+    # AAA ne cote pas à la troisième date ; BBB est introduit à cette date
+    prices = {
+        'AAA': pd.Series([100.0, 110.0, 121.0, 133.1, 146.41], index=DATES.delete(2)),
+        'BBB': pd.Series([50.0, 55.0, 60.5, 66.55], index=DATES[2:]),
+    }
+    calendar = trading_calendar(prices)
+    return align_prices(prices, ['AAA', 'BBB'], calendar), calendar
+
+
+def test_prices_are_aligned_on_the_union_calendar(aligned):
+    matrix, calendar = aligned
+
+    assert calendar.equals(pd.DatetimeIndex(DATES, name='Date'))
+    np.testing.assert_array_equal(np.isnan(matrix), [[False, True], [False, True], [True, False],
+                                                     [False, False], [False, False], [False, False]])
+
+
+def test_mask_policy_invalidates_missing_dates(aligned):
+    returns, calendar = returns_from_prices(*aligned, missing='mask')
+
+    assert len(calendar) == 6
+    # Le rendement après le trou couvre tout l'intervalle depuis le dernier cours
+    np.testing.assert_allclose(returns, [[NAN, NAN], [0.1, NAN], [NAN, NAN],
+                                         [0.1, 0.1], [0.1, 0.1], [0.1, 0.1]])
+
+
+def test_ffill_policy_carries_last_price(aligned):
+    returns, calendar = returns_from_prices(*aligned, missing='ffill')
+
+    assert len(calendar) == 6
+    # Trou : rendement nul valide ; avant l'introduction de BBB : toujours invalide
+    np.testing.assert_allclose(returns, [[NAN, NAN], [0.1, NAN], [0.0, NAN],
+                                         [0.1, 0.1], [0.1, 0.1], [0.1, 0.1]])
+
+
+def test_drop_policy_keeps_only_complete_dates(aligned):
+    returns, calendar = returns_from_prices(*aligned, missing='drop')
+
+    assert calendar.equals(pd.DatetimeIndex(DATES[3:], name='Date'))
+    np.testing.assert_allclose(returns, [[NAN, NAN], [0.1, 0.1], [0.1, 0.1]])
+
+
+def test_unknown_policy_is_rejected(aligned):
+    with pytest.raises(ValueError):
+        returns_from_prices(*aligned, missing='interpolate')
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from modules.returns_matrix import ReturnsMatrix, open_returns_matrix
+
+
+def returns_frame(seed=0, version=None):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.001, 0.03, size=(30, 4))
+    values[0] = np.nan
+    values[:10, 2] = np.nan
+    returns_df = pd.DataFrame(values, columns=['AAA', 'BBB', 'CCC', 'DDD'],
+                              index=pd.date_range('2023-01-02', periods=30, freq='W-MON', name='Date'))
+    returns_df.attrs.update(version=version or f"v{seed}", interval='1wk')
+    return returns_df
+
+
+def test_round_trip_preserves_values_index_and_columns(tmp_path):
+    returns_df = returns_frame()
+
+    matrix = ReturnsMatrix.write(returns_df, root=str(tmp_path))
+    loaded = open_returns_matrix(matrix.path)
+
+    assert isinstance(matrix.values, np.memmap) and matrix.values.dtype == np.float32
+    assert loaded.index.equals(returns_df.index)
+    assert list(loaded.columns) == list(returns_df.columns)
+    np.testing.assert_allclose(loaded.to_numpy(dtype=np.float64), returns_df.to_numpy(), rtol=1e-6, atol=1e-8)
+    np.testing.assert_array_equal(np.isnan(loaded.to_numpy()), np.isnan(returns_df.to_numpy()))
+    assert loaded.attrs['version'] == 'v0' and loaded.attrs['interval'] == '1wk'
+    assert loaded.attrs['returns_matrix'] == matrix.path
+
+
+def test_existing_version_is_reused(tmp_path):
+    first = ReturnsMatrix.write(returns_frame(), root=str(tmp_path))
+    mtime = os.path.getmtime(os.path.join(first.path, ReturnsMatrix.VALUES_FILE))
+
+    second = ReturnsMatrix.write(returns_frame(), root=str(tmp_path))
+
+    assert second.path == first.path
+    assert os.path.getmtime(os.path.join(second.path, ReturnsMatrix.VALUES_FILE)) == mtime
+
+
+def test_prune_keeps_most_recent_versions(tmp_path):
+    paths = []
+    for seed in range(3):
+        paths.append(ReturnsMatrix.write(returns_frame(seed), root=str(tmp_path), keep=10).path)
+        # Dates de modification distinctes, de la plus ancienne à la plus récente
+        os.utime(paths[-1], (1_000_000 + seed, 1_000_000 + seed))
+
+    newest = ReturnsMatrix.write(returns_frame(3), root=str(tmp_path), keep=2).path
+
+    assert open_returns_matrix(newest) is not None
+    assert open_returns_matrix(paths[2]) is not None
+    assert open_returns_matrix(paths[0]) is None and open_returns_matrix(paths[1]) is None
+    assert open_returns_matrix(None) is None
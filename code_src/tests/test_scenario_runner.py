@@ -0,0 +1,32 @@
+import json
+
+from modules.scenario_runner import SCENARIO_DEFAULTS, read_scenarios
+
+
+def test_missing_jsonl_keys_take_defaults(tmp_path):
+    path = tmp_path / 'scenarios.jsonl'
+    path.write_text('\n'.join(json.dumps(record) for record in [
+        {'min_rating': 1.0, 'rebalancing': 'monthly', 'size': 6},
+        {'min_rating': 1.5},
+    ]))
+
+    first, second = read_scenarios(str(path))
+
+    assert first['size'] == 6 and first['rebalancing'] == 'monthly'
+    assert second['min_rating'] == 1.5
+    assert second['size'] == SCENARIO_DEFAULTS['size']
+    assert second['rebalancing'] == SCENARIO_DEFAULTS['rebalancing']
+    assert int(second['size']) == 5
+
+
+def test_blank_csv_cells_take_defaults(tmp_path):
+    path = tmp_path / 'scenarios.csv'
+    path.write_text('min_rating,size,weighting\n2.0,,max_sharpe\n3.0,8,\n')
+
+    first, second = read_scenarios(str(path))
+
+    assert first['size'] == SCENARIO_DEFAULTS['size']
+    assert first['weighting'] == 'max_sharpe'
+    assert second['size'] == 8
+    assert second['weighting'] == SCENARIO_DEFAULTS['weighting']
+    assert [first['scenario_id'], second['scenario_id']] == [0, 1]
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import walk_forward as wf
+from modules.optimizer import MomentCache
+
+
+def random_returns(n_rows=120, n_assets=6, seed=0):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.002, 0.03, size=(n_rows, n_assets))
+    returns[0] = np.nan
+    returns[rng.random(returns.shape) < 0.1] = np.nan
+    return returns
+
+
+def test_window_moments_match_moment_cache():
+    returns = random_returns()
+    moments = wf.WindowMoments(returns, [1, 30, 90, 120], periods_per_year=52)
+    idx = np.array([0, 2, 5])
+
+    mean, cov = moments.moments(30, 90, idx)
+
+    # MomentCache ignore la première ligne (point de départ) : la fenêtre commence donc une ligne plus tôt
+    expected = MomentCache(pd.DataFrame(returns[29:90, idx]), periods_per_year=52)
+    np.testing.assert_allclose(mean, expected.mean)
+    np.testing.assert_allclose(cov, expected.cov)
+    np.testing.assert_array_equal(moments.counts(30, 90), (~np.isnan(returns[30:90])).sum(axis=0))
+
+
+@pytest.fixture
+def universe():
+    returns = random_returns(n_rows=160, seed=1)
+    assets = [f"A{i}" for i in range(returns.shape[1])]
+    returns_df = pd.DataFrame(returns, columns=assets,
+                              index=pd.date_range('2020-01-06', periods=len(returns), freq='W-MON'))
+    notation_df = pd.DataFrame({'Ticker': assets, 'Note': np.linspace(1.0, 3.0, len(assets))})
+    return notation_df, returns_df, assets
+
+
+def test_optimized_windows_run_in_process_by_default(universe, monkeypatch):
+    notation_df, returns_df, assets = universe
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool de processus inattendu")
+
+    monkeypatch.setattr(wf, 'ProcessPoolExecutor', no_pool)
+    result = wf.walk_forward(notation_df, returns_df, assets, train_size=52, test_size=13,
+                             weighting='min_variance', size=3)
+
+    assert len(result['windows']) < wf.PARALLEL_MIN_WINDOWS
+    assert result['windows']['error'].isna().all()
+    assert result['portfolio_value'].notna().all()